@@ -0,0 +1,101 @@
+"""
+Benchmark of the Ipopt solve times when the nonlinear program is evaluated by the CasADi virtual machine (the default)
+compared to when it is generated in C and compiled into a shared library (solver_options={"compile_nlp": True}).
+
+Three timings are reported for each program:
+    - vm: the default behavior
+    - compiled (cold): the first compiled solve, including the code generation and the compilation
+    - compiled (cached): a new program with the same structure, which loads the library from the cache
+"""
+
+import os
+import shutil
+from time import perf_counter
+
+from bioptim import Solver
+
+from utils import examples_folder, load_example
+
+
+def time_solve(prepare_ocp, solver_options: dict) -> tuple:
+    """
+    Prepare and solve an ocp
+
+    Parameters
+    ----------
+    prepare_ocp: Callable
+        The function that returns the ocp to solve
+    solver_options: dict
+        The options to send to Ipopt
+
+    Returns
+    -------
+    The wall time of the whole solve call and the time spent in the Ipopt iterations
+    """
+
+    ocp = prepare_ocp()
+    tic = perf_counter()
+    sol = ocp.solve(solver=Solver.IPOPT, solver_options=solver_options)
+    return perf_counter() - tic, sol.time_to_optimize
+
+
+def benchmark(name: str, prepare_ocp, compile_folder: str = "ipopt_generated_code_benchmark"):
+    """
+    Compare the virtual machine and compiled modes on a program and print the results
+
+    Parameters
+    ----------
+    name: str
+        The name of the program
+    prepare_ocp: Callable
+        The function that returns the ocp to solve
+    compile_folder: str
+        The folder where to cache the compiled libraries. It is removed at the end
+    """
+
+    options = {"print_level": 0}
+    compiled_options = {**options, "compile_nlp": True, "compile_folder": compile_folder}
+    if os.path.isdir(compile_folder):
+        shutil.rmtree(compile_folder)
+
+    results = {
+        "vm": time_solve(prepare_ocp, options),
+        "compiled (cold)": time_solve(prepare_ocp, compiled_options),
+        "compiled (cached)": time_solve(prepare_ocp, compiled_options),
+    }
+    shutil.rmtree(compile_folder)
+
+    print(f"{name}")
+    for mode, (total, optimize) in results.items():
+        print(f"    {mode:<20}solve: {total:8.3f} s    iterations: {optimize:8.3f} s")
+
+
+def main():
+    """
+    Run the benchmark on the pendulum and the static arm examples
+    """
+
+    pendulum = load_example("getting_started/pendulum.py")
+    benchmark(
+        "getting_started/pendulum.py",
+        lambda: pendulum.prepare_ocp(
+            biorbd_model_path=os.path.join(examples_folder, "getting_started", "pendulum.bioMod"),
+            final_time=3,
+            n_shooting=100,
+        ),
+    )
+
+    static_arm = load_example("muscle_driven_ocp/static_arm.py")
+    benchmark(
+        "muscle_driven_ocp/static_arm.py",
+        lambda: static_arm.prepare_ocp(
+            biorbd_model_path=os.path.join(examples_folder, "muscle_driven_ocp", "arm26.bioMod"),
+            final_time=3,
+            n_shooting=50,
+            weight=1000,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark of Solution.integrate on a torque-driven pendulum with 2000 shooting nodes.
+
+The intervals are integrated in one call to the integrator mapped over all the nodes (Shooting.MULTIPLE) or chained
+over all the nodes (Shooting.SINGLE_CONTINUOUS). They are compared to the node by node integration, which is still
+used when each node has its own integrator (e.g. with external forces).
+"""
+
+import os
+from time import perf_counter
+
+import numpy as np
+from bioptim import InitialGuess, InterpolationType, Shooting, Solution
+
+from utils import examples_folder, load_example
+
+
+def time_integrate(sol: Solution, n_repeat: int, **integrate_options) -> float:
+    """
+    Integrate a solution several times
+
+    Parameters
+    ----------
+    sol: Solution
+        The solution to integrate
+    n_repeat: int
+        The number of times to integrate
+    integrate_options: dict
+        The options to send to Solution.integrate
+
+    Returns
+    -------
+    The mean time of an integration
+    """
+
+    tic = perf_counter()
+    for _ in range(n_repeat):
+        sol.integrate(**integrate_options)
+    return (perf_counter() - tic) / n_repeat
+
+
+def benchmark(n_shooting: int = 2000, n_threads: int = 1, n_repeat: int = 5):
+    """
+    Compare the batched and the node by node integrations and print the results
+
+    Parameters
+    ----------
+    n_shooting: int
+        The number of shooting nodes
+    n_threads: int
+        The number of threads of the mapped integrator
+    n_repeat: int
+        The number of times each integration is repeated
+    """
+
+    pendulum = load_example("getting_started/pendulum.py")
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=os.path.join(examples_folder, "getting_started", "pendulum.bioMod"),
+        final_time=3,
+        n_shooting=n_shooting,
+    )
+    nlp = ocp.nlp[0]
+    if n_threads > 1:
+        # The example does not expose n_threads, so the mapped integrator is rebuilt as OdeSolver would do
+        nlp.par_dynamics = nlp.dynamics[0].map(n_shooting, "thread", n_threads)
+
+    np.random.seed(42)
+    states = InitialGuess(np.random.rand(nlp.nx, n_shooting + 1), interpolation=InterpolationType.EACH_FRAME)
+    controls = InitialGuess(np.random.rand(nlp.nu, n_shooting), interpolation=InterpolationType.EACH_FRAME)
+    sol = Solution(ocp, [states, controls])
+
+    all_options = {
+        "multiple": {"shooting_type": Shooting.MULTIPLE, "keepdims": False, "continuous": False},
+        "single_continuous": {"shooting_type": Shooting.SINGLE_CONTINUOUS},
+        "single_continuous (all steps)": {"shooting_type": Shooting.SINGLE_CONTINUOUS, "keepdims": False},
+    }
+
+    # The solution keeps its own references to the integrators
+    sol_nlp = sol.ocp.nlp[0]
+    par_dynamics, accum_dynamics = sol_nlp.par_dynamics, sol_nlp.accum_dynamics
+    print(f"pendulum, {n_shooting} nodes, {n_threads} thread(s)")
+    for name, options in all_options.items():
+        batched = time_integrate(sol, n_repeat, **options)
+        sol_nlp.par_dynamics, sol_nlp.accum_dynamics = None, None
+        node_by_node = time_integrate(sol, n_repeat, **options)
+        sol_nlp.par_dynamics, sol_nlp.accum_dynamics = par_dynamics, accum_dynamics
+        print(
+            f"    {name:<32}batched: {batched:8.4f} s    node by node: {node_by_node:8.4f} s    "
+            f"speedup: {node_by_node / batched:6.1f}x"
+        )
+
+
+def main():
+    """
+    Run the benchmark with one and several threads
+    """
+
+    benchmark(n_threads=1)
+    benchmark(n_threads=4)
+
+
+if __name__ == "__main__":
+    main()
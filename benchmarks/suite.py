@@ -0,0 +1,406 @@
+"""
+Performance suite of bioptim, built from the examples and sized from small to large problems (number of shooting
+points, number of degrees of freedom and number of muscles).
+
+For each case, the following metrics are recorded (the times are the best of the repetitions, in seconds):
+    - build_time: the construction of the OptimalControlProgram
+    - solve_time: the call to solve (including the construction of the solver)
+    - iterations: the number of iterations of the solver
+    - integrate_time: Solution.integrate (Shooting.SINGLE_CONTINUOUS)
+    - integrate_multiple_time: Solution.integrate as called by the plots (Shooting.MULTIPLE, not continuous)
+    - interpolate_time: Solution.interpolate on 1000 frames
+    - update_data_time: PlotOcp.update_data, as called at each iteration when show_online_optim is True
+    - max_rss: the maximum resident memory of the process (bytes)
+
+Each case runs in its own process, so the memory of a case is not polluted by the others. The results of a run are
+stored in a local store (one JSON file per commit) and two runs can be compared to flag the regressions.
+
+Usage:
+    python benchmarks/suite.py run [--cases pendulum_30 static_arm_20] [--repeat 3] [--store .benchmarks]
+    python benchmarks/suite.py compare BASE [HEAD] [--threshold 0.1] [--store .benchmarks]
+where BASE and HEAD are commits (or names of the stored results), HEAD being the current commit by default. The
+compare command exits with 1 if any metric regressed by more than the threshold.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+from utils import examples_folder, load_example
+
+# The description of each case: the example to import, the arguments of its prepare_ocp (the paths being relative to
+# the examples folder) and the solver to use
+CASES = {
+    "pendulum_30": {
+        "example": "getting_started/pendulum.py",
+        "kwargs": {"biorbd_model_path": "getting_started/pendulum.bioMod", "final_time": 1, "n_shooting": 30},
+        "solver": "IPOPT",
+    },
+    "pendulum_100": {
+        "example": "getting_started/pendulum.py",
+        "kwargs": {"biorbd_model_path": "getting_started/pendulum.bioMod", "final_time": 3, "n_shooting": 100},
+        "solver": "IPOPT",
+    },
+    "pendulum_500": {
+        "example": "getting_started/pendulum.py",
+        "kwargs": {"biorbd_model_path": "getting_started/pendulum.bioMod", "final_time": 3, "n_shooting": 500},
+        "solver": "IPOPT",
+    },
+    "trampo_quaternions_25": {
+        "example": "torque_driven_ocp/trampo_quaternions.py",
+        "kwargs": {
+            "biorbd_model_path": "torque_driven_ocp/TruncAnd2Arm_Quaternion.bioMod",
+            "n_shooting": 25,
+            "final_time": 0.25,
+        },
+        "solver": "IPOPT",
+    },
+    "static_arm_20": {
+        "example": "muscle_driven_ocp/static_arm.py",
+        "kwargs": {
+            "biorbd_model_path": "muscle_driven_ocp/arm26.bioMod",
+            "final_time": 2,
+            "n_shooting": 20,
+            "weight": 1000,
+        },
+        "solver": "IPOPT",
+    },
+    "static_arm_50": {
+        "example": "muscle_driven_ocp/static_arm.py",
+        "kwargs": {
+            "biorbd_model_path": "muscle_driven_ocp/arm26.bioMod",
+            "final_time": 3,
+            "n_shooting": 50,
+            "weight": 1000,
+        },
+        "solver": "IPOPT",
+    },
+    "acados_pendulum_41": {
+        "example": "acados/pendulum.py",
+        "kwargs": {"biorbd_model_path": "acados/pendulum.bioMod", "final_time": 3, "n_shooting": 41},
+        "solver": "ACADOS",
+    },
+}
+
+# The metrics for which a higher value is worse
+METRICS = (
+    "build_time",
+    "solve_time",
+    "integrate_time",
+    "integrate_multiple_time",
+    "interpolate_time",
+    "update_data_time",
+    "max_rss",
+)
+
+
+def best_time(function, repeat: int) -> float:
+    """
+    Time a function several times
+
+    Parameters
+    ----------
+    function: Callable
+        The function to time, without argument
+    repeat: int
+        The number of calls
+
+    Returns
+    -------
+    The best time of the calls
+    """
+
+    times = []
+    for _ in range(repeat):
+        tic = perf_counter()
+        function()
+        times.append(perf_counter() - tic)
+    return min(times)
+
+
+def max_rss():
+    """
+    Get the maximum resident memory of the process
+
+    Returns
+    -------
+    The maximum resident memory in bytes, None if it is not available on this platform
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes while the other platforms report kilobytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_case(name: str, repeat: int) -> dict:
+    """
+    Measure all the metrics of a case in the current process
+
+    Parameters
+    ----------
+    name: str
+        The name of the case
+    repeat: int
+        The number of repetitions of each measure
+
+    Returns
+    -------
+    The metrics of the case
+    """
+
+    case = CASES[name]
+    if case["solver"] == "ACADOS" and importlib.util.find_spec("acados_template") is None:
+        return {"skipped": "acados is not installed"}
+
+    # The plots are updated without being shown
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from bioptim import Solver, Shooting
+
+    example = load_example(case["example"])
+    kwargs = dict(case["kwargs"])
+    kwargs["biorbd_model_path"] = os.path.join(examples_folder, kwargs["biorbd_model_path"])
+    solver = Solver.ACADOS if case["solver"] == "ACADOS" else Solver.IPOPT
+    solver_options = {"print_level": 0} if solver == Solver.IPOPT else {}
+
+    results = {"build_time": [], "solve_time": []}
+    sol = None
+    ocp = None
+    for _ in range(repeat):
+        tic = perf_counter()
+        ocp = example.prepare_ocp(**kwargs)
+        results["build_time"].append(perf_counter() - tic)
+
+        tic = perf_counter()
+        sol = ocp.solve(solver=solver, solver_options=solver_options)
+        results["solve_time"].append(perf_counter() - tic)
+    results = {key: min(value) for key, value in results.items()}
+    results["iterations"] = int(sol.iterations) if sol.iterations is not None else None
+
+    results["integrate_time"] = best_time(lambda: sol.integrate(), repeat)
+    results["integrate_multiple_time"] = best_time(
+        lambda: sol.integrate(shooting_type=Shooting.MULTIPLE, keepdims=False, continuous=False), repeat
+    )
+    results["interpolate_time"] = best_time(lambda: sol.interpolate(1000), repeat)
+
+    plot = ocp.prepare_plots(automatically_organize=False)
+    results["update_data_time"] = best_time(lambda: plot.update_data(sol.vector), repeat)
+
+    results["max_rss"] = max_rss()
+    return results
+
+
+def current_commit() -> str:
+    """
+    Get the name of the current commit, suffixed with '-dirty' if there are uncommitted changes
+
+    Returns
+    -------
+    The name of the current commit, 'unknown' if it cannot be found
+    """
+
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def resolve_results(ref: str, store: str) -> str:
+    """
+    Find the stored results of a commit
+
+    Parameters
+    ----------
+    ref: str
+        The name of the stored results or any git reference to a commit
+    store: str
+        The folder of the stored results
+
+    Returns
+    -------
+    The path of the stored results
+    """
+
+    candidates = [ref]
+    try:
+        candidates.append(
+            subprocess.run(["git", "describe", "--always", ref], check=True, capture_output=True, text=True)
+            .stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+    for candidate in candidates:
+        path = os.path.join(store, f"{candidate}.json")
+        if os.path.isfile(path):
+            return path
+    raise ValueError(f"No stored results for '{ref}' in {store}, please run the suite on this commit first")
+
+
+def run(cases: list, repeat: int, store: str) -> str:
+    """
+    Run the cases, each in its own process, and store the results
+
+    Parameters
+    ----------
+    cases: list[str]
+        The names of the cases to run
+    repeat: int
+        The number of repetitions of each measure
+    store: str
+        The folder of the stored results
+
+    Returns
+    -------
+    The path of the stored results
+    """
+
+    from bioptim import __version__
+
+    commit = current_commit()
+    results = {}
+    for name in cases:
+        print(f"{name}...", flush=True)
+        # The cases run in a temporary folder since some solvers generate files in the working directory
+        with tempfile.TemporaryDirectory() as working_directory:
+            process = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "case", name, "--repeat", str(repeat)],
+                cwd=working_directory,
+                capture_output=True,
+                text=True,
+            )
+        if process.returncode != 0:
+            results[name] = {"failed": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else ""}
+        else:
+            results[name] = json.loads(process.stdout.strip().splitlines()[-1])
+        print(f"    {results[name]}")
+
+    os.makedirs(store, exist_ok=True)
+    path = os.path.join(store, f"{commit}.json")
+    with open(path, "w") as file:
+        json.dump(
+            {
+                "commit": commit,
+                "date": datetime.now().isoformat(),
+                "machine": platform.node(),
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "bioptim": __version__,
+                "repeat": repeat,
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Results saved in {path}")
+    return path
+
+
+def compare(base: str, head: str, threshold: float, store: str) -> bool:
+    """
+    Compare the stored results of two commits and print the metrics that changed by more than the threshold
+
+    Parameters
+    ----------
+    base: str
+        The reference commit
+    head: str
+        The commit to compare to the reference
+    threshold: float
+        The relative change above which a metric is flagged
+    store: str
+        The folder of the stored results
+
+    Returns
+    -------
+    If any metric regressed
+    """
+
+    with open(resolve_results(base, store), "r") as file:
+        base_data = json.load(file)
+    with open(resolve_results(head, store), "r") as file:
+        head_data = json.load(file)
+
+    print(f"{base_data['commit']} -> {head_data['commit']} (threshold: {threshold * 100:.0f}%)")
+    if base_data["machine"] != head_data["machine"]:
+        print(f"Warning, the results come from different machines ({base_data['machine']}, {head_data['machine']})")
+
+    has_regressed = False
+    for name, head_results in head_data["results"].items():
+        base_results = base_data["results"].get(name)
+        if base_results is None:
+            print(f"{name}: new case")
+            continue
+        if "failed" in head_results and "failed" not in base_results:
+            print(f"{name}: REGRESSION, the case failed ({head_results['failed']})")
+            has_regressed = True
+            continue
+
+        for metric in METRICS:
+            old, new = base_results.get(metric), head_results.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            if ratio > 1 + threshold:
+                flag = "REGRESSION"
+                has_regressed = True
+            elif ratio < 1 - threshold:
+                flag = "improvement"
+            else:
+                continue
+            print(f"{name:<24}{metric:<26}{old:12.4g} -> {new:12.4g}    {ratio:6.2f}x    {flag}")
+
+    if not has_regressed:
+        print("No regression")
+    return has_regressed
+
+
+def main():
+    """
+    Parse the command line
+    """
+
+    parser = argparse.ArgumentParser(description="Performance suite of bioptim")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and store the results of the current commit")
+    run_parser.add_argument("--cases", nargs="+", default=list(CASES.keys()), choices=list(CASES.keys()))
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--store", default=".benchmarks")
+
+    compare_parser = subparsers.add_parser("compare", help="Flag the regressions between two stored commits")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head", nargs="?", default=None)
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.add_argument("--store", default=".benchmarks")
+
+    case_parser = subparsers.add_parser("case", help="Run a single case in the current process (used by run)")
+    case_parser.add_argument("name", choices=list(CASES.keys()))
+    case_parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args.cases, args.repeat, args.store)
+    elif args.command == "compare":
+        head = args.head if args.head is not None else current_commit()
+        sys.exit(1 if compare(args.base, head, args.threshold, args.store) else 0)
+    else:
+        print(json.dumps(run_case(args.name, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
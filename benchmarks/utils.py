@@ -0,0 +1,29 @@
+"""
+Helpers shared by the benchmarks. The benchmarks are run as scripts (e.g. python benchmarks/suite.py), so this module
+is imported from the folder of the script.
+"""
+
+import importlib.util
+import os
+
+examples_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+
+
+def load_example(relative_path: str):
+    """
+    Import an example as a module
+
+    Parameters
+    ----------
+    relative_path: str
+        The path of the example relative to the examples folder
+
+    Returns
+    -------
+    The imported module
+    """
+
+    spec = importlib.util.spec_from_file_location("example", os.path.join(examples_folder, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -27,6 +27,10 @@ NonLinearProgram
     A nonlinear program that describes a phase in the ocp
 Solution
     Data manipulation, showing and storage
+SolutionFile
+    Partial (memory mapped) reading of a solution saved in the compact format (*.npz)
+IterationReader
+    Replay of the iterates recorded during an optimization (see the 'record_iterations' option of Ipopt)
 
 
 # --- Some useful options --- #
@@ -38,6 +42,8 @@ InterpolationType
     Selection of valid type of interpolation
 OdeSolver
     Selection of valid integrator
+WarmStart
+    Selection of valid warm start strategies of the receding horizon optimizations
 PlotType
     Selection of valid plots
 Solver
@@ -157,5 +163,8 @@ from .misc.mapping import BiMapping, Mapping
 from .optimization.non_linear_program import NonLinearProgram
 from .optimization.optimal_control_program import OptimalControlProgram
 from .optimization.receding_horizon_optimization import MovingHorizonEstimator, NonlinearModelPredictiveControl
+from .optimization.warm_start import WarmStart
 from .optimization.parameters import ParameterList
 from .optimization.solution import Solution
+from .optimization.solution_file import SolutionFile
+from .interfaces.iteration_recorder import IterationReader
@@ -0,0 +1,173 @@
+from typing import Union, Callable, Any
+import hashlib
+import os
+
+import numpy as np
+from casadi import Function
+
+from . import dynamics_functions
+from ..misc.mapping import Mapping, BiMapping
+
+
+class FunctionCache:
+    """
+    A persistent cache of the expanded CasADi functions of the dynamics. Building and expanding the dynamics of a
+    large model is a significant part of the construction of an ocp. Since these functions only depend on the model,
+    the dynamics, the mappings and the versions of the libraries, they are serialized once to a folder and loaded back
+    the next time an identical phase is built (e.g. when the same ocp is prepared again or loaded from a file)
+
+    Attributes
+    ----------
+    folder: str
+        The folder where the functions are stored. The cache is disabled if it is None
+
+    Methods
+    -------
+    key(self, nlp: NonLinearProgram, name: str, dyn_func: Callable, version: dict) -> Union[str, None]
+        Compute the key of a function of a phase
+    load(self, key: Union[str, None]) -> Union[Function, None]
+        Load a function from the cache
+    save(self, key: Union[str, None], function: Function)
+        Save a function in the cache
+    __to_plain(obj: Any) -> Any
+        Convert the mappings and the numpy arrays of an object to plain python types
+    """
+
+    def __init__(self, folder: str = None):
+        """
+        Parameters
+        ----------
+        folder: str
+            The folder where the functions are stored. The cache is disabled if it is None
+        """
+
+        self.folder = folder
+
+    def key(self, nlp, name: str, dyn_func: Callable, version: dict) -> Union[str, None]:
+        """
+        Compute the key of a function of a phase. It is a hash of the content of the bioMod file, of the dynamics
+        function, of the dynamics parameters, of the mappings, of the size of the variables, of the source of the
+        bioptim dynamics and of the version of casadi, biorbd and bioptim. User code (custom dynamics, parameters with a
+        function that modifies the model) and external forces cannot be hashed reliably, so these phases are not cached
+
+        Parameters
+        ----------
+        nlp: NonLinearProgram
+            A reference to the phase
+        name: str
+            The name of the function
+        dyn_func: Callable
+            The function that builds the symbolic expression
+        version: dict
+            The versions of casadi, biorbd and bioptim
+
+        Returns
+        -------
+        The key of the function or None if the function cannot be cached
+        """
+
+        if self.folder is None:
+            return None
+        if getattr(dyn_func, "__module__", None) != dynamics_functions.__name__:
+            return None
+        if nlp.dynamics_type.dynamic_function is not None or nlp.external_forces:
+            return None
+        if any(param.function for param in nlp.parameters):
+            return None
+
+        model_path = nlp.model.path().absolutePath().to_string()
+        if not os.path.isfile(model_path):
+            return None
+
+        sha = hashlib.sha256()
+        with open(model_path, "rb") as file:
+            sha.update(file.read())
+        with open(dynamics_functions.__file__, "rb") as file:
+            sha.update(file.read())
+        for value in (
+            name,
+            dyn_func.__qualname__,
+            nlp.dynamics_type.type.name,
+            sorted(nlp.dynamics_type.params.items()),
+            self.__to_plain(nlp.mapping),
+            nlp.shape,
+            nlp.var_states,
+            nlp.var_controls,
+            (nlp.nx, nlp.nu, nlp.np),
+            sorted(version.items()),
+        ):
+            sha.update(repr(value).encode())
+        return sha.hexdigest()
+
+    def load(self, key: Union[str, None]) -> Union[Function, None]:
+        """
+        Load a function from the cache
+
+        Parameters
+        ----------
+        key: Union[str, None]
+            The key of the function (see key)
+
+        Returns
+        -------
+        The function or None if it is not in the cache
+        """
+
+        if key is None:
+            return None
+        path = os.path.join(self.folder, f"{key}.casadi")
+        if not os.path.isfile(path):
+            return None
+        try:
+            return Function.load(path)
+        except RuntimeError:
+            # A corrupted or incompatible file is simply rebuilt
+            return None
+
+    def save(self, key: Union[str, None], function: Function):
+        """
+        Save a function in the cache. The file is written under a temporary name and then renamed, so concurrent
+        builds never read a partially written function
+
+        Parameters
+        ----------
+        key: Union[str, None]
+            The key of the function (see key). Nothing is saved if it is None
+        function: Function
+            The function to save
+        """
+
+        if key is None:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{key}.casadi")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        function.save(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def __to_plain(obj: Any) -> Any:
+        """
+        Convert the mappings and the numpy arrays of an object to plain python types
+
+        Parameters
+        ----------
+        obj: Any
+            The object to convert
+
+        Returns
+        -------
+        The converted object, which has a repr that does not depend on the memory addresses
+        """
+
+        if isinstance(obj, BiMapping):
+            return FunctionCache.__to_plain(obj.to_second), FunctionCache.__to_plain(obj.to_first)
+        if isinstance(obj, Mapping):
+            return FunctionCache.__to_plain(obj.map_idx)
+        if isinstance(obj, dict):
+            return sorted((str(key), FunctionCache.__to_plain(value)) for key, value in obj.items())
+        if isinstance(obj, (list, tuple, range, np.ndarray)):
+            return [FunctionCache.__to_plain(value) for value in obj]
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return obj
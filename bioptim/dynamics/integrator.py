@@ -41,6 +41,8 @@ class Integrator:
     -------
     map(self, *args, **kwargs) -> Function
         Get the multithreaded CasADi graph of the integration
+    mapaccum(self, *args, **kwargs) -> Function
+        Get the CasADi graph of the integration chained over successive intervals
     get_u(self, u: np.ndarray, dt_norm: float) -> np.ndarray
         Get the control at a given time
     dxdt(self, h: float, states: Union[MX, SX], controls: Union[MX, SX], params: Union[MX, SX]) -> tuple[SX, list[SX]]
@@ -86,6 +88,17 @@ class Integrator:
         """
         return self.function.map(*args, **kwargs)
 
+    def mapaccum(self, *args, **kwargs) -> Function:
+        """
+        Get the CasADi graph of the integration chained over successive intervals, the final state of an interval
+        being the initial state of the next one
+
+        Returns
+        -------
+        The chained CasADi graph of the integration
+        """
+        return self.function.mapaccum(*args, **kwargs)
+
     def get_u(self, u: np.ndarray, dt_norm: float) -> np.ndarray:
         """
         Get the control at a given time
@@ -21,7 +21,8 @@ class OdeSolverBase:
         The interface of the OdeSolver to the corresponding integrator
     @staticmethod
     prepare_dynamic_integrator(ocp, nlp)
-        Properly set the integration in an nlp
+        Properly set the integration in an nlp. If all the nodes share the same integrator, a mapped version over
+        all the nodes (multithreaded if n_threads > 1) and a chained version are also prepared
     """
 
     def __init__(self):
@@ -60,9 +61,14 @@ class OdeSolverBase:
         """
 
         nlp.dynamics = nlp.ode_solver.integrator(ocp, nlp)
+        nlp.par_dynamics = None
+        nlp.accum_dynamics = None
         if len(nlp.dynamics) == 1:
             if ocp.n_threads > 1:
                 nlp.par_dynamics = nlp.dynamics[0].map(nlp.ns, "thread", ocp.n_threads)
+            else:
+                nlp.par_dynamics = nlp.dynamics[0].map(nlp.ns, "serial")
+            nlp.accum_dynamics = nlp.dynamics[0].mapaccum("integrator_accum", nlp.ns, [0], [0])
             nlp.dynamics = nlp.dynamics * nlp.ns
 
 
@@ -103,9 +109,6 @@ class RK(OdeSolverBase):
         A list of integrators
         """
 
-        if ocp.n_threads > 1 and nlp.control_type == ControlType.LINEAR_CONTINUOUS:
-            raise RuntimeError("Piece-wise linear continuous controls cannot be used with multiple threads")
-
         ode_opt = {
             "t0": 0,
             "tf": nlp.dt,
@@ -209,9 +212,6 @@ class OdeSolver:
             A list of integrators
             """
 
-            if ocp.n_threads > 1 and nlp.control_type == ControlType.LINEAR_CONTINUOUS:
-                raise RuntimeError("Piece-wise linear continuous controls cannot be used with multiple threads")
-
             if ocp.cx is casadi.SX:
                 raise NotImplementedError("use_sx=True and OdeSolver.IRK are not yet compatible")
 
@@ -587,6 +587,11 @@ class Problem:
         nlp.np = sum([p.size for p in nlp.parameters])
         mx_symbolic_params = MX.sym("p", nlp.np, 1)
 
+        key = ocp.function_cache.key(nlp, "ForwardDyn", dyn_func, ocp.version)
+        nlp.dynamics_func = ocp.function_cache.load(key)
+        if nlp.dynamics_func is not None:
+            return
+
         dynamics = dyn_func(mx_symbolic_states, mx_symbolic_controls, mx_symbolic_params, nlp)
         if isinstance(dynamics, (list, tuple)):
             dynamics = vertcat(*dynamics)
@@ -597,6 +602,7 @@ class Problem:
             ["x", "u", "p"],
             ["xdot"],
         ).expand()
+        ocp.function_cache.save(key, nlp.dynamics_func)
 
     @staticmethod
     def configure_contact(ocp, nlp, dyn_func: Callable):
@@ -613,16 +619,20 @@ class Problem:
             The function to get the values of contact forces from the dynamics
         """
 
-        symbolic_states = MX.sym("x", nlp.nx, 1)
-        symbolic_controls = MX.sym("u", nlp.nu, 1)
-        symbolic_param = MX.sym("p", nlp.np, 1)
-        nlp.contact_forces_func = Function(
-            "contact_forces_func",
-            [symbolic_states, symbolic_controls, symbolic_param],
-            [dyn_func(symbolic_states, symbolic_controls, symbolic_param, nlp)],
-            ["x", "u", "p"],
-            ["contact_forces"],
-        ).expand()
+        key = ocp.function_cache.key(nlp, "contact_forces_func", dyn_func, ocp.version)
+        nlp.contact_forces_func = ocp.function_cache.load(key)
+        if nlp.contact_forces_func is None:
+            symbolic_states = MX.sym("x", nlp.nx, 1)
+            symbolic_controls = MX.sym("u", nlp.nu, 1)
+            symbolic_param = MX.sym("p", nlp.np, 1)
+            nlp.contact_forces_func = Function(
+                "contact_forces_func",
+                [symbolic_states, symbolic_controls, symbolic_param],
+                [dyn_func(symbolic_states, symbolic_controls, symbolic_param, nlp)],
+                ["x", "u", "p"],
+                ["contact_forces"],
+            ).expand()
+            ocp.function_cache.save(key, nlp.contact_forces_func)
 
         all_contact_names = []
         for elt in ocp.nlp:
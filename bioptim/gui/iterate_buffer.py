@@ -0,0 +1,212 @@
+from typing import Union
+import weakref
+
+import numpy as np
+from casadi import DM
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover, shared_memory is only available from python 3.8
+    shared_memory = None
+
+
+class IterateBuffer:
+    """
+    A ring buffer of optimization vectors in shared memory, used to send the iterates of the solver to another process
+    without pickling them. The writer never waits: it writes each iterate in the next slot and the readers only ever
+    look at the newest one (latest wins), so the iterates a reader was too slow to see are simply dropped. Each slot
+    carries the number of the iterate it holds, which is invalidated while the slot is written, so a reader can tell if
+    the vector it read in place was overwritten in the meantime
+
+    Attributes
+    ----------
+    n_elements: int
+        The number of elements of an optimization vector
+    n_slots: int
+        The number of slots of the ring. A reader has n_slots - 1 iterates of margin before the slot it reads is reused
+    name: str
+        The name of the shared memory block, used to attach to it from another process
+    owner: bool
+        If this instance created the shared memory block (and is therefore responsible to free it)
+    __memory: shared_memory.SharedMemory
+        The shared memory block
+    __counter: np.ndarray
+        The number of iterates written so far (view on the shared memory)
+    __sequences: np.ndarray
+        The number of the iterate held by each slot, 0 while the slot is being written (view on the shared memory)
+    __data: np.ndarray
+        The iterates, one row per slot (view on the shared memory)
+
+    Methods
+    -------
+    write(self, v: Union[np.ndarray, DM])
+        Write an iterate in the next slot
+    latest(self, last_read: int = 0) -> tuple
+        Get the newest iterate, without copying it
+    is_valid(self, index: int) -> bool
+        Check that an iterate previously returned by latest was not overwritten since
+    close(self)
+        Detach from the shared memory block (and free it if this instance owns it)
+    __attach(self, name: str = None)
+        Create or attach to the shared memory block and declare the views on it
+    __unlink(memory: shared_memory.SharedMemory)
+        Free a shared memory block, if it was not already freed
+    """
+
+    def __init__(self, n_elements: int, n_slots: int = 4):
+        """
+        Parameters
+        ----------
+        n_elements: int
+            The number of elements of an optimization vector
+        n_slots: int
+            The number of slots of the ring
+        """
+
+        if shared_memory is None:
+            raise RuntimeError("Sharing the iterates between processes requires python 3.8 or later")
+        if n_slots < 2:
+            raise ValueError("n_slots must be at least 2")
+
+        self.n_elements = n_elements
+        self.n_slots = n_slots
+        self.owner = True
+        self.__attach()
+        self.__counter[0] = 0
+        self.__sequences[:] = 0
+        weakref.finalize(self, IterateBuffer.__unlink, self.__memory)
+
+    def __getstate__(self) -> dict:
+        """
+        Only send the name of the shared memory block to the other processes, they attach to it when unpickled
+
+        Returns
+        -------
+        The state to pickle
+        """
+
+        return {"name": self.name, "n_elements": self.n_elements, "n_slots": self.n_slots}
+
+    def __setstate__(self, state: dict):
+        """
+        Attach to the shared memory block created by the owner
+
+        Parameters
+        ----------
+        state: dict
+            The pickled state (see __getstate__)
+        """
+
+        self.n_elements = state["n_elements"]
+        self.n_slots = state["n_slots"]
+        self.owner = False
+        self.__attach(state["name"])
+
+    def __attach(self, name: str = None):
+        """
+        Create or attach to the shared memory block and declare the views on it. The block holds the counter, the
+        number of the iterate of each slot and then the slots themselves
+
+        Parameters
+        ----------
+        name: str
+            The name of the block to attach to. A new block is created if it is None
+        """
+
+        n_header = 1 + self.n_slots
+        size = 8 * (n_header + self.n_slots * self.n_elements)
+        if name is None:
+            self.__memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.__memory = shared_memory.SharedMemory(name=name)
+        self.name = self.__memory.name
+
+        header = np.ndarray((n_header,), dtype=np.int64, buffer=self.__memory.buf)
+        self.__counter = header[:1]
+        self.__sequences = header[1:]
+        self.__data = np.ndarray(
+            (self.n_slots, self.n_elements), dtype=np.float64, buffer=self.__memory.buf, offset=8 * n_header
+        )
+
+    def write(self, v: Union[np.ndarray, DM]):
+        """
+        Write an iterate in the next slot. This never blocks, whatever the readers are doing
+
+        Parameters
+        ----------
+        v: Union[np.ndarray, DM]
+            The optimization vector
+        """
+
+        index = int(self.__counter[0]) + 1
+        slot = (index - 1) % self.n_slots
+        self.__sequences[slot] = 0
+        self.__data[slot, :] = np.asarray(v, dtype=np.float64).reshape(-1)
+        self.__sequences[slot] = index
+        self.__counter[0] = index
+
+    def latest(self, last_read: int = 0) -> tuple:
+        """
+        Get the newest iterate, without copying it. Since the returned array is a view on the shared memory, the
+        reader should call is_valid once it is done with it to make sure it was not overwritten in the meantime
+
+        Parameters
+        ----------
+        last_read: int
+            The number of the last iterate the reader has seen
+
+        Returns
+        -------
+        The number of the newest iterate and a view on it. If there is no iterate newer than last_read (or if the
+        newest one is being written), last_read and None are returned
+        """
+
+        index = int(self.__counter[0])
+        if index == last_read or index == 0:
+            return last_read, None
+        if not self.is_valid(index):
+            return last_read, None
+        return index, self.__data[(index - 1) % self.n_slots]
+
+    def is_valid(self, index: int) -> bool:
+        """
+        Check that an iterate previously returned by latest was not overwritten since
+
+        Parameters
+        ----------
+        index: int
+            The number of the iterate
+
+        Returns
+        -------
+        If the slot still holds this iterate
+        """
+
+        return int(self.__sequences[(index - 1) % self.n_slots]) == index
+
+    def close(self):
+        """
+        Detach from the shared memory block (and free it if this instance owns it). The buffer cannot be used
+        afterward
+        """
+
+        self.__counter, self.__sequences, self.__data = None, None, None
+        self.__memory.close()
+        if self.owner:
+            IterateBuffer.__unlink(self.__memory)
+
+    @staticmethod
+    def __unlink(memory):
+        """
+        Free a shared memory block, if it was not already freed
+
+        Parameters
+        ----------
+        memory: shared_memory.SharedMemory
+            The block to free
+        """
+
+        try:
+            memory.unlink()
+        except FileNotFoundError:
+            pass
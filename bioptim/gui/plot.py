@@ -1,14 +1,23 @@
 from typing import Callable, Union, Any
 import multiprocessing as mp
 from copy import copy
-import tkinter
 from itertools import accumulate
+from time import perf_counter
 
 import numpy as np
-from matplotlib import pyplot as plt, lines
-from matplotlib.ticker import StrMethodFormatter
+
+try:
+    import tkinter
+except ImportError:  # pragma: no cover, tkinter is often missing on headless systems
+    tkinter = None
+try:
+    from matplotlib import pyplot as plt
+    from matplotlib.ticker import StrMethodFormatter
+except ImportError:  # pragma: no cover, matplotlib is only required to plot
+    plt = None
 from casadi import Callback, nlpsol_out, nlpsol_n_out, Sparsity, DM
 
+from .iterate_buffer import IterateBuffer
 from ..limits.path_conditions import Bounds
 from ..misc.enums import PlotType, ControlType, InterpolationType, Shooting
 from ..misc.mapping import Mapping
@@ -146,6 +155,28 @@ class PlotOcp:
         The width of the figure
     ydata: list
         The actual current data to be plotted. It is update by update_data
+    max_update_frequency: float
+        The maximal number of updates per second (no limit if None)
+    update_every: int
+        The number of iterations between two updates
+    use_blit: bool
+        If only the lines should be redrawn on top of a cached background when the axes did not change
+    __last_update_time: float
+        The time of the last update
+    __last_update_iteration: int
+        The iteration of the last update
+    __n_update_requests: int
+        The number of calls to update_data
+    __phase_cache: list
+        The data (states, controls and parameters) and the ydata of each phase at the last update
+    __axes_plots: dict
+        The index in plots of the lines of each axes
+    __figure_lines: list
+        The lines of each figure
+    __backgrounds: list
+        The cached background of each figure, without the lines
+    __full_redraw: bool
+        If the next draw must redraw everything (e.g. the axes changed)
 
     Methods
     -------
@@ -161,12 +192,18 @@ class PlotOcp:
         Finds the intersection between the phases
     show()
         Force the show of the graphs. This is a blocking function
-    update_data(self, v: dict)
+    update_data(self, v: dict, iteration: int = None, force: bool = False, check_update_every: bool = True) -> bool
         Update ydata from the variable a solution structure
+    draw(self)
+        Draw the figures with the current data
+    __is_update_due(self, iteration: int, check_update_every: bool = True) -> bool
+        Check if an update is allowed by the refresh rate
+    __index_lines(self)
+        Find the lines of each axes and of each figure
+    __request_full_redraw(self)
+        Make the next draw redraw everything
     __update_xdata(self)
         Update of the time axes in plots
-    __append_to_ydata(self, data: list)
-        Parse the data list to create a single list of all ydata that will fit the plots vector
     __update_axes(self)
         Update the plotted data from ydata
     __compute_ylim(min_val: Union[np.ndarray, DM], max_val: Union[np.ndarray, DM], factor: float) -> tuple:
@@ -181,6 +218,9 @@ class PlotOcp:
         automatically_organize: bool = True,
         adapt_graph_size_to_bounds: bool = False,
         shooting_type: Shooting = Shooting.MULTIPLE,
+        max_update_frequency: float = None,
+        update_every: int = 1,
+        use_blit: bool = True,
     ):
         """
         Prepares the figures during the simulation
@@ -195,7 +235,15 @@ class PlotOcp:
             If the axes should fit the bounds (True) or the data (False)
         shooting_type: Shooting
             The type of integration method
+        max_update_frequency: float
+            The maximal number of updates per second (no limit if None)
+        update_every: int
+            The number of iterations between two updates
+        use_blit: bool
+            If only the lines should be redrawn on top of a cached background when the axes did not change
         """
+        if plt is None:
+            raise RuntimeError("matplotlib must be installed to plot the ocp")
         for i in range(1, ocp.n_phases):
             if ocp.nlp[0].shape["q"] != ocp.nlp[i].shape["q"]:
                 raise RuntimeError("Graphs with nbQ different at each phase is not implemented yet")
@@ -213,6 +261,18 @@ class PlotOcp:
         self.ydata = []
         self.ns = 0
 
+        if max_update_frequency is not None and max_update_frequency <= 0:
+            raise ValueError("max_update_frequency must be positive")
+        if update_every < 1:
+            raise ValueError("update_every must be at least 1")
+        self.max_update_frequency = max_update_frequency
+        self.update_every = update_every
+        self.use_blit = use_blit
+        self.__last_update_time = None
+        self.__last_update_iteration = None
+        self.__n_update_requests = 0
+        self.__phase_cache = [None] * self.ocp.n_phases
+
         self.t = []
         self.t_integrated = []
         if isinstance(self.ocp.original_phase_time, (int, float)):
@@ -245,6 +305,14 @@ class PlotOcp:
         self.__create_plots()
         self.shooting_type = shooting_type
 
+        self.__axes_plots = {}
+        self.__figure_lines = []
+        self.__index_lines()
+        self.__backgrounds = [None] * len(self.all_figures)
+        self.__full_redraw = True
+        for fig in self.all_figures:
+            fig.canvas.mpl_connect("resize_event", lambda event: self.__request_full_redraw())
+
         horz = 0
         vert = 1 if len(self.all_figures) < self.n_vertical_windows * self.n_horizontal_windows else 0
         for i, fig in enumerate(self.all_figures):
@@ -361,8 +429,8 @@ class PlotOcp:
                             y_max = nlp.plot[variable].bounds.max[ctr].max()
                         else:
                             nlp.plot[variable].bounds.check_and_adjust_dimensions(len(mapping), nlp.ns)
-                            y_min = min([nlp.plot[variable].bounds.min.evaluate_at(j)[k] for j in range(nlp.ns)])
-                            y_max = max([nlp.plot[variable].bounds.max.evaluate_at(j)[k] for j in range(nlp.ns)])
+                            y_min = nlp.plot[variable].bounds.min.evaluate_all(nlp.ns - 1)[k].min()
+                            y_max = nlp.plot[variable].bounds.max.evaluate_all(nlp.ns - 1)[k].max()
                         y_range, _ = self.__compute_ylim(y_min, y_max, 1.25)
                         ax.set_ylim(y_range)
                     zero = np.zeros((t.shape[0], 1))
@@ -413,8 +481,8 @@ class PlotOcp:
                         else:
                             ns = nlp.ns
                         nlp.plot[variable].bounds.check_and_adjust_dimensions(n_elements=len(mapping), n_shooting=ns)
-                        bounds_min = np.array([nlp.plot[variable].bounds.min.evaluate_at(k)[j] for k in range(ns + 1)])
-                        bounds_max = np.array([nlp.plot[variable].bounds.max.evaluate_at(k)[j] for k in range(ns + 1)])
+                        bounds_min = nlp.plot[variable].bounds.min.evaluate_all(ns)[j]
+                        bounds_max = nlp.plot[variable].bounds.max.evaluate_all(ns)[j]
                         if bounds_min.shape[0] == nlp.ns:
                             bounds_min = np.concatenate((bounds_min, [bounds_min[-1]]))
                             bounds_max = np.concatenate((bounds_max, [bounds_max[-1]]))
@@ -477,6 +545,9 @@ class PlotOcp:
         """
 
         self.n_vertical_windows, self.n_horizontal_windows = PlotOcp._generate_windows_size(n_windows)
+        if tkinter is None:
+            # The size of the screen is unknown, the figures are left where the backend puts them
+            self.automatically_organize = False
         if self.automatically_organize:
             height = tkinter.Tk().winfo_screenheight()
             width = tkinter.Tk().winfo_screenwidth()
@@ -499,21 +570,37 @@ class PlotOcp:
 
         plt.show()
 
-    def update_data(self, v: dict):
+    def update_data(self, v: dict, iteration: int = None, force: bool = False, check_update_every: bool = True) -> bool:
         """
-        Update ydata from the variable a solution structure
+        Update ydata from the variable a solution structure. The update is skipped if it comes too early according to
+        max_update_frequency and update_every. The phases whose states, controls and parameters did not change since
+        the previous update are not recomputed
 
         Parameters
         ----------
         v: dict
             The data to parse
+        iteration: int
+            The iteration v comes from, used by update_every. If it is None, the calls to update_data are counted
+            instead
+        force: bool
+            If the update should be done whatever the refresh rate
+        check_update_every: bool
+            If update_every should be checked (max_update_frequency is always checked, unless force is True)
+
+        Returns
+        -------
+        If ydata was updated
         """
 
-        self.ydata = []
+        self.__n_update_requests += 1
+        iteration = self.__n_update_requests if iteration is None else iteration
+        if not force and not self.__is_update_due(iteration, check_update_every):
+            return False
+        self.__last_update_time = perf_counter()
+        self.__last_update_iteration = iteration
 
         sol = Solution(self.ocp, v)
-        data_states = sol.integrate(continuous=False, shooting_type=self.shooting_type, keepdims=False).states
-        data_controls = sol.controls
         data_params = sol.parameters
         data_params_in_dyn = np.array([data_params[key] for key in data_params if key != "time"]).squeeze()
 
@@ -523,7 +610,31 @@ class PlotOcp:
                     self.tf[i_in_tf] = data_params["time"][i_in_time]
             self.__update_xdata()
 
+        all_states = sol.states if isinstance(sol.states, (list, tuple)) else [sol.states]
+        all_controls = sol.controls if isinstance(sol.controls, (list, tuple)) else [sol.controls]
+        has_changed = []
+        for i in range(len(self.ocp.nlp)):
+            key = np.concatenate(
+                (
+                    np.array(all_states[i]["all"]).reshape(-1),
+                    np.array(all_controls[i]["all"]).reshape(-1),
+                    np.array(data_params["all"]).reshape(-1),
+                )
+            )
+            has_changed.append(self.__phase_cache[i] is None or not np.array_equal(self.__phase_cache[i][0], key))
+            if has_changed[-1]:
+                self.__phase_cache[i] = [key, None]
+
+        if any(has_changed):
+            data_states = sol.integrate(continuous=False, shooting_type=self.shooting_type, keepdims=False).states
+            data_controls = sol.controls
+
+        self.ydata = []
         for i, nlp in enumerate(self.ocp.nlp):
+            if not has_changed[i]:
+                self.ydata += self.__phase_cache[i][1]
+                continue
+
             step_size = nlp.ode_solver.steps + 1
             n_elements = nlp.ns * step_size + 1
 
@@ -547,25 +658,39 @@ class PlotOcp:
             else:
                 raise NotImplementedError(f"Plotting {nlp.control_type} is not implemented yet")
 
+            ydata_phase = []
             for key in self.variable_sizes[i]:
                 if self.plot_func[key][i].type == PlotType.INTEGRATED:
                     all_y = []
-                    for idx, t in enumerate(self.t_integrated[i]):
-                        y_tp = np.empty((self.variable_sizes[i][key], len(t)))
-                        y_tp.fill(np.nan)
-                        y_tp[:, :] = self.plot_func[key][i].function(
-                            state[:, step_size * idx : step_size * (idx + 1)],
-                            control[:, idx : idx + u_mod],
+                    if nlp.control_type == ControlType.CONSTANT:
+                        # All the integration steps are evaluated at once, each receiving the control of its interval
+                        y = np.empty((self.variable_sizes[i][key], nlp.ns * step_size))
+                        y.fill(np.nan)
+                        y[:, :] = self.plot_func[key][i].function(
+                            state[:, :-1],
+                            np.repeat(control[:, : nlp.ns], step_size, axis=1),
                             data_params_in_dyn,
                             **self.plot_func[key][i].parameters,
                         )
-                        all_y.append(y_tp)
+                        for idx in range(len(self.t_integrated[i])):
+                            all_y.append(y[:, step_size * idx : step_size * (idx + 1)])
+                    else:
+                        for idx, t in enumerate(self.t_integrated[i]):
+                            y_tp = np.empty((self.variable_sizes[i][key], len(t)))
+                            y_tp.fill(np.nan)
+                            y_tp[:, :] = self.plot_func[key][i].function(
+                                state[:, step_size * idx : step_size * (idx + 1)],
+                                control[:, idx : idx + u_mod],
+                                data_params_in_dyn,
+                                **self.plot_func[key][i].parameters,
+                            )
+                            all_y.append(y_tp)
 
                     for idx in range(len(self.plot_func[key][i].phase_mappings.map_idx)):
                         y_tp = []
                         for y in all_y:
                             y_tp.append(y[idx, :])
-                        self.__append_to_ydata([y_tp])
+                        ydata_phase.append(y_tp)
                 else:
                     y = np.empty((self.variable_sizes[i][key], len(self.t[i])))
                     y.fill(np.nan)
@@ -579,8 +704,88 @@ class PlotOcp:
                             f"{self.plot_func[key][i].function(state[:, ::step_size], control, data_params_in_dyn, ** self.plot_func[key][i].parameters).shape}"
                             f", but expected {y.shape}"
                         )
-                    self.__append_to_ydata(y)
+                    ydata_phase += list(y)
+
+            self.__phase_cache[i][1] = ydata_phase
+            self.ydata += ydata_phase
         self.__update_axes()
+        return True
+
+    def draw(self):
+        """
+        Draw the figures with the current data. When the canvas supports it and the axes did not change since the
+        previous draw, only the lines are redrawn on top of the cached background of the figure (blitting)
+        """
+
+        for i, fig in enumerate(self.all_figures):
+            canvas = fig.canvas
+            if not (self.use_blit and getattr(canvas, "supports_blit", False)):
+                canvas.draw()
+                continue
+
+            if self.__full_redraw or self.__backgrounds[i] is None:
+                for line in self.__figure_lines[i]:
+                    line.set_visible(False)
+                canvas.draw()
+                self.__backgrounds[i] = canvas.copy_from_bbox(fig.bbox)
+                for line in self.__figure_lines[i]:
+                    line.set_visible(True)
+            else:
+                canvas.restore_region(self.__backgrounds[i])
+            for line in self.__figure_lines[i]:
+                line.axes.draw_artist(line)
+            canvas.blit(fig.bbox)
+            canvas.flush_events()
+        self.__full_redraw = False
+
+    def __is_update_due(self, iteration: int, check_update_every: bool = True) -> bool:
+        """
+        Check if an update is allowed by the refresh rate
+
+        Parameters
+        ----------
+        iteration: int
+            The iteration of the requested update
+        check_update_every: bool
+            If update_every should be checked
+
+        Returns
+        -------
+        If the update should be done
+        """
+
+        if (
+            check_update_every
+            and self.__last_update_iteration is not None
+            and iteration - self.__last_update_iteration < self.update_every
+        ):
+            return False
+        if (
+            self.max_update_frequency is not None
+            and self.__last_update_time is not None
+            and perf_counter() - self.__last_update_time < 1 / self.max_update_frequency
+        ):
+            return False
+        return True
+
+    def __index_lines(self):
+        """
+        Find the lines of each axes (to compute the ylim from ydata) and of each figure (to blit them)
+        """
+
+        self.__axes_plots = {}
+        self.__figure_lines = [[] for _ in self.all_figures]
+        for i, plot in enumerate(self.plots):
+            all_lines = plot[2] if plot[0] == PlotType.INTEGRATED else [plot[2]]
+            self.__axes_plots.setdefault(all_lines[0].axes, []).append(i)
+            self.__figure_lines[self.all_figures.index(all_lines[0].figure)] += all_lines
+
+    def __request_full_redraw(self):
+        """
+        Make the next draw redraw everything, including the cached backgrounds
+        """
+
+        self.__full_redraw = True
 
     def __update_xdata(self):
         """
@@ -588,6 +793,9 @@ class PlotOcp:
         """
 
         self.__update_time_vector()
+        if self.t_idx_to_optimize:
+            # The x axes change with the optimized time, so the cached backgrounds are outdated
+            self.__full_redraw = True
         for plot in self.plots:
             phase_idx = plot[1]
             if plot[0] == PlotType.INTEGRATED:
@@ -612,19 +820,6 @@ class PlotOcp:
                 for i, time in enumerate(intersections_time):
                     self.plots_vertical_lines[p * n + i].set_xdata([time, time])
 
-    def __append_to_ydata(self, data: Union[list, np.ndarray]):
-        """
-        Parse the data list to create a single list of all ydata that will fit the plots vector
-
-        Parameters
-        ----------
-        data: list
-            The data list to copy
-        """
-
-        for y in data:
-            self.ydata.append(y)
-
     def __update_axes(self):
         """
         Update the plotted data from ydata
@@ -640,20 +835,22 @@ class PlotOcp:
             else:
                 plot[2].set_ydata(y)
 
-        for p in self.plots_vertical_lines:
-            p.set_ydata((np.nan, np.nan))
-
         for key in self.axes:
             if (not self.adapt_graph_size_to_bounds) or (self.axes[key][0].bounds is None):
                 for i, ax in enumerate(self.axes[key][1]):
                     if not self.axes[key][0].ylim:
+                        # The range is computed from ydata (lines containing nan are ignored)
                         y_max = -np.inf
                         y_min = np.inf
-                        for p in ax.get_children():
-                            if isinstance(p, lines.Line2D):
-                                y_min = min(y_min, np.min(p.get_ydata()))
-                                y_max = max(y_max, np.max(p.get_ydata()))
+                        for idx in self.__axes_plots.get(ax, []):
+                            y = self.ydata[idx]
+                            if self.plots[idx][0] == PlotType.INTEGRATED:
+                                y = np.concatenate(y)
+                            y_min = min(y_min, np.min(y))
+                            y_max = max(y_max, np.max(y))
                         y_range, data_range = self.__compute_ylim(y_min, y_max, 1.25)
+                        if np.allclose(ax.get_ylim(), y_range):
+                            continue
                         ax.set_ylim(y_range)
                         ax.set_yticks(
                             np.arange(
@@ -662,9 +859,7 @@ class PlotOcp:
                                 step=data_range / 4,
                             )
                         )
-
-        for p in self.plots_vertical_lines:
-            p.set_ydata((0, 1))
+                        self.__full_redraw = True
 
         for fig in self.all_figures:
             fig.set_tight_layout(True)
@@ -730,8 +925,8 @@ class OnlineCallback(Callback):
         The number of optimization variables
     ng: int
         The number of constraints
-    queue: mp.Queue
-        The multiprocessing queue
+    buffer: IterateBuffer
+        The shared memory ring buffer the iterates are written to. The plotter process only reads the newest one
     plotter: ProcessPlotter
         The callback for plotting for the multiprocessing
     plot_process: mp.Process
@@ -753,7 +948,7 @@ class OnlineCallback(Callback):
         Send the current data to the plotter
     """
 
-    def __init__(self, ocp, opts: dict = {}):
+    def __init__(self, ocp, opts: dict = {}, show_options: dict = None):
         """
         Parameters
         ----------
@@ -761,6 +956,8 @@ class OnlineCallback(Callback):
             A reference to the ocp to show
         opts: dict
             Option to AnimateCallback method of CasADi
+        show_options: dict
+            The options sent to the PlotOcp of the plotter process
         """
         Callback.__init__(self)
         self.ocp = ocp
@@ -768,9 +965,9 @@ class OnlineCallback(Callback):
         self.ng = 0
         self.construct("AnimateCallback", opts)
 
-        self.queue = mp.Queue()
-        self.plotter = self.ProcessPlotter(self.ocp)
-        self.plot_process = mp.Process(target=self.plotter, args=(self.queue,), daemon=True)
+        self.buffer = IterateBuffer(self.nx)
+        self.plotter = self.ProcessPlotter(self.ocp, show_options)
+        self.plot_process = mp.Process(target=self.plotter, args=(self.buffer,), daemon=True)
         self.plot_process.start()
 
     @staticmethod
@@ -852,7 +1049,8 @@ class OnlineCallback(Callback):
 
     def eval(self, arg: Union[list, tuple]) -> list:
         """
-        Send the current data to the plotter
+        Send the current data to the plotter. The iterate is copied in the shared memory, which never blocks the
+        solver, however slow the plotter is
 
         Parameters
         ----------
@@ -863,8 +1061,8 @@ class OnlineCallback(Callback):
         -------
         A list of error index
         """
-        send = self.queue.put
-        send(arg[0])
+
+        self.buffer.write(arg[0])
         return [0]
 
     class ProcessPlotter(object):
@@ -875,42 +1073,78 @@ class OnlineCallback(Callback):
         ----------
         ocp: OptimalControlProgram
             A reference to the ocp to show
-        pipe: mp.Queue
-            The multiprocessing queue to evaluate
+        show_options: dict
+            The options sent to the PlotOcp
+        buffer: IterateBuffer
+            The shared memory ring buffer to read the iterates from
+        last_read: int
+            The number of the last iterate that was plotted
+        force_next: bool
+            If the next iterate should be plotted whatever the refresh rate (the previous one was overwritten while
+            it was read)
+        first_iterate: tuple
+            The number of the first iterate received and the time it was received, to measure the time between two
+            iterates
+        pending: int
+            The number of the newest iterate received (which is not plotted yet if it is newer than last_read)
+        pending_since: float
+            The time the pending iterate was received
         plot: PlotOcp
             The handler on all the figures
 
         Methods
         -------
+        setup(self, buffer: IterateBuffer)
+            Create the figures and attach to the buffer of the iterates
         callback(self) -> bool
             The callback to update the graphs
         """
 
-        def __init__(self, ocp):
+        def __init__(self, ocp, show_options: dict = None):
             """
             Parameters
             ----------
             ocp: OptimalControlProgram
                 A reference to the ocp to show
+            show_options: dict
+                The options sent to the PlotOcp
             """
 
             self.ocp = ocp
+            self.show_options = {} if show_options is None else show_options
 
-        def __call__(self, pipe: mp.Queue):
+        def __call__(self, buffer: IterateBuffer):
             """
             Parameters
             ----------
-            pipe: mp.Queue
-                The multiprocessing queue to evaluate
+            buffer: IterateBuffer
+                The shared memory ring buffer to read the iterates from
             """
 
-            self.pipe = pipe
-            self.plot = PlotOcp(self.ocp)
+            self.setup(buffer)
             timer = self.plot.all_figures[0].canvas.new_timer(interval=10)
             timer.add_callback(self.callback)
             timer.start()
             plt.show()
 
+        def setup(self, buffer: IterateBuffer):
+            """
+            Create the figures and attach to the buffer of the iterates
+
+            Parameters
+            ----------
+            buffer: IterateBuffer
+                The shared memory ring buffer to read the iterates from
+            """
+
+            self.buffer = buffer
+            self.last_read = 0
+            self.force_next = False
+            self.first_iterate = None
+            self.pending = 0
+            self.pending_since = None
+            self.plot = PlotOcp(self.ocp, **self.show_options)
+
         def callback(self) -> bool:
             """
             The callback to update the graphs
@@ -919,9 +1153,32 @@ class OnlineCallback(Callback):
             -------
             True if everything went well
             """
-            while not self.pipe.empty():
-                V = self.pipe.get()
-                self.plot.update_data(V)
-            for i, fig in enumerate(self.plot.all_figures):
-                fig.canvas.draw()
+
+            # Only the newest iterate is plotted, the ones that were written in between are dropped
+            index, v = self.buffer.latest(self.last_read)
+            if v is None:
+                return True
+
+            now = perf_counter()
+            if index != self.pending:
+                if self.first_iterate is None:
+                    self.first_iterate = (index, now)
+                self.pending, self.pending_since = index, now
+            first_index, first_time = self.first_iterate
+            interval = (self.pending_since - first_time) / (index - first_index) if index > first_index else 0
+
+            # An iterate that does not fall on update_every is plotted anyway once the next ones are overdue (for
+            # instance when the solver stopped), so the last iterate is always shown
+            stalled = now - self.pending_since > self.plot.update_every * interval
+            if not self.plot.update_data(v, iteration=index, force=self.force_next, check_update_every=not stalled):
+                # Too early according to the refresh rate, the next call retries with the newest iterate
+                return True
+            if not self.buffer.is_valid(index):
+                # The iterate was overwritten while it was read, the next call plots the newer one instead
+                self.force_next = True
+                return True
+
+            self.force_next = False
+            self.last_read = index
+            self.plot.draw()
             return True
@@ -1,57 +1,91 @@
 from typing import Union
-from datetime import datetime
+from hashlib import sha256
+from inspect import signature
+import json
+import os
 
 import numpy as np
-from scipy import linalg
+import casadi
 from casadi import SX, vertcat, Function
 from acados_template import AcadosModel, AcadosOcp, AcadosOcpSolver
 
-from ..misc.enums import Node
+try:
+    import fcntl
+except ImportError:  # Windows, where concurrent builds are not locked
+    fcntl = None
+
 from .solver_interface import SolverInterface
 from ..limits.objective_functions import ObjectiveFunction
-from ..limits.path_conditions import Bounds
-from ..misc.enums import InterpolationType
-from ..limits.penalty import PenaltyType
+from ..limits.phase_transition import PhaseTransitionFcn
+from ..limits.penalty import PenaltyType, PenaltyFunctionAbstract
 
 
 class AcadosInterface(SolverInterface):
     """
-    The ACADOS solver interface
+    The ACADOS solver interface. The phases of the ocp are stacked in a single horizon (one ACADOS stage per shooting
+    node), the dynamics of each stage being selected by a stage-wise parameter. The costs and the constraints are
+    declared once for all the stages and are switched on or off at each stage by their weights and their bounds
 
     Attributes
     ----------
+    INFINITY: float
+        The value ACADOS considers as infinity, used to release the constraints on the stages they are not declared on
     acados_ocp: AcadosOcp
         The current AcadosOcp reference
     acados_model: AcadosModel
         The current AcadosModel reference
+    compile_folder: str
+        The folder where the generated solvers are cached. Each structure of ocp has its own subfolder
+    phase_offset: list[int]
+        The first stage of each phase
+    stage_phase: np.ndarray
+        The phase of each stage (the first stage of a phase is also the last node of the previous one)
+    stage_node: np.ndarray
+        The node of each stage in its phase
+    time_steps: np.ndarray
+        The duration of each stage
     lagrange_costs: SX
-        The lagrange cost function
+        The cost functions of the stages
     mayer_costs: SX
-        The mayer cost function
+        The cost functions of the last stage
     y_ref = list[np.ndarray]
-        The lagrange targets
-    y_ref_end = list[np.ndarray]
-        The mayer targets
+        The targets of each stage
+    y_ref_end = np.ndarray
+        The targets of the last stage
     params = dict
         All the parameters to optimize
-    W: np.ndarray
-        The Lagrange weights
+    W: list[np.ndarray]
+        The weights of each stage
     W_e: np.ndarray
-        The Mayer weights
+        The weights of the last stage
+    path_cost_blocks: list[dict]
+        The objective function of each block of rows of lagrange_costs, and the stages it is declared on
+    end_cost_blocks: list[dict]
+        The objective function of each block of rows of mayer_costs
+    constraint_blocks: list[dict]
+        The constraint of each block of rows of all_constr and end_constr, and the stages it is declared on
     status: int
         The status of the optimization
     all_constr: SX
-        All the Lagrange constraints
+        The constraints of the stages
     end_constr: SX
-        All the Mayer constraints
-    all_g_bounds = Bounds
-        All the Lagrange bounds on the variables
-    end_g_bounds = Bounds
-        All the Mayer bounds on the variables
+        The constraints of the last stage
+    g_bound_min: np.ndarray
+        The min bounds of all_constr at each stage
+    g_bound_max: np.ndarray
+        The max bounds of all_constr at each stage
+    end_g_bound_min: np.ndarray
+        The min bounds of end_constr
+    end_g_bound_max: np.ndarray
+        The max bounds of end_constr
     x_bound_max = np.ndarray
-        All the bounds max
+        The max bounds of the states (and parameters) at each stage
     x_bound_min = np.ndarray
-        All the bounds min
+        The min bounds of the states (and parameters) at each stage
+    u_bound_max = np.ndarray
+        The max bounds of the controls at each stage
+    u_bound_min = np.ndarray
+        The min bounds of the controls at each stage
     Vu: np.ndarray
         The control objective functions
     Vx: np.ndarray
@@ -65,24 +99,44 @@ class AcadosInterface(SolverInterface):
         Creating a generic ACADOS model
     __prepare_acados(self, ocp: OptimalControlProgram)
         Set some important ACADOS variables
+    __stages(self, phase: int, penalty: PenaltyOption) -> list
+        Find the stage of each node of a penalty
+    __to_model(self, nlp: NonLinearProgram, node: int, val: SX) -> SX
+        Express a penalty declared at a node of a phase with the variables of the ACADOS model
     __set_constr_type(self, constr_type: str = "BGH")
         Set the type of constraints
     __set_constraints(self, ocp: OptimalControlProgram)
         Set the constraints from the ocp
+    __update_constraints(self)
+        Compute the bounds of the constraints, the states and the controls at each stage
     __set_cost_type(self, cost_type: str = "NONLINEAR_LS")
         Set the type of cost functions
     __set_costs(self, ocp: OptimalControlProgram)
         Set the cost functions from ocp
+    __update_costs(self)
+        Compute the weights and the targets of each stage
     __update_solver(self)
         Update the ACADOS solver to new values
+    __set_initial_guess(self)
+        Send the initial guess of the ocp to the ACADOS solver
     configure(self, options: dict)
         Set some ACADOS options
     get_optimized_value(self) -> Union[list[dict], dict]
         Get the previously optimized solution
     solve(self) -> "AcadosInterface"
         Solve the prepared ocp
+    structure_hash(self) -> str
+        Get a hash of the structure of the ocp, which identifies the generated solver
+    build(self)
+        Generate and compile the ACADOS solver, if it is not already created
+    prepare(self)
+        Do the preparation phase of a real-time iteration (SQP_RTI)
+    feedback(self) -> "AcadosInterface"
+        Do the feedback phase of a real-time iteration (SQP_RTI)
     """
 
+    INFINITY = 1e10
+
     def __init__(self, ocp, **solver_options):
         """
         Parameters
@@ -104,6 +158,7 @@ class AcadosInterface(SolverInterface):
             acados_path = solver_options["acados_dir"]
         self.acados_ocp = AcadosOcp(acados_path=acados_path)
         self.acados_model = AcadosModel()
+        self.compile_folder = solver_options.get("compile_folder", "acados_generated_code")
 
         if "cost_type" in solver_options:
             self.__set_cost_type(solver_options["cost_type"])
@@ -118,29 +173,41 @@ class AcadosInterface(SolverInterface):
         self.lagrange_costs = SX()
         self.mayer_costs = SX()
         self.y_ref = []
-        self.y_ref_end = []
+        self.y_ref_end = np.ndarray((0,))
         self.params = None
+        self.phase_offset = []
+        self.stage_phase = np.ndarray((0,), dtype=int)
+        self.stage_node = np.ndarray((0,), dtype=int)
+        self.time_steps = np.ndarray((0,))
         self.__acados_export_model(ocp)
         self.__prepare_acados(ocp)
         self.ocp_solver = None
-        self.W = np.zeros((0, 0))
+        self.W = []
         self.W_e = np.zeros((0, 0))
+        self.path_cost_blocks = []
+        self.end_cost_blocks = []
+        self.constraint_blocks = []
         self.status = None
         self.out = {}
 
-        self.all_constr = None
+        self.all_constr = SX()
         self.end_constr = SX()
-        self.all_g_bounds = Bounds(interpolation=InterpolationType.CONSTANT)
-        self.end_g_bounds = Bounds(interpolation=InterpolationType.CONSTANT)
-        self.x_bound_max = np.ndarray((self.acados_ocp.dims.nx, 3))
-        self.x_bound_min = np.ndarray((self.acados_ocp.dims.nx, 3))
+        self.g_bound_min = np.ndarray((0, self.acados_ocp.dims.N))
+        self.g_bound_max = np.ndarray((0, self.acados_ocp.dims.N))
+        self.end_g_bound_min = np.ndarray((0,))
+        self.end_g_bound_max = np.ndarray((0,))
+        self.x_bound_max = np.ndarray((self.acados_ocp.dims.nx, self.acados_ocp.dims.N + 1))
+        self.x_bound_min = np.ndarray((self.acados_ocp.dims.nx, self.acados_ocp.dims.N + 1))
+        self.u_bound_max = np.ndarray((self.acados_ocp.dims.nu, self.acados_ocp.dims.N))
+        self.u_bound_min = np.ndarray((self.acados_ocp.dims.nu, self.acados_ocp.dims.N))
         self.Vu = np.array([], dtype=np.int64).reshape(0, ocp.nlp[0].nu)
         self.Vx = np.array([], dtype=np.int64).reshape(0, ocp.nlp[0].nx)
         self.Vxe = np.array([], dtype=np.int64).reshape(0, ocp.nlp[0].nx)
 
     def __acados_export_model(self, ocp):
         """
-        Creating a generic ACADOS model
+        Creating a generic ACADOS model. When there is more than one phase, the model has one parameter per phase,
+        which is set to 1 on the stages of this phase (0 otherwise) to select the dynamics of the stage
 
         Parameters
         ----------
@@ -150,7 +217,18 @@ class AcadosInterface(SolverInterface):
         """
 
         if ocp.n_phases > 1:
-            raise NotImplementedError("More than 1 phase is not implemented yet with ACADOS backend")
+            if any(
+                nlp.nx != ocp.nlp[0].nx or nlp.nu != ocp.nlp[0].nu or nlp.np != ocp.nlp[0].np for nlp in ocp.nlp
+            ):
+                raise NotImplementedError(
+                    "All the phases must have the same number of states and controls to be solved with ACADOS"
+                )
+            for pt in ocp.phase_transitions:
+                if pt.type != PhaseTransitionFcn.CONTINUOUS or pt.weight:
+                    raise NotImplementedError(
+                        "ACADOS stacks the phases in a single horizon, so only the PhaseTransitionFcn.CONTINUOUS "
+                        "constraint is implemented"
+                    )
 
         # Declare model variables
         x = ocp.nlp[0].X[0]
@@ -165,7 +243,17 @@ class AcadosInterface(SolverInterface):
         x = vertcat(p, x)
         x_dot = SX.sym("x_dot", x.shape[0], x.shape[1])
 
-        f_expl = vertcat([0] * ocp.nlp[0].np, ocp.nlp[0].dynamics_func(x[ocp.nlp[0].np :, :], u, p))
+        if ocp.n_phases == 1:
+            f_expl = vertcat([0] * ocp.nlp[0].np, ocp.nlp[0].dynamics_func(x[ocp.nlp[0].np :, :], u, p))
+            self.acados_model.p = []
+        else:
+            phase = SX.sym("phase", ocp.n_phases, 1)
+            dynamics = 0
+            for i, nlp in enumerate(ocp.nlp):
+                dynamics += phase[i] * nlp.dynamics_func(x[ocp.nlp[0].np :, :], u, p)
+            f_expl = vertcat([0] * ocp.nlp[0].np, dynamics)
+            self.acados_model.p = phase
+            self.acados_ocp.parameter_values = np.eye(ocp.n_phases)[:, 0]
         f_impl = x_dot - f_expl
 
         self.acados_model.f_impl_expr = f_impl
@@ -175,9 +263,7 @@ class AcadosInterface(SolverInterface):
         self.acados_model.u = u
         self.acados_model.con_h_expr = np.zeros((0, 0))
         self.acados_model.con_h_expr_e = np.zeros((0, 0))
-        self.acados_model.p = []
-        now = datetime.now()  # current date and time
-        self.acados_model.name = f"model_{now.strftime('%Y_%m_%d_%H%M%S%f')[:-4]}"
+        self.acados_model.name = "model"  # Renamed after the structure of the ocp when the solver is built
 
     def __prepare_acados(self, ocp):
         """
@@ -192,13 +278,65 @@ class AcadosInterface(SolverInterface):
         # set model
         self.acados_ocp.model = self.acados_model
 
+        # set the stages, the last node of a phase being the first node of the next one
+        self.phase_offset = [int(sum(nlp.ns for nlp in ocp.nlp[:i])) for i in range(ocp.n_phases)]
+        self.stage_phase = np.concatenate([[i] * nlp.ns for i, nlp in enumerate(ocp.nlp)] + [[ocp.n_phases - 1]])
+        self.stage_node = np.concatenate([range(nlp.ns) for nlp in ocp.nlp] + [[ocp.nlp[-1].ns]]).astype(int)
+        self.time_steps = np.concatenate([[nlp.tf / nlp.ns] * nlp.ns for nlp in ocp.nlp])
+
         # set time
-        self.acados_ocp.solver_options.tf = ocp.nlp[0].tf
+        self.acados_ocp.solver_options.tf = sum([nlp.tf for nlp in ocp.nlp])
+        if ocp.n_phases > 1:
+            self.acados_ocp.solver_options.time_steps = self.time_steps
 
         # set dimensions
         self.acados_ocp.dims.nx = ocp.nlp[0].nx + ocp.nlp[0].np
         self.acados_ocp.dims.nu = ocp.nlp[0].nu
-        self.acados_ocp.dims.N = ocp.nlp[0].ns
+        self.acados_ocp.dims.N = int(sum(nlp.ns for nlp in ocp.nlp))
+
+    def __stages(self, phase: int, penalty) -> list:
+        """
+        Find the stage of each node of a penalty
+
+        Parameters
+        ----------
+        phase: int
+            The phase the penalty is declared in
+        penalty: PenaltyOption
+            The penalty
+
+        Returns
+        -------
+        The stage of each node of the penalty, in the order they were added to the penalty
+        """
+
+        nodes, _, _ = PenaltyFunctionAbstract._get_node(self.ocp.nlp[phase], penalty)
+        return [self.phase_offset[phase] + node for node in nodes]
+
+    def __to_model(self, nlp, node: int, val: SX) -> SX:
+        """
+        Express a penalty declared at a node of a phase with the variables of the ACADOS model
+
+        Parameters
+        ----------
+        nlp: NonLinearProgram
+            The phase the penalty is declared in
+        node: int
+            The node of the phase the penalty is declared at
+        val: SX
+            The penalty
+
+        Returns
+        -------
+        The penalty as a function of the states, controls and parameters of the ACADOS model
+        """
+
+        model = self.ocp.nlp[0]
+        inputs, args = [nlp.X[node], nlp.p], [model.X[0], model.p]
+        if node < len(nlp.U):
+            inputs.append(nlp.U[node])
+            args.append(model.U[0])
+        return Function("to_model", inputs, [val])(*args).reshape((-1, 1))
 
     def __set_constr_type(self, constr_type: str = "BGH"):
         """
@@ -215,7 +353,9 @@ class AcadosInterface(SolverInterface):
 
     def __set_constraints(self, ocp):
         """
-        Set the constraints from the ocp
+        Set the constraints from the ocp. Each constraint is declared once for all the stages, and released (bounds
+        set to INFINITY) on the stages it is not declared on. Only the structure is declared here, the bounds of each
+        stage are computed by __update_constraints
 
         Parameters
         ----------
@@ -223,83 +363,36 @@ class AcadosInterface(SolverInterface):
             A reference to the current OptimalControlProgram
         """
 
-        # constraints handling in self.acados_ocp
-        if ocp.nlp[0].x_bounds.type != InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT:
-            raise NotImplementedError(
-                "ACADOS must declare an InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT " "for the x_bounds"
-            )
-        if ocp.nlp[0].u_bounds.type != InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT:
-            raise NotImplementedError(
-                "ACADOS must declare an InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT " "for the u_bounds"
-            )
-        u_min = np.array(ocp.nlp[0].u_bounds.min)
-        u_max = np.array(ocp.nlp[0].u_bounds.max)
-        x_min = np.array(ocp.nlp[0].x_bounds.min)
-        x_max = np.array(ocp.nlp[0].x_bounds.max)
+        n_stages = self.acados_ocp.dims.N
         self.all_constr = SX()
         self.end_constr = SX()
-        # TODO:change for more node flexibility on bounds
-        self.all_g_bounds = Bounds(interpolation=InterpolationType.CONSTANT)
-        self.end_g_bounds = Bounds(interpolation=InterpolationType.CONSTANT)
-        for i in range(ocp.n_phases):
-            for g, G in enumerate(ocp.nlp[i].g):
+        self.constraint_blocks = []
+        for i, nlp in enumerate(ocp.nlp):
+            for list_index, G in enumerate(nlp.g):
                 if not G:
                     continue
-                if G[0]["constraint"].node[0] is Node.ALL:
-                    self.all_constr = vertcat(self.all_constr, G[0]["val"].reshape((-1, 1)))
-                    self.all_g_bounds.concatenate(G[0]["bounds"])
-                    if len(G) > ocp.nlp[0].ns:
-                        constr_end_func_tp = Function(f"cas_constr_end_func_{i}_{g}", [ocp.nlp[i].X[-1]], [G[0]["val"]])
-                        self.end_constr = vertcat(self.end_constr, constr_end_func_tp(ocp.nlp[i].X[0]).reshape((-1, 1)))
-                        self.end_g_bounds.concatenate(G[0]["bounds"])
-
-                elif G[0]["constraint"].node[0] is Node.END:
-                    constr_end_func_tp = Function(f"cas_constr_end_func_{i}_{g}", [ocp.nlp[i].X[-1]], [G[0]["val"]])
-                    self.end_constr = vertcat(self.end_constr, constr_end_func_tp(ocp.nlp[i].X[0]).reshape((-1, 1)))
-                    self.end_g_bounds.concatenate(G[0]["bounds"])
-
-                else:
-                    raise RuntimeError(
-                        "Except for states and controls, Acados solver only handles constraints on last or all nodes."
-                    )
+                stages = self.__stages(i, G[0]["constraint"])[: len(G)]
+                path = [k for k, stage in enumerate(stages) if stage < n_stages]
+                end = [k for k, stage in enumerate(stages) if stage == n_stages]
+
+                block = {"nlp": nlp, "list_index": list_index, "rows": 0, "path": [], "end": None}
+                if path:
+                    constr = self.__to_model(nlp, stages[path[0]] - self.phase_offset[i], G[path[0]]["val"])
+                    self.all_constr = vertcat(self.all_constr, constr)
+                    block["rows"] = constr.shape[0]
+                    block["path"] = [(k, stages[k]) for k in path]
+                if end:
+                    self.end_constr = vertcat(self.end_constr, self.__to_model(nlp, nlp.ns, G[end[0]]["val"]))
+                    block["end"] = end[0]
+                self.constraint_blocks.append(block)
 
         self.acados_model.con_h_expr = self.all_constr
         self.acados_model.con_h_expr_e = self.end_constr
+        self.__update_constraints()
 
-        if not np.all(np.all(u_min.T == u_min.T[0, :], axis=0)):
-            raise NotImplementedError("u_bounds min must be the same at each shooting point with ACADOS")
-        if not np.all(np.all(u_max.T == u_max.T[0, :], axis=0)):
-            raise NotImplementedError("u_bounds max must be the same at each shooting point with ACADOS")
-
-        if (
-            not np.isfinite(u_min).all()
-            or not np.isfinite(x_min).all()
-            or not np.isfinite(u_max).all()
-            or not np.isfinite(x_max).all()
-        ):
-            raise NotImplementedError(
-                "u_bounds and x_bounds cannot be set to infinity in ACADOS. Consider changing it "
-                "to a big value instead."
-            )
-
-        # setup state constraints
-        # TODO replace all these np.concatenate by proper bound and initial_guess classes
-        self.x_bound_max = np.ndarray((self.acados_ocp.dims.nx, 3))
-        self.x_bound_min = np.ndarray((self.acados_ocp.dims.nx, 3))
-        param_bounds_max = []
-        param_bounds_min = []
-
-        if self.params.size:
-            param_bounds_max = self.params.bounds.max[:, 0]
-            param_bounds_min = self.params.bounds.min[:, 0]
-
-        for i in range(3):
-            self.x_bound_max[:, i] = np.concatenate((param_bounds_max, np.array(ocp.nlp[0].x_bounds.max[:, i])))
-            self.x_bound_min[:, i] = np.concatenate((param_bounds_min, np.array(ocp.nlp[0].x_bounds.min[:, i])))
-
-        # setup control constraints
-        self.acados_ocp.constraints.lbu = np.array(ocp.nlp[0].u_bounds.min[:, 0])
-        self.acados_ocp.constraints.ubu = np.array(ocp.nlp[0].u_bounds.max[:, 0])
+        # setup control constraints (the values of each stage are sent by __update_solver)
+        self.acados_ocp.constraints.lbu = self.u_bound_min[:, 0]
+        self.acados_ocp.constraints.ubu = self.u_bound_max[:, 0]
         self.acados_ocp.constraints.idxbu = np.array(range(self.acados_ocp.dims.nu))
         self.acados_ocp.dims.nbu = self.acados_ocp.dims.nu
 
@@ -324,12 +417,85 @@ class AcadosInterface(SolverInterface):
         self.acados_ocp.dims.nbx_e = self.acados_ocp.dims.nx
 
         # setup algebraic constraint
-        self.acados_ocp.constraints.lh = np.array(self.all_g_bounds.min[:, 0])
-        self.acados_ocp.constraints.uh = np.array(self.all_g_bounds.max[:, 0])
+        self.acados_ocp.constraints.lh = self.g_bound_min[:, 0]
+        self.acados_ocp.constraints.uh = self.g_bound_max[:, 0]
 
         # setup terminal algebraic constraint
-        self.acados_ocp.constraints.lh_e = np.array(self.end_g_bounds.min[:, 0])
-        self.acados_ocp.constraints.uh_e = np.array(self.end_g_bounds.max[:, 0])
+        self.acados_ocp.constraints.lh_e = self.end_g_bound_min
+        self.acados_ocp.constraints.uh_e = self.end_g_bound_max
+
+    def __update_constraints(self):
+        """
+        Compute the bounds of the constraints, the states and the controls at each stage from the current values of
+        the ocp. The structure of the constraints must have been declared by __set_constraints
+        """
+
+        ocp = self.ocp
+        n_stages = self.acados_ocp.dims.N
+        g_bound_min, g_bound_max = [], []
+        end_g_bound_min, end_g_bound_max = [], []
+        for block in self.constraint_blocks:
+            G = block["nlp"].g[block["list_index"]]
+
+            def bounds(k: int) -> tuple:
+                g_min = np.array(G[k]["bounds"].min[:, 0], dtype=float)
+                g_max = np.array(G[k]["bounds"].max[:, 0], dtype=float)
+                if G[k]["target"] is not None:
+                    target = np.array(G[k]["target"], dtype=float).T.reshape((-1,))
+                    g_min, g_max = g_min + target, g_max + target
+                return g_min, g_max
+
+            if block["path"]:
+                block_min = np.full((block["rows"], n_stages), -self.INFINITY)
+                block_max = np.full((block["rows"], n_stages), self.INFINITY)
+                for k, stage in block["path"]:
+                    block_min[:, stage], block_max[:, stage] = bounds(k)
+                g_bound_min.append(block_min)
+                g_bound_max.append(block_max)
+
+            if block["end"] is not None:
+                block_min, block_max = bounds(block["end"])
+                end_g_bound_min.append(block_min)
+                end_g_bound_max.append(block_max)
+
+        self.g_bound_min = np.concatenate(g_bound_min) if g_bound_min else np.ndarray((0, n_stages))
+        self.g_bound_max = np.concatenate(g_bound_max) if g_bound_max else np.ndarray((0, n_stages))
+        self.end_g_bound_min = np.concatenate(end_g_bound_min) if end_g_bound_min else np.ndarray((0,))
+        self.end_g_bound_max = np.concatenate(end_g_bound_max) if end_g_bound_max else np.ndarray((0,))
+
+        # setup state and control bounds of each stage
+        param_bounds_max = []
+        param_bounds_min = []
+        if self.params.size:
+            param_bounds_max = self.params.bounds.max[:, 0]
+            param_bounds_min = self.params.bounds.min[:, 0]
+
+        for n in range(n_stages + 1):
+            nlp = ocp.nlp[self.stage_phase[n]]
+            node = self.stage_node[n]
+            x_min = np.array(nlp.x_bounds.min.evaluate_at(node), dtype=float)
+            x_max = np.array(nlp.x_bounds.max.evaluate_at(node), dtype=float)
+            if node == 0 and self.stage_phase[n] > 0:
+                # The first node of a phase is also the last node of the previous one
+                previous = ocp.nlp[self.stage_phase[n] - 1]
+                x_min = np.maximum(x_min, np.array(previous.x_bounds.min.evaluate_at(previous.ns), dtype=float))
+                x_max = np.minimum(x_max, np.array(previous.x_bounds.max.evaluate_at(previous.ns), dtype=float))
+            self.x_bound_min[:, n] = np.concatenate((param_bounds_min, x_min))
+            self.x_bound_max[:, n] = np.concatenate((param_bounds_max, x_max))
+            if n < n_stages:
+                self.u_bound_min[:, n] = np.array(nlp.u_bounds.min.evaluate_at(node), dtype=float)
+                self.u_bound_max[:, n] = np.array(nlp.u_bounds.max.evaluate_at(node), dtype=float)
+
+        if (
+            not np.isfinite(self.u_bound_min).all()
+            or not np.isfinite(self.x_bound_min).all()
+            or not np.isfinite(self.u_bound_max).all()
+            or not np.isfinite(self.x_bound_max).all()
+        ):
+            raise NotImplementedError(
+                "u_bounds and x_bounds cannot be set to infinity in ACADOS. Consider changing it "
+                "to a big value instead."
+            )
 
     def __set_cost_type(self, cost_type: str = "NONLINEAR_LS"):
         """
@@ -346,7 +512,9 @@ class AcadosInterface(SolverInterface):
 
     def __set_costs(self, ocp):
         """
-        Set the cost functions from ocp
+        Set the cost functions from ocp. Each objective function is declared once for all the stages, its weight being
+        set to 0 on the stages it is not declared on. Only the structure is declared here, the weights and the targets
+        of each stage are computed by __update_costs
 
         Parameters
         ----------
@@ -354,15 +522,20 @@ class AcadosInterface(SolverInterface):
             A reference to the current OptimalControlProgram
         """
 
-        if ocp.n_phases != 1:
-            raise NotImplementedError("ACADOS with more than one phase is not implemented yet.")
+        if self.acados_ocp.cost.cost_type == "EXTERNAL":
+            raise RuntimeError("EXTERNAL is not interfaced yet, please use NONLINEAR_LS")
+        elif self.acados_ocp.cost.cost_type not in ("LINEAR_LS", "NONLINEAR_LS"):
+            raise RuntimeError("Available acados cost type: 'LINEAR_LS', 'NONLINEAR_LS' and 'EXTERNAL'.")
+        linear = self.acados_ocp.cost.cost_type == "LINEAR_LS"
+
         # costs handling in self.acados_ocp
-        self.y_ref = []
-        self.y_ref_end = []
+        n_stages = self.acados_ocp.dims.N
+        nx, nu = ocp.nlp[0].nx, ocp.nlp[0].nu
         self.lagrange_costs = SX()
         self.mayer_costs = SX()
-        self.W = np.zeros((0, 0))
-        self.W_e = np.zeros((0, 0))
+        self.Vu = np.array([], dtype=np.int64).reshape(0, nu)
+        self.Vx = np.array([], dtype=np.int64).reshape(0, nx)
+        self.Vxe = np.array([], dtype=np.int64).reshape(0, nx)
         ctrl_objs = [
             PenaltyType.MINIMIZE_TORQUE,
             PenaltyType.MINIMIZE_MUSCLES_CONTROL,
@@ -372,170 +545,98 @@ class AcadosInterface(SolverInterface):
             PenaltyType.MINIMIZE_STATE,
         ]
 
-        if self.acados_ocp.cost.cost_type == "LINEAR_LS":
-            self.Vu = np.array([], dtype=np.int64).reshape(0, ocp.nlp[0].nu)
-            self.Vx = np.array([], dtype=np.int64).reshape(0, ocp.nlp[0].nx)
-            self.Vxe = np.array([], dtype=np.int64).reshape(0, ocp.nlp[0].nx)
-            for i in range(ocp.n_phases):
-                for j, J in enumerate(ocp.nlp[i].J):
-                    if J[0]["objective"].type.get_type() == ObjectiveFunction.LagrangeFunction:
-                        if J[0]["objective"].type.value[0] in ctrl_objs:
-                            index = (
-                                J[0]["objective"].index if J[0]["objective"].index else list(np.arange(ocp.nlp[0].nu))
-                            )
-                            vu = np.zeros(ocp.nlp[0].nu)
-                            vu[index] = 1.0
-                            self.Vu = np.vstack((self.Vu, np.diag(vu)))
-                            self.Vx = np.vstack((self.Vx, np.zeros((ocp.nlp[0].nu, ocp.nlp[0].nx))))
-                            self.W = linalg.block_diag(self.W, np.diag([J[0]["objective"].weight] * ocp.nlp[0].nu))
-                            if J[0]["target"] is not None:
-                                y_tp = np.zeros((ocp.nlp[0].nu, 1))
-                                y_ref_tp = []
-                                for J_tp in J:
-                                    y_tp[index] = J_tp["target"].T.reshape((-1, 1))
-                                    y_ref_tp.append(y_tp)
-                                self.y_ref.append(y_ref_tp)
-                            else:
-                                self.y_ref.append([np.zeros((ocp.nlp[0].nu, 1)) for _ in J])
-                        elif J[0]["objective"].type.value[0] in state_objs:
-                            index = (
-                                J[0]["objective"].index if J[0]["objective"].index else list(np.arange(ocp.nlp[0].nx))
-                            )
-                            vx = np.zeros(ocp.nlp[0].nx)
-                            vx[index] = 1.0
-                            self.Vx = np.vstack((self.Vx, np.diag(vx)))
-                            self.Vu = np.vstack((self.Vu, np.zeros((ocp.nlp[0].nx, ocp.nlp[0].nu))))
-                            self.W = linalg.block_diag(self.W, np.diag([J[0]["objective"].weight] * ocp.nlp[0].nx))
-                            if J[0]["target"] is not None:
-                                y_ref_tp = []
-                                for J_tp in J:
-                                    y_tp = np.zeros((ocp.nlp[0].nx, 1))
-                                    y_tp[index] = J_tp["target"].T.reshape((-1, 1))
-                                    y_ref_tp.append(y_tp)
-                                self.y_ref.append(y_ref_tp)
-                            else:
-                                self.y_ref.append([np.zeros((ocp.nlp[0].nx, 1)) for _ in J])
+        # The objective function of each block of rows of the cost, and the stages it is declared on
+        self.path_cost_blocks = []
+        self.end_cost_blocks = []
+        for i, nlp in enumerate(ocp.nlp):
+            for list_index, J in enumerate(nlp.J):
+                if not J:
+                    continue
+                objective = J[0]["objective"]
+                is_lagrange = objective.type.get_type() == ObjectiveFunction.LagrangeFunction
+                if not is_lagrange and objective.type.get_type() != ObjectiveFunction.MayerFunction:
+                    raise RuntimeError("The objective function is not Lagrange nor Mayer.")
+
+                stages = self.__stages(i, objective)[: len(J)]
+                path = [k for k, stage in enumerate(stages) if stage < n_stages]
+                end = [k for k, stage in enumerate(stages) if stage == n_stages]
+                for entries, blocks in ((path, self.path_cost_blocks), (end, self.end_cost_blocks)):
+                    if not entries:
+                        continue
+                    # The nodes are counted in the phase of the penalty (its last node is the first of the next phase)
+                    node = stages[entries[0]] - self.phase_offset[i]
+
+                    if linear:
+                        if objective.type.value[0] in ctrl_objs:
+                            index = objective.index if objective.index else list(np.arange(nu))
+                            v = np.zeros(nu)
+                            v[index] = 1.0
+                            vu, vx = np.diag(v), np.zeros((nu, nx))
+                        elif objective.type.value[0] in state_objs:
+                            index = objective.index if objective.index else list(np.arange(nx))
+                            v = np.zeros(nx)
+                            v[index] = 1.0
+                            vu, vx = np.zeros((nx, nu)), np.diag(v)
                         else:
                             raise RuntimeError(
-                                f"{J[0]['objective'].type.name} is an incompatible objective term with "
-                                f"LINEAR_LS cost type"
-                            )
-
-                        # Deal with last node to match ipopt formulation
-                        if J[0]["objective"].node[0].value == "all" and len(J) > ocp.nlp[0].ns:
-                            index = (
-                                J[0]["objective"].index if J[0]["objective"].index else list(np.arange(ocp.nlp[0].nx))
+                                f"{objective.type.name} is an incompatible objective term with LINEAR_LS cost type"
                             )
-                            vxe = np.zeros(ocp.nlp[0].nx)
-                            vxe[index] = 1.0
-                            self.Vxe = np.vstack((self.Vxe, np.diag(vxe)))
-                            self.W_e = linalg.block_diag(self.W_e, np.diag([J[0]["objective"].weight] * ocp.nlp[0].nx))
-                            if J[0]["target"] is not None:
-                                y_tp = np.zeros((ocp.nlp[0].nx, 1))
-                                y_tp[index] = J[-1]["target"].T.reshape((-1, 1))
-                                self.y_ref_end.append(y_tp)
-                            else:
-                                self.y_ref_end.append(np.zeros((ocp.nlp[0].nx, 1)))
-
-                    elif J[0]["objective"].type.get_type() == ObjectiveFunction.MayerFunction:
-                        if J[0]["objective"].type.value[0] in state_objs:
-                            index = (
-                                J[0]["objective"].index if J[0]["objective"].index else list(np.arange(ocp.nlp[0].nx))
-                            )
-                            vxe = np.zeros(ocp.nlp[0].nx)
-                            vxe[index] = 1.0
-                            self.Vxe = np.vstack((self.Vxe, np.diag(vxe)))
-                            self.W_e = linalg.block_diag(self.W_e, np.diag([J[0]["objective"].weight] * ocp.nlp[0].nx))
-                            if J[0]["target"] is not None:
-                                y_tp = np.zeros((ocp.nlp[0].nx, 1))
-                                y_tp[index] = J[-1]["target"].T.reshape((-1, 1))
-                                self.y_ref_end.append(y_tp)
-                            else:
-                                self.y_ref_end.append(np.zeros((ocp.nlp[0].nx, 1)))
+                        n_rows = vx.shape[0]
+                        if blocks is self.path_cost_blocks:
+                            self.Vu = np.vstack((self.Vu, vu))
+                            self.Vx = np.vstack((self.Vx, vx))
                         else:
-                            raise RuntimeError(
-                                f"{J[0]['objective'].type.name} is an incompatible objective term "
-                                f"with LINEAR_LS cost type"
-                            )
-
+                            self.Vxe = np.vstack((self.Vxe, vx))
                     else:
-                        raise RuntimeError("The objective function is not Lagrange nor Mayer.")
+                        val = self.__to_model(nlp, node, J[entries[0]]["val"])
+                        n_rows = val.shape[0]
+                        index = slice(None)
+                        if blocks is self.path_cost_blocks:
+                            self.lagrange_costs = vertcat(self.lagrange_costs, val)
+                        else:
+                            self.mayer_costs = vertcat(self.mayer_costs, val)
+
+                    blocks.append(
+                        {
+                            "penalties": (nlp, list_index),
+                            "rows": n_rows,
+                            "index": index,
+                            "stages": [(k, stages[k]) for k in entries],
+                            "phase": i if is_lagrange else None,
+                        }
+                    )
 
-                if self.params.size:
-                    raise RuntimeError("Params not yet handled with LINEAR_LS cost type")
+        # parameter as mayer function
+        # IMPORTANT: it is considered that only parameters are stored in ocp.J, for now.
+        if self.params.size:
+            if linear:
+                raise RuntimeError("Params not yet handled with LINEAR_LS cost type")
+            for list_index, J in enumerate(ocp.J):
+                if not J:
+                    continue
+                self.mayer_costs = vertcat(self.mayer_costs, J[0]["val"].reshape((-1, 1)))
+                self.end_cost_blocks.append(
+                    {
+                        "penalties": (ocp, list_index),
+                        "rows": J[0]["val"].numel(),
+                        "index": slice(None),
+                        "stages": [(0, n_stages)],
+                        "phase": None,
+                    }
+                )
+        self.__update_costs()
 
+        if linear:
             # Set costs
             self.acados_ocp.cost.Vx = self.Vx if self.Vx.shape[0] else np.zeros((0, 0))
             self.acados_ocp.cost.Vu = self.Vu if self.Vu.shape[0] else np.zeros((0, 0))
             self.acados_ocp.cost.Vx_e = self.Vxe if self.Vxe.shape[0] else np.zeros((0, 0))
 
             # Set dimensions
-            self.acados_ocp.dims.ny = sum([len(data[0]) for data in self.y_ref])
-            self.acados_ocp.dims.ny_e = sum([len(data) for data in self.y_ref_end])
-
-            # Set weight
-            self.acados_ocp.cost.W = self.W
-            self.acados_ocp.cost.W_e = self.W_e
-
-            # Set target shape
-            self.acados_ocp.cost.yref = np.zeros((self.acados_ocp.cost.W.shape[0],))
-            self.acados_ocp.cost.yref_e = np.zeros((self.acados_ocp.cost.W_e.shape[0],))
-
-        elif self.acados_ocp.cost.cost_type == "NONLINEAR_LS":
-            for i in range(ocp.n_phases):
-                for j, J in enumerate(ocp.nlp[i].J):
-                    if not J:
-                        continue
-                    if J[0]["objective"].type.get_type() == ObjectiveFunction.LagrangeFunction:
-                        self.lagrange_costs = vertcat(self.lagrange_costs, J[0]["val"].reshape((-1, 1)))
-                        self.W = linalg.block_diag(self.W, np.diag([J[0]["objective"].weight] * J[0]["val"].numel()))
-                        if J[0]["target"] is not None:
-                            self.y_ref.append([J_tp["target"].T.reshape((-1, 1)) for J_tp in J])
-                        else:
-                            self.y_ref.append([np.zeros((J_tp["val"].numel(), 1)) for J_tp in J])
-
-                        # Deal with last node to match ipopt formulation
-                        if J[0]["objective"].node[0].value == "all" and len(J) > ocp.nlp[0].ns:
-                            mayer_func_tp = Function(f"cas_mayer_func_{i}_{j}", [ocp.nlp[i].X[-1]], [J[0]["val"]])
-                            self.W_e = linalg.block_diag(
-                                self.W_e, np.diag([J[0]["objective"].weight] * J[0]["val"].numel())
-                            )
-                            self.mayer_costs = vertcat(
-                                self.mayer_costs, mayer_func_tp(ocp.nlp[i].X[0]).reshape((-1, 1))
-                            )
-                            if J[0]["target"] is not None:
-                                self.y_ref_end.append(J[-1]["target"].T.reshape((-1, 1)))
-                            else:
-                                self.y_ref_end.append(np.zeros((J[-1]["val"].numel(), 1)))
-
-                    elif J[0]["objective"].type.get_type() == ObjectiveFunction.MayerFunction:
-                        mayer_func_tp = Function(f"cas_mayer_func_{i}_{j}", [ocp.nlp[i].X[-1]], [J[0]["val"]])
-                        self.W_e = linalg.block_diag(
-                            self.W_e, np.diag([J[0]["objective"].weight] * J[0]["val"].numel())
-                        )
-                        self.mayer_costs = vertcat(self.mayer_costs, mayer_func_tp(ocp.nlp[i].X[0]).reshape((-1, 1)))
-                        if J[0]["target"] is not None:
-                            self.y_ref_end.append(J[0]["target"].T.reshape((-1, 1)))
-                        else:
-                            self.y_ref_end.append(np.zeros((J[0]["val"].numel(), 1)))
-
-                    else:
-                        raise RuntimeError("The objective function is not Lagrange nor Mayer.")
-
-                # parameter as mayer function
-                # IMPORTANT: it is considered that only parameters are stored in ocp.J, for now.
-                if self.params.size:
-                    for j, J in enumerate(ocp.J):
-                        mayer_func_tp = Function(f"cas_J_mayer_func_{i}_{j}", [ocp.nlp[i].X[-1]], [J[0]["val"]])
-                        self.W_e = linalg.block_diag(
-                            self.W_e, np.diag(([J[0]["objective"].weight] * J[0]["val"].numel()))
-                        )
-                        self.mayer_costs = vertcat(self.mayer_costs, mayer_func_tp(ocp.nlp[i].X[0]).reshape((-1, 1)))
-                        if J[0]["target"] is not None:
-                            self.y_ref_end.append(J[0]["target"].T.reshape((-1, 1)))
-                        else:
-                            self.y_ref_end.append(np.zeros((J[0]["val"].numel(), 1)))
+            self.acados_ocp.dims.ny = self.Vx.shape[0]
+            self.acados_ocp.dims.ny_e = self.Vxe.shape[0]
 
+        else:
             # Set costs
             self.acados_ocp.model.cost_y_expr = self.lagrange_costs if self.lagrange_costs.numel() else SX(1, 1)
             self.acados_ocp.model.cost_y_expr_e = self.mayer_costs if self.mayer_costs.numel() else SX(1, 1)
@@ -544,78 +645,112 @@ class AcadosInterface(SolverInterface):
             self.acados_ocp.dims.ny = self.acados_ocp.model.cost_y_expr.shape[0]
             self.acados_ocp.dims.ny_e = self.acados_ocp.model.cost_y_expr_e.shape[0]
 
-            # Set weight
-            self.acados_ocp.cost.W = np.zeros((1, 1)) if self.W.shape == (0, 0) else self.W
-            self.acados_ocp.cost.W_e = np.zeros((1, 1)) if self.W_e.shape == (0, 0) else self.W_e
+        # Set weight (the values of each stage are sent by __update_solver)
+        self.acados_ocp.cost.W = self.W[0] if self.W else np.zeros((0, 0))
+        self.acados_ocp.cost.W_e = self.W_e
 
-            # Set target shape
-            self.acados_ocp.cost.yref = np.zeros((self.acados_ocp.cost.W.shape[0],))
-            self.acados_ocp.cost.yref_e = np.zeros((self.acados_ocp.cost.W_e.shape[0],))
+        # Set target shape
+        self.acados_ocp.cost.yref = np.zeros((self.acados_ocp.cost.W.shape[0],))
+        self.acados_ocp.cost.yref_e = np.zeros((self.acados_ocp.cost.W_e.shape[0],))
 
-        elif self.acados_ocp.cost.cost_type == "EXTERNAL":
-            raise RuntimeError("EXTERNAL is not interfaced yet, please use NONLINEAR_LS")
+    def __update_costs(self):
+        """
+        Compute the weights and the targets of each stage from the current values of the objective functions. The
+        structure of the costs must have been declared by __set_costs. Since ACADOS scales the cost of each stage by
+        its duration, the weight of the Mayer terms (and of the last node of the Lagrange terms) that do not fall on the
+        last stage is divided by the duration of their stage
+        """
 
-        else:
-            raise RuntimeError("Available acados cost type: 'LINEAR_LS', 'NONLINEAR_LS' and 'EXTERNAL'.")
+        n_stages = self.acados_ocp.dims.N
+
+        def block_values(block: dict) -> tuple:
+            owner, list_index = block["penalties"]
+            J = owner.J[list_index]
+            weights, targets = {}, {}
+            for k, stage in block["stages"]:
+                weight = J[k]["objective"].weight
+                if stage < n_stages and self.stage_phase[stage] != block["phase"]:
+                    weight /= self.time_steps[stage]
+                weights[stage] = weight
+
+                targets[stage] = np.zeros((block["rows"],))
+                if J[k]["target"] is not None:
+                    targets[stage][block["index"]] = np.array(J[k]["target"], dtype=float).T.reshape((-1,))
+            return block["rows"], weights, targets
+
+        def stage_values(blocks: list, stage: int) -> tuple:
+            if not blocks:
+                return np.zeros((0, 0)), np.zeros((0,))
+            weights = [np.full((rows,), weight.get(stage, 0.0)) for rows, weight, _ in blocks]
+            targets = [target.get(stage, np.zeros((rows,))) for rows, _, target in blocks]
+            return np.diag(np.concatenate(weights)), np.concatenate(targets)
+
+        path_blocks = [block_values(block) for block in self.path_cost_blocks]
+        end_blocks = [block_values(block) for block in self.end_cost_blocks]
+        stage_costs = [stage_values(path_blocks, n) for n in range(n_stages)]
+        self.W = [weight for weight, _ in stage_costs]
+        self.y_ref = [target for _, target in stage_costs]
+        self.W_e, self.y_ref_end = stage_values(end_blocks, n_stages)
+
+        if self.acados_ocp.cost.cost_type == "NONLINEAR_LS":
+            if not path_blocks:
+                self.W = [np.zeros((1, 1)) for _ in range(n_stages)]
+                self.y_ref = [np.zeros((1,)) for _ in range(n_stages)]
+            if not end_blocks:
+                self.W_e, self.y_ref_end = np.zeros((1, 1)), np.zeros((1,))
 
     def __update_solver(self):
         """
-        Update the ACADOS solver to new values
+        Update the ACADOS solver to new values (targets, weights and bounds of each stage). The initial guess is sent
+        by __set_initial_guess
         """
 
+        n_stages = self.acados_ocp.dims.N
+        for n in range(n_stages + 1):
+            if self.ocp.n_phases > 1:
+                self.ocp_solver.set(n, "p", np.eye(self.ocp.n_phases)[:, self.stage_phase[n]])
+
+        for n in range(n_stages):
+            if self.y_ref[n].shape[0]:
+                self.ocp_solver.cost_set(n, "yref", self.y_ref[n])
+                self.ocp_solver.cost_set(n, "W", self.W[n])
+
+            self.ocp_solver.constraints_set(n, "lbu", self.u_bound_min[:, n])
+            self.ocp_solver.constraints_set(n, "ubu", self.u_bound_max[:, n])
+            if self.g_bound_min.shape[0]:
+                self.ocp_solver.constraints_set(n, "uh", self.g_bound_max[:, n])
+                self.ocp_solver.constraints_set(n, "lh", self.g_bound_min[:, n])
+            self.ocp_solver.constraints_set(n, "lbx", self.x_bound_min[:, n])
+            self.ocp_solver.constraints_set(n, "ubx", self.x_bound_max[:, n])
+
+        if self.y_ref_end.shape[0]:
+            self.ocp_solver.cost_set(n_stages, "yref", self.y_ref_end)
+            self.ocp_solver.cost_set(n_stages, "W", self.W_e)
+        self.ocp_solver.constraints_set(n_stages, "lbx", self.x_bound_min[:, -1])
+        self.ocp_solver.constraints_set(n_stages, "ubx", self.x_bound_max[:, -1])
+        if self.end_g_bound_max.shape[0]:
+            self.ocp_solver.constraints_set(n_stages, "uh", self.end_g_bound_max)
+            self.ocp_solver.constraints_set(n_stages, "lh", self.end_g_bound_min)
+
+    def __set_initial_guess(self):
+        """
+        Send the initial guess of the ocp to the ACADOS solver
+        """
+
+        n_stages = self.acados_ocp.dims.N
         param_init = []
-        for n in range(self.acados_ocp.dims.N):
-            if self.y_ref:  # Target
-                self.ocp_solver.cost_set(n, "yref", np.vstack([data[n] for data in self.y_ref])[:, 0])
-            # check following line
-            # self.ocp_solver.cost_set(n, "W", self.W)
-
-            if self.params.size:
-                param_init = self.params.initial_guess.init.evaluate_at(n)
-
-            self.ocp_solver.set(n, "x", np.concatenate((param_init, self.ocp.nlp[0].x_init.init.evaluate_at(n))))
-            self.ocp_solver.set(n, "u", self.ocp.nlp[0].u_init.init.evaluate_at(n))
-            self.ocp_solver.constraints_set(n, "lbu", self.ocp.nlp[0].u_bounds.min[:, 0])
-            self.ocp_solver.constraints_set(n, "ubu", self.ocp.nlp[0].u_bounds.max[:, 0])
-            self.ocp_solver.constraints_set(n, "uh", self.all_g_bounds.max[:, 0])
-            self.ocp_solver.constraints_set(n, "lh", self.all_g_bounds.min[:, 0])
-
-            if n == 0:
-                self.ocp_solver.constraints_set(n, "lbx", self.x_bound_min[:, 0])
-                self.ocp_solver.constraints_set(n, "ubx", self.x_bound_max[:, 0])
-            else:
-                self.ocp_solver.constraints_set(n, "lbx", self.x_bound_min[:, 1])
-                self.ocp_solver.constraints_set(n, "ubx", self.x_bound_max[:, 1])
+        if self.params.size:
+            param_init = self.params.initial_guess.init[:, 0]
 
-        if self.y_ref_end:
-            if len(self.y_ref_end) == 1:
-                self.ocp_solver.cost_set(self.acados_ocp.dims.N, "yref", np.array(self.y_ref_end[0])[:, 0])
-            else:
-                self.ocp_solver.cost_set(
-                    self.acados_ocp.dims.N, "yref", np.concatenate([data for data in self.y_ref_end])[:, 0]
-                )
-            # check following line
-            # self.ocp_solver.cost_set(self.acados_ocp.dims.N, "W", self.W_e)
-        self.ocp_solver.constraints_set(self.acados_ocp.dims.N, "lbx", self.x_bound_min[:, -1])
-        self.ocp_solver.constraints_set(self.acados_ocp.dims.N, "ubx", self.x_bound_max[:, -1])
-        if len(self.end_g_bounds.max[:, 0]):
-            self.ocp_solver.constraints_set(self.acados_ocp.dims.N, "uh", self.end_g_bounds.max[:, 0])
-            self.ocp_solver.constraints_set(self.acados_ocp.dims.N, "lh", self.end_g_bounds.min[:, 0])
-
-        if self.ocp.nlp[0].x_init.init.shape[1] == self.acados_ocp.dims.N + 1:
-            if self.params.size:
-                self.ocp_solver.set(
-                    self.acados_ocp.dims.N,
-                    "x",
-                    np.concatenate(
-                        (
-                            self.params.initial_guess.init[:, 0],
-                            self.ocp.nlp[0].x_init.init[:, self.acados_ocp.dims.N],
-                        )
-                    ),
-                )
-            else:
-                self.ocp_solver.set(self.acados_ocp.dims.N, "x", self.ocp.nlp[0].x_init.init[:, self.acados_ocp.dims.N])
+        for n in range(n_stages):
+            nlp = self.ocp.nlp[self.stage_phase[n]]
+            node = self.stage_node[n]
+            self.ocp_solver.set(n, "x", np.concatenate((param_init, nlp.x_init.init.evaluate_at(node))))
+            self.ocp_solver.set(n, "u", nlp.u_init.init.evaluate_at(node))
+
+        nlp = self.ocp.nlp[-1]
+        if nlp.x_init.init.shape[1] == nlp.ns + 1:
+            self.ocp_solver.set(n_stages, "x", np.concatenate((param_init, nlp.x_init.init[:, nlp.ns])))
 
     def configure(self, options: dict):
         """
@@ -633,6 +768,8 @@ class AcadosInterface(SolverInterface):
             del options["acados_dir"]
         if "cost_type" in options:
             del options["cost_type"]
+        if "compile_folder" in options:
+            del options["compile_folder"]
 
         if self.ocp_solver is None:
             self.acados_ocp.solver_options.qp_solver = "PARTIAL_CONDENSING_HPIPM"  # FULL_CONDENSING_QPOASES
@@ -667,7 +804,7 @@ class AcadosInterface(SolverInterface):
                         f"[ACADOS] Only editable solver options after solver creation are :\n {available_options}"
                     )
 
-    def online_optim(self, ocp):
+    def online_optim(self, ocp, show_options: dict = None):
         raise NotImplementedError("online_optim is not implemented yet with ACADOS backend")
 
     def get_optimized_value(self) -> Union[list, dict]:
@@ -680,8 +817,6 @@ class AcadosInterface(SolverInterface):
         """
 
         ns = self.acados_ocp.dims.N
-        nx = self.acados_ocp.dims.nx
-        nq = self.ocp.nlp[0].q.shape[0]
         n_params = self.ocp.nlp[0].np
         acados_x = np.array([self.ocp_solver.get(i, "x") for i in range(ns + 1)]).T
         acados_p = acados_x[:n_params, :]
@@ -696,8 +831,11 @@ class AcadosInterface(SolverInterface):
             "status": self.status,
         }
 
-        out["x"] = vertcat(out["x"], acados_x.reshape(-1, 1, order="F"))
-        out["x"] = vertcat(out["x"], acados_u.reshape(-1, 1, order="F"))
+        # Split the stacked horizon in phases, the first node of a phase being duplicated as the last of the previous
+        for offset, nlp in zip(self.phase_offset, self.ocp.nlp):
+            out["x"] = vertcat(out["x"], acados_x[:, offset : offset + nlp.ns + 1].reshape(-1, 1, order="F"))
+        for offset, nlp in zip(self.phase_offset, self.ocp.nlp):
+            out["x"] = vertcat(out["x"], acados_u[:, offset : offset + nlp.ns].reshape(-1, 1, order="F"))
         out["x"] = vertcat(out["x"], acados_p[:, 0])
 
         self.out["sol"] = out
@@ -715,13 +853,128 @@ class AcadosInterface(SolverInterface):
         A reference to the solution
         """
 
-        # Populate costs and constraints vectors
+        # Only the values are refreshed, the structure is declared once when the solver is created
+        if self.ocp_solver is None:
+            self.build()
+        else:
+            self.__update_costs()
+            self.__update_constraints()
+        self.__update_solver()
+        self.__set_initial_guess()
+
+        with self.ocp.profiler.stage("Acados"):
+            self.status = self.ocp_solver.solve()
+        self.get_optimized_value()
+        return self
+
+    def build(self):
+        """
+        Generate and compile the ACADOS solver, if it is not already created. The options of the solver cannot be
+        changed afterward (see configure)
+        """
+
+        if self.ocp_solver is not None:
+            return
+
         self.__set_costs(self.ocp)
         self.__set_constraints(self.ocp)
-        if self.ocp_solver is None:
-            self.ocp_solver = AcadosOcpSolver(self.acados_ocp, json_file="acados_ocp.json")
+
+        # The solver is generated in a folder named after the structure of the ocp, so an identical ocp loads the
+        # compiled solver and different ocp do not overwrite each other's generated code
+        structure_hash = self.structure_hash()
+        self.acados_model.name = f"model_{structure_hash[:16]}"
+        folder = os.path.abspath(os.path.join(self.compile_folder, structure_hash))
+        self.acados_ocp.code_export_directory = os.path.join(folder, "c_generated_code")
+        json_file = os.path.join(folder, "acados_ocp.json")
+        built_flag = os.path.join(folder, "built")
+        os.makedirs(folder, exist_ok=True)
+
+        # Concurrent runs of the same ocp wait for the first one to compile the solver instead of generating the same
+        # files at the same time
+        with open(os.path.join(folder, "lock"), "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            # Older versions of acados_template always generate and compile the solver
+            can_reuse = "build" in signature(AcadosOcpSolver.__init__).parameters
+            if can_reuse and os.path.isfile(built_flag) and os.path.isfile(json_file):
+                self.ocp_solver = AcadosOcpSolver(self.acados_ocp, json_file=json_file, build=False, generate=False)
+            else:
+                if os.path.isfile(built_flag):
+                    os.remove(built_flag)
+                self.ocp_solver = AcadosOcpSolver(self.acados_ocp, json_file=json_file)
+                open(built_flag, "w").close()
+
+    def structure_hash(self) -> str:
+        """
+        Get a hash of the structure of the ocp, which identifies the generated solver. Two ocp with the same hash
+        generate the same C code, regardless of the values of the bounds, initial guess, weights and targets (which
+        are sent to the solver at each solve). The costs and the constraints must already be set
+
+        Returns
+        -------
+        The hexadecimal hash of the ocp
+        """
+
+        model = self.acados_model
+        expressions = [model.f_impl_expr, model.f_expl_expr, model.con_h_expr, model.con_h_expr_e]
+        if self.acados_ocp.cost.cost_type == "NONLINEAR_LS":
+            expressions += [model.cost_y_expr, model.cost_y_expr_e]
+        p = model.p if isinstance(model.p, SX) else SX()
+        functions = Function("model", [model.x, model.xdot, model.u, p], [SX(expr) for expr in expressions])
+
+        cost = self.acados_ocp.cost
+        constraints = self.acados_ocp.constraints
+        layout = {
+            "dims": vars(self.acados_ocp.dims),
+            "cost": [cost.cost_type, cost.cost_type_e, cost.Vx, cost.Vu, cost.Vx_e],
+            "constraints": [constraints.constr_type, constraints.constr_type_e],
+            "solver_options": vars(self.acados_ocp.solver_options),
+        }
+
+        def to_json(value):
+            return value.tolist() if isinstance(value, np.ndarray) else str(value)
+
+        layout = json.dumps(layout, sort_keys=True, default=to_json)
+
+        structure = sha256(casadi.__version__.encode())
+        structure.update(layout.encode())
+        structure.update(functions.serialize().encode())
+        return structure.hexdigest()
+
+    def prepare(self):
+        """
+        Do the preparation phase of a real-time iteration: the problem is linearized around the current initial guess
+        (usually the shifted solution of the previous window), before the new data is known. The solver must have been
+        configured with 'nlp_solver_type' set to 'SQP_RTI'
+        """
+
+        if self.acados_ocp.solver_options.nlp_solver_type != "SQP_RTI":
+            raise RuntimeError("The real-time iteration requires the 'nlp_solver_type' option to be 'SQP_RTI'")
+
+        self.build()
+        self.__set_initial_guess()
+
+        with self.ocp.profiler.stage("Acados preparation"):
+            self.ocp_solver.options_set("rti_phase", 1)
+            self.ocp_solver.solve()
+
+    def feedback(self) -> "AcadosInterface":
+        """
+        Do the feedback phase of a real-time iteration: the targets and bounds (usually modified by the new data) are
+        sent to the solver and the QP linearized by prepare is solved
+
+        Returns
+        -------
+        A reference to the solution
+        """
+
+        self.__update_costs()
+        self.__update_constraints()
         self.__update_solver()
 
-        self.status = self.ocp_solver.solve()
+        with self.ocp.profiler.stage("Acados feedback"):
+            self.ocp_solver.options_set("rti_phase", 2)
+            self.status = self.ocp_solver.solve()
         self.get_optimized_value()
         return self
@@ -1,14 +1,60 @@
 from time import time
-
-from casadi import vertcat, sum1, nlpsol, SX, MX
+from typing import Callable
+from hashlib import sha256
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+import subprocess
+from sys import platform
+
+import numpy as np
+import casadi
+from casadi import vertcat, sum1, nlpsol, Function
 
 from .solver_interface import SolverInterface
+from .iteration_recorder import IterationRecorder
 from ..gui.plot import OnlineCallback
 from ..limits.path_conditions import Bounds
 from ..misc.enums import InterpolationType
 from ..optimization.solution import Solution
 
 
+# The nlpsol of a batch, as inherited by a forked worker (see IpoptInterface.solve_batch)
+_batch_solver = None
+
+
+def _init_batch_worker(solver: Function):
+    """
+    Keep the nlpsol of the batch in the worker
+
+    Parameters
+    ----------
+    solver: Function
+        The nlpsol to call in the worker
+    """
+
+    global _batch_solver
+    _batch_solver = solver
+
+
+def _solve_in_batch_worker(limits: dict) -> dict:
+    """
+    Solve one nlp of a batch in a worker
+
+    Parameters
+    ----------
+    limits: dict
+        The inputs of the nlpsol
+
+    Returns
+    -------
+    The Ipopt-like solution structure, with numpy arrays so it can be sent back to the main process
+    """
+
+    sol = IpoptInterface.call_solver(_batch_solver, limits)
+    return {key: np.array(value) if isinstance(value, casadi.DM) else value for key, value in sol.items()}
+
+
 class IpoptInterface(SolverInterface):
     """
     The Ipopt solver interface
@@ -19,29 +65,78 @@ class IpoptInterface(SolverInterface):
         Options irrelevant of a specific ocp
     opts: dict
         Options of the current ocp
+    solver_options: dict
+        The last options sent by the user to configure
     ipopt_nlp: dict
         The declaration of the variables Ipopt-friendly
     ipopt_limits: dict
         The declaration of the bound Ipopt-friendly
+    ocp_solver: nlpsol
+        The compiled nlpsol. It is kept between calls to solve and is only rebuilt when the structure changes
+    g_bounds: Bounds
+        The bounds of the constraints associated with the compiled nlpsol
+    penalties: PenaltyRegistry
+        The registry of the penalties the compiled nlpsol was built from. It gives the layout of the targets, which
+        are parameters (p) of the nlpsol
+    compile_nlp: bool
+        If the nlp should be generated in C and compiled into a shared library instead of evaluated by the CasADi
+        virtual machine
+    compile_folder: str
+        The folder where the compiled nlp are cached. Each structure of problem has its own subfolder
+    x0: np.ndarray
+        The primal values to initialize the solver with instead of the initial guess of the ocp (warm start)
     lam_g: np.ndarray
         The lagrange multiplier of the constraints to initialize the solver
     lam_x: np.ndarray
         The lagrange multiplier of the variables to initialize the solver
+    iteration_recorder: IterationRecorder
+        The callback that records the iterates on the disk (None if they are not recorded)
 
     Methods
     -------
-    online_optim(self, ocp: OptimalControlProgram)
+    online_optim(self, ocp: OptimalControlProgram, show_options: dict = None)
         Declare the online callback to update the graphs while optimizing
+    start_get_iterations(self, folder: str = "iterations", chunk_size: int = 100)
+        Record all the iterates of the next solves on the disk
+    finish_get_iterations(self)
+        Stop recording the iterates
     configure(self, solver_options: dict)
         Set some Ipopt options
+    invalidate_cache(self)
+        Discard the compiled nlpsol so it is rebuilt at the next solve
     solve(self) -> dict
         Solve the prepared ocp
+    prepare(self)
+        Emulate the preparation phase of a real-time iteration by building the nlpsol
+    feedback(self) -> dict
+        Emulate the feedback phase of a real-time iteration by solving the nlp
+    build(self)
+        Build the nlpsol from the current structure of the ocp, if it is not already built
+    get_limits(self) -> dict
+        Get the current numerical values of the inputs of the nlpsol
+    @staticmethod
+    call_solver(solver: Function, limits: dict) -> dict
+        Solve the nlp and gather the statistics of the optimization
+    solve_batch(self, all_limits: list, n_workers: int, on_solved: Callable) -> list
+        Solve the nlp for several sets of numerical values
     set_lagrange_multiplier(self, sol: dict)
         Set the lagrange multiplier from a solution structure
+    set_warm_start(self, sol: Solution)
+        Use the primal and dual values of a previous solution as starting point of the next solve
+    __update_callback(self)
+        Send the current iteration callback to the solver options, so the compiled nlpsol is rebuilt with it
+    __update_opts(self, opts: dict)
+        Set the options of the solver, invalidating the compiled nlpsol if they changed
+    __compiled_nlpsol(self)
+        Load the nlpsol from a C-compiled shared library, generating and compiling it first if it is not in the cache
+    structure_hash(self) -> str
+        Get a hash of the structure of the nlp, which identifies the compiled library
     __dispatch_bounds(self)
         Parse the bounds of the full ocp to a Ipopt-friendly one
     __dispatch_obj_func(self)
         Parse the objective functions of the full ocp to a Ipopt-friendly one
+    __finalize_objective(self, idx: int) -> tuple
+        Finalize an objective function, declaring its target (if any) as a parameter of the nlp
     """
 
     def __init__(self, ocp):
@@ -56,15 +151,22 @@ class IpoptInterface(SolverInterface):
 
         self.options_common = {}
         self.opts = {}
+        self.solver_options = None
 
         self.ipopt_nlp = {}
         self.ipopt_limits = {}
         self.ocp_solver = None
+        self.g_bounds = None
+        self.penalties = None
+        self.compile_nlp = False
+        self.compile_folder = "ipopt_generated_code"
+        self.iteration_recorder = None
 
+        self.x0 = None
         self.lam_g = None
         self.lam_x = None
 
-    def online_optim(self, ocp):
+    def online_optim(self, ocp, show_options: dict = None):
         """
         Declare the online callback to update the graphs while optimizing
 
@@ -72,9 +174,59 @@ class IpoptInterface(SolverInterface):
         ----------
         ocp: OptimalControlProgram
             A reference to the current OptimalControlProgram
+        show_options: dict
+            The options of the online plots (see PlotOcp)
+        """
+
+        self.options_common["iteration_callback"] = OnlineCallback(ocp, show_options=show_options)
+
+    def start_get_iterations(self, folder: str = "iterations", chunk_size: int = 100):
+        """
+        Record all the iterates of the next solves on the disk (see IterationRecorder). Each solve replaces the content
+        of the folder. The online callback, if any, keeps receiving the iterates
+
+        Parameters
+        ----------
+        folder: str
+            The folder of the store
+        chunk_size: int
+            The number of iterates per chunk of the store
+        """
+
+        callback = self.options_common.get("iteration_callback")
+        if isinstance(callback, IterationRecorder):
+            if callback.matches(self.ocp, folder, chunk_size):
+                return
+            callback = callback.callback
+
+        self.iteration_recorder = IterationRecorder(self.ocp, folder, chunk_size, callback=callback)
+        self.options_common["iteration_callback"] = self.iteration_recorder
+        self.__update_callback()
+
+    def finish_get_iterations(self):
+        """
+        Stop recording the iterates. The store of the last solve is kept
+        """
+
+        if self.iteration_recorder is None:
+            return
+
+        callback = self.options_common.get("iteration_callback")
+        if isinstance(callback, IterationRecorder):
+            if callback.callback is None:
+                del self.options_common["iteration_callback"]
+            else:
+                self.options_common["iteration_callback"] = callback.callback
+        self.iteration_recorder = None
+        self.__update_callback()
+
+    def __update_callback(self):
+        """
+        Send the current iteration callback to the solver options, so the compiled nlpsol is rebuilt with it
         """
 
-        self.options_common["iteration_callback"] = OnlineCallback(ocp)
+        opts = {key: value for key, value in self.opts.items() if key != "iteration_callback"}
+        self.__update_opts({**opts, **self.options_common})
 
     def configure(self, solver_options: dict):
         """
@@ -83,13 +235,32 @@ class IpoptInterface(SolverInterface):
         Parameters
         ----------
         solver_options: dict
-            The dictionary of options
+            The dictionary of options. On top of the Ipopt options, 'compile_nlp' (bool) can be set to generate and
+            compile the nlp in C and 'compile_folder' (str) to choose where the compiled libraries are cached.
+            'record_iterations' (str) is the folder where all the iterates are recorded (see start_get_iterations)
+            and 'record_chunk_size' (int) the number of iterates per chunk of this store. If solver_options is None,
+            the last options are reused and the recording of the iterates is left as is
         """
+        keep_recording = solver_options is None
         if solver_options is None:
-            if self.opts:
-                return
+            solver_options = self.solver_options if self.solver_options is not None else {}
+        self.solver_options = solver_options
+
+        solver_options = dict(solver_options)
+        compile_nlp = solver_options.pop("compile_nlp", False)
+        compile_folder = solver_options.pop("compile_folder", "ipopt_generated_code")
+        if compile_nlp != self.compile_nlp or compile_folder != self.compile_folder:
+            self.invalidate_cache()
+        self.compile_nlp = compile_nlp
+        self.compile_folder = compile_folder
+
+        record_folder = solver_options.pop("record_iterations", None)
+        record_chunk_size = solver_options.pop("record_chunk_size", 100)
+        if not keep_recording:
+            if record_folder is None:
+                self.finish_get_iterations()
             else:
-                solver_options = {}
+                self.start_get_iterations(record_folder, record_chunk_size)
 
         options = {
             "ipopt.tol": 1e-6,
@@ -98,54 +269,276 @@ class IpoptInterface(SolverInterface):
             "ipopt.limited_memory_max_history": 50,
             "ipopt.linear_solver": "mumps",  # "ma57", "ma86", "mumps"
         }
+        if self.x0 is not None:
+            # Trust the warm start point, otherwise Ipopt pushes it away from the bounds and loses most of its benefit
+            options["ipopt.warm_start_init_point"] = "yes"
+            options["ipopt.warm_start_bound_push"] = 1e-9
+            options["ipopt.warm_start_bound_frac"] = 1e-9
+            options["ipopt.warm_start_slack_bound_push"] = 1e-9
+            options["ipopt.warm_start_slack_bound_frac"] = 1e-9
+            options["ipopt.warm_start_mult_bound_push"] = 1e-9
         for key in solver_options:
             ipopt_key = key
             if key[:6] != "ipopt.":
                 ipopt_key = "ipopt." + key
             options[ipopt_key] = solver_options[key]
-        self.opts = {**options, **self.options_common}
+        self.__update_opts({**options, **self.options_common})
+
+    def __update_opts(self, opts: dict):
+        """
+        Set the options of the solver, invalidating the compiled nlpsol if they changed
+
+        Parameters
+        ----------
+        opts: dict
+            The full dictionary of options to send to nlpsol
+        """
+
+        if opts != self.opts:
+            self.invalidate_cache()
+        self.opts = opts
+
+    def invalidate_cache(self):
+        """
+        Discard the compiled nlpsol so it is rebuilt at the next solve. This must be called whenever the structure
+        of the ocp (objectives, constraints or parameters) is modified
+        """
+
+        self.ocp_solver = None
+        self.ipopt_nlp = {}
+        self.g_bounds = None
+        self.penalties = None
 
     def solve(self) -> dict:
         """
-        Solve the prepared ocp
+        Solve the prepared ocp. The nlpsol is only built at the first call (or after invalidate_cache was called),
+        subsequent calls only update the numerical values (bounds, initial guess, objective targets and lagrange
+        multipliers)
 
         Returns
         -------
         A reference to the solution
         """
 
-        all_J = self.__dispatch_obj_func()
-        all_g, all_g_bounds = self.__dispatch_bounds()
+        self.build()
+        self.ipopt_limits = self.get_limits()
+        if self.iteration_recorder is not None:
+            self.iteration_recorder.start()
+        try:
+            with self.ocp.profiler.stage("Ipopt"):
+                self.out = {"sol": self.call_solver(self.ocp_solver, self.ipopt_limits)}
+        finally:
+            if self.iteration_recorder is not None:
+                self.iteration_recorder.stop(self.ocp_solver.stats())
+        self.ocp.profiler.record_solver_stats(self.ocp_solver.stats())
+        return self.out
+
+    def prepare(self):
+        """
+        Emulate the preparation phase of a real-time iteration. Ipopt cannot linearize the problem ahead of the new
+        data, so only the nlpsol is built (if it is not already). Together with 'max_iter' set to 1, a warm start and
+        feedback, this gives a single Newton step that can be compared to the real-time iteration of ACADOS
+        """
+
+        self.build()
+
+    def feedback(self) -> dict:
+        """
+        Emulate the feedback phase of a real-time iteration by solving the nlp with the current data. The number of
+        Newton steps is limited by the 'max_iter' option
+
+        Returns
+        -------
+        A reference to the solution
+        """
+
+        return self.solve()
+
+    def build(self):
+        """
+        Build the nlpsol from the current structure of the ocp, if it is not already built
+        """
+
+        if self.ocp_solver is not None:
+            return
+
+        with self.ocp.profiler.stage("dispatch nlp"):
+            self.penalties = self.ocp.penalties
+            all_J, all_targets = self.__dispatch_obj_func()
+            all_g, self.g_bounds = self.__dispatch_bounds()
+            self.ipopt_nlp = {"x": self.ocp.v.vector, "f": sum1(all_J), "g": all_g}
+            if all_targets.shape[0]:
+                self.ipopt_nlp["p"] = all_targets
+        self.ocp.profiler.record_graph(self.ocp.v.vector, self.ipopt_nlp["f"], all_g, all_targets)
+
+        with self.ocp.profiler.stage("build nlpsol"):
+            if self.compile_nlp:
+                self.ocp_solver = self.__compiled_nlpsol()
+            else:
+                self.ocp_solver = nlpsol("nlpsol", "ipopt", self.ipopt_nlp, self.opts)
+
+    def get_limits(self) -> dict:
+        """
+        Get the current numerical values of the bounds, initial guess, objective targets and lagrange multipliers,
+        in the format expected by the nlpsol. The nlpsol must be built
+
+        Returns
+        -------
+        The inputs of the nlpsol
+        """
 
-        self.ipopt_nlp = {"x": self.ocp.v.vector, "f": sum1(all_J), "g": all_g}
         v_bounds = self.ocp.v.bounds
         v_init = self.ocp.v.init
-        self.ipopt_limits = {
+        limits = {
             "lbx": v_bounds.min,
             "ubx": v_bounds.max,
-            "lbg": all_g_bounds.min,
-            "ubg": all_g_bounds.max,
-            "x0": v_init.init,
+            "lbg": self.g_bounds.min,
+            "ubg": self.g_bounds.max,
+            "x0": v_init.init if self.x0 is None else self.x0,
         }
+        if "p" in self.ipopt_nlp:
+            limits["p"] = self.penalties.targets()
 
         if self.lam_g is not None:
-            self.ipopt_limits["lam_g0"] = self.lam_g
+            limits["lam_g0"] = self.lam_g
         if self.lam_x is not None:
-            self.ipopt_limits["lam_x0"] = self.lam_x
+            limits["lam_x0"] = self.lam_x
+        return limits
 
-        solver = nlpsol("nlpsol", "ipopt", self.ipopt_nlp, self.opts)
+    @staticmethod
+    def call_solver(solver: Function, limits: dict) -> dict:
+        """
+        Solve the nlp and gather the statistics of the optimization
+
+        Parameters
+        ----------
+        solver: Function
+            The nlpsol to call
+        limits: dict
+            The inputs of the nlpsol
+
+        Returns
+        -------
+        The Ipopt-like solution structure
+        """
 
-        # Solve the problem
         tic = time()
-        self.out = {"sol": solver.call(self.ipopt_limits)}
-        self.out["sol"]["time_tot"] = time() - tic
-        self.out["sol"]["iter"] = solver.stats()["iter_count"]
-        self.out["sol"]["inf_du"] = solver.stats()["iterations"]["inf_du"] if "iteration" in solver.stats() else None
-        self.out["sol"]["inf_pr"] = solver.stats()["iterations"]["inf_pr"] if "iteration" in solver.stats() else None
+        sol = solver.call(limits)
+        sol["time_tot"] = time() - tic
+        sol["iter"] = solver.stats()["iter_count"]
+        sol["inf_du"] = solver.stats()["iterations"]["inf_du"] if "iteration" in solver.stats() else None
+        sol["inf_pr"] = solver.stats()["iterations"]["inf_pr"] if "iteration" in solver.stats() else None
         # To match acados convention (0 = success, 1 = error)
-        self.out["sol"]["status"] = int(not solver.stats()["success"])
+        sol["status"] = int(not solver.stats()["success"])
+        return sol
 
-        return self.out
+    def solve_batch(self, all_limits: list, n_workers: int, on_solved: Callable) -> list:
+        """
+        Solve the nlp for several sets of numerical values. The solves are dispatched to a pool of processes forked
+        from the current one, so the nlpsol is built once and inherited by all the workers
+
+        Parameters
+        ----------
+        all_limits: list[dict]
+            The inputs of the nlpsol for each of the solves (see get_limits)
+        n_workers: int
+            The number of solves to run simultaneously
+        on_solved: Callable
+            The function called with the signature on_solved(index, out) each time a solve finishes, where index is the
+            position of the solve in all_limits and out is its solution structure. If it returns True, the solves that
+            are not started yet are cancelled
+
+        Returns
+        -------
+        The solution structure of each solve, in the same order as all_limits. Cancelled solves are None
+        """
+
+        self.build()
+        outs = [None] * len(all_limits)
+
+        if n_workers == 1:
+            for i, limits in enumerate(all_limits):
+                outs[i] = {"sol": self.call_solver(self.ocp_solver, limits)}
+                if on_solved(i, outs[i]):
+                    break
+            return outs
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("n_workers > 1 requires processes to be forked, which is not available on this platform")
+
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_batch_worker,
+            initargs=(self.ocp_solver,),
+        ) as executor:
+            futures = {executor.submit(_solve_in_batch_worker, limits): i for i, limits in enumerate(all_limits)}
+            try:
+                for future in as_completed(futures):
+                    i = futures[future]
+                    outs[i] = {"sol": future.result()}
+                    if on_solved(i, outs[i]):
+                        break
+            finally:
+                # Running solves are let to finish, the others are dropped
+                for future in futures:
+                    future.cancel()
+        return outs
+
+    def structure_hash(self) -> str:
+        """
+        Get a hash of the structure of the nlp, which identifies the compiled library. Two nlp with the same hash
+        generate the same C code, regardless of the values of the bounds, initial guess and targets
+
+        Returns
+        -------
+        The hexadecimal hash of the nlp
+        """
+
+        p = self.ipopt_nlp["p"] if "p" in self.ipopt_nlp else self.ocp.cx()
+        nlp = Function("nlp", [self.ipopt_nlp["x"], p], [self.ipopt_nlp["f"], self.ipopt_nlp["g"]])
+        structure = sha256(casadi.__version__.encode())
+        structure.update(str(self.opts["ipopt.hessian_approximation"]).encode())
+        structure.update(nlp.serialize().encode())
+        return structure.hexdigest()
+
+    def __compiled_nlpsol(self):
+        """
+        Load the nlpsol from a C-compiled shared library, generating and compiling it first if it is not in the cache
+
+        Returns
+        -------
+        The nlpsol evaluating the compiled library
+        """
+
+        folder = os.path.join(self.compile_folder, self.structure_hash())
+        library = os.path.join(folder, "nlp.dll" if platform == "win32" else "nlp.so")
+        if not os.path.isfile(library):
+            os.makedirs(folder, exist_ok=True)
+
+            # Files are generated with a unique name so concurrent runs do not collide, and the library is moved in
+            # place only once it is fully compiled
+            unique_name = f"nlp_{os.getpid()}"
+            c_file = nlpsol("nlpsol", "ipopt", self.ipopt_nlp, self.opts).generate_dependencies(f"{unique_name}.c")
+            tmp_library = os.path.join(folder, f"{unique_name}{os.path.splitext(library)[1]}")
+            try:
+                subprocess.run(
+                    [os.environ.get("CC", "gcc"), "-fPIC", "-shared", "-O1", c_file, "-o", tmp_library],
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+            except (OSError, subprocess.CalledProcessError) as e:
+                raise RuntimeError(
+                    f"The compilation of the nlp failed. Make sure a C compiler is available (it can be set using the "
+                    f"CC environment variable) or set 'compile_nlp' to False.\n{e}"
+                )
+            finally:
+                if os.path.isfile(c_file):
+                    os.remove(c_file)
+            os.replace(tmp_library, library)
+
+        return nlpsol("nlpsol", "ipopt", os.path.abspath(library), self.opts)
 
     def set_lagrange_multiplier(self, sol: Solution):
         """
@@ -160,46 +553,89 @@ class IpoptInterface(SolverInterface):
         self.lam_g = sol.lam_g
         self.lam_x = sol.lam_x
 
+    def set_warm_start(self, sol: Solution):
+        """
+        Use the primal and dual values of a previous solution as starting point of the next solve. The matching Ipopt
+        warm start options are enabled at the next call to configure
+
+        Parameters
+        ----------
+        sol: Solution
+            The solution to start from. It must have the same dimensions as the current ocp. If None, the warm start is
+            disabled and the initial guess of the ocp is used
+        """
+
+        if sol is None:
+            self.x0 = None
+            self.lam_g = None
+            self.lam_x = None
+            return
+
+        n_x = self.ocp.v.vector.shape[0]
+        if sol.vector is None or np.array(sol.vector).shape[0] != n_x:
+            raise ValueError("The solution to warm start from must have the same number of variables as the ocp")
+
+        self.x0 = np.array(sol.vector)
+        self.lam_x = sol.lam_x
+        self.lam_g = sol.lam_g
+
     def __dispatch_bounds(self):
         """
         Parse the bounds of the full ocp to a Ipopt-friendly one
         """
-        # TODO: This should be done in bounds, so it is available for all the code
-
-        all_g = self.ocp.cx()
-        all_g_bounds = Bounds(interpolation=InterpolationType.CONSTANT)
-        for i in range(len(self.ocp.g)):
-            for j in range(len(self.ocp.g[i])):
-                all_g = vertcat(all_g, self.ocp.g[i][j]["val"])
-                all_g_bounds.concatenate(self.ocp.g[i][j]["bounds"])
-        for nlp in self.ocp.nlp:
-            for i in range(len(nlp.g)):
-                for j in range(len(nlp.g[i])):
-                    if nlp.g[i][j]["constraint"].target is not None:
-                        # TODO This is not tested and therefore it is not sure it works..
-                        # TODO Add an example and test or remove?
-                        all_g = vertcat(all_g, nlp.g[i][j]["val"] - nlp.g[i][j]["target"])
-                    else:
-                        all_g = vertcat(all_g, nlp.g[i][j]["val"])
-                    all_g_bounds.concatenate(nlp.g[i][j]["bounds"])
-
-        if isinstance(all_g_bounds.min, (SX, MX)) or isinstance(all_g_bounds.max, (SX, MX)):
+
+        all_g = []
+        for g, phase in zip(self.penalties.constraints, self.penalties.constraint_phase):
+            if phase >= 0 and g["constraint"].target is not None:
+                # TODO This is not tested and therefore it is not sure it works..
+                # TODO Add an example and test or remove?
+                all_g.append(g["val"] - g["target"])
+            else:
+                all_g.append(g["val"])
+
+        if self.penalties.g_min is None:
             raise RuntimeError("Ipopt doesn't support SX/MX types in constraints bounds")
-        return all_g, all_g_bounds
+        all_g_bounds = Bounds(self.penalties.g_min, self.penalties.g_max, interpolation=InterpolationType.CONSTANT)
+        return vertcat(self.ocp.cx(), *all_g), all_g_bounds
 
     def __dispatch_obj_func(self):
         """
         Parse the objective functions of the full ocp to a Ipopt-friendly one
+
+        Returns
+        -------
+        The vector of all the objective values and the vector of the symbolic targets (and their masks)
+        """
+
+        all_J = []
+        all_targets = []
+        for idx in range(len(self.penalties.objectives)):
+            val, targets = self.__finalize_objective(idx)
+            all_J.append(val)
+            all_targets.append(targets)
+        return vertcat(self.ocp.cx(), *all_J), vertcat(self.ocp.cx(), *all_targets)
+
+    def __finalize_objective(self, idx: int) -> tuple:
         """
-        # TODO: This should be done in bounds, so it is available for all the code
+        Finalize an objective function, declaring its target (if any) as a parameter of the nlp
+
+        Parameters
+        ----------
+        idx: int
+            The index of the objective in the penalty registry
+
+        Returns
+        -------
+        The scalar value of the objective and the symbolic target and mask vector (empty if there is no target)
+        """
+
+        obj = self.penalties.objectives[idx]
+        if self.penalties.objective_target_rows[idx, 0] < 0:
+            return IpoptInterface.finalize_objective_value(obj), self.ocp.cx()
 
-        all_J = self.ocp.cx()
-        for j_nodes in self.ocp.J:
-            for obj in j_nodes:
-                all_J = vertcat(all_J, IpoptInterface.finalize_objective_value(obj))
-        for nlp in self.ocp.nlp:
-            for obj_nodes in nlp.J:
-                for obj in obj_nodes:
-                    all_J = vertcat(all_J, IpoptInterface.finalize_objective_value(obj))
+        shape = self.penalties.target_shape(obj["target"])
+        target = self.ocp.cx.sym(f"target_{idx}", shape[0], shape[1])
+        target_mask = self.ocp.cx.sym(f"target_mask_{idx}", shape[0], shape[1])
 
-        return all_J
+        val = IpoptInterface.finalize_objective_value(obj, target, target_mask)
+        return val, vertcat(target.reshape((-1, 1)), target_mask.reshape((-1, 1)))
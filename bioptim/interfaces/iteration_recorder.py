@@ -0,0 +1,518 @@
+from typing import Union
+import json
+import os
+import shutil
+
+import numpy as np
+from casadi import Callback, nlpsol_out, nlpsol_n_out, Sparsity, DM
+
+from ..optimization.solution import Solution
+
+
+class IterationRecorder(Callback):
+    """
+    CasADi interface of Ipopt callbacks that appends every iterate (x, f, g and the Lagrange multipliers) to a store on
+    the disk. The store is a folder of chunks of chunk_size iterates, each of them being a memory mapped .npy file,
+    so the memory used does not depend on the number of iterations. A header.json file describes the layout of the
+    rows and the number of iterates written so far, and it is updated each time a chunk is completed, so a store is
+    readable even if the optimization did not finish (see IterationReader). It does not need matplotlib
+
+    Attributes
+    ----------
+    folder: str
+        The folder of the store
+    chunk_size: int
+        The number of iterates per chunk
+    callback: Callback
+        Another iteration callback (e.g. the OnlineCallback) that receives the iterates after they are recorded
+    nx: int
+        The number of optimization variables
+    ng: int
+        The number of constraints
+    np: int
+        The number of parameters of the nlp (the targets of the objectives)
+    layout: dict
+        The first and last (excluded) columns of each output of the solver (x, f, g, lam_x, lam_g, lam_p) in a row
+    n_iterations: int
+        The number of iterates recorded since the last call to start
+    __chunk: np.memmap
+        The chunk being written (None when not recording)
+
+    Methods
+    -------
+    get_n_in() -> int
+        Get the number of variables in
+    get_n_out() -> int
+        Get the number of variables out
+    get_name_in(i: int) -> int
+        Get the name of a variable
+    get_name_out(_) -> str
+        Get the name of the output variable
+    get_sparsity_in(self, i: int) -> tuple[int]
+        Get the sparsity of a specific variable
+    eval(self, arg: Union[list, tuple]) -> list[int]
+        Record the current iterate
+    matches(self, ocp, folder: str, chunk_size: int) -> bool
+        Check if the recorder can be used as is for the current structure of an ocp
+    start(self)
+        Empty the store and start recording
+    stop(self, stats: dict)
+        Stop recording and write the statistics of the solver in the header
+    __write_header(self, stats: dict = None)
+        Write the description of the store
+    __chunk_path(self, index: int) -> str
+        Get the path of a chunk
+    """
+
+    def __init__(self, ocp, folder: str, chunk_size: int = 100, callback: Callback = None, opts: dict = {}):
+        """
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            A reference to the ocp to record
+        folder: str
+            The folder of the store
+        chunk_size: int
+            The number of iterates per chunk
+        callback: Callback
+            Another iteration callback that receives the iterates after they are recorded
+        opts: dict
+            Option to AnimateCallback method of CasADi
+        """
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        Callback.__init__(self)
+        self.folder = folder
+        self.chunk_size = chunk_size
+        self.callback = callback
+        self.nx = ocp.v.vector.shape[0]
+        self.ng = ocp.penalties.n_g
+        self.np = ocp.penalties.n_target_rows
+
+        self.layout = {}
+        offset = 0
+        for i in range(nlpsol_n_out()):
+            n = self.get_sparsity_in(i).nnz()
+            self.layout[nlpsol_out(i)] = [offset, offset + n]
+            offset += n
+
+        self.n_iterations = 0
+        self.__chunk = None
+        self.construct("IterationRecorder", opts)
+
+    @staticmethod
+    def get_n_in() -> int:
+        """
+        Get the number of variables in
+
+        Returns
+        -------
+        The number of variables in
+        """
+
+        return nlpsol_n_out()
+
+    @staticmethod
+    def get_n_out() -> int:
+        """
+        Get the number of variables out
+
+        Returns
+        -------
+        The number of variables out
+        """
+
+        return 1
+
+    @staticmethod
+    def get_name_in(i: int) -> int:
+        """
+        Get the name of a variable
+
+        Parameters
+        ----------
+        i: int
+            The index of the variable
+
+        Returns
+        -------
+        The name of the variable
+        """
+
+        return nlpsol_out(i)
+
+    @staticmethod
+    def get_name_out(_) -> str:
+        """
+        Get the name of the output variable
+
+        Returns
+        -------
+        The name of the output variable
+        """
+
+        return "ret"
+
+    def get_sparsity_in(self, i: int) -> tuple:
+        """
+        Get the sparsity of a specific variable
+
+        Parameters
+        ----------
+        i: int
+            The index of the variable
+
+        Returns
+        -------
+        The sparsity of the variable
+        """
+
+        n = nlpsol_out(i)
+        if n == "f":
+            return Sparsity.scalar()
+        elif n in ("x", "lam_x"):
+            return Sparsity.dense(self.nx)
+        elif n in ("g", "lam_g"):
+            return Sparsity.dense(self.ng)
+        elif n == "lam_p":
+            return Sparsity.dense(self.np)
+        else:
+            return Sparsity(0, 0)
+
+    def eval(self, arg: Union[list, tuple]) -> list:
+        """
+        Record the current iterate, then send it to the other callback (if any)
+
+        Parameters
+        ----------
+        arg: Union[list, tuple]
+            The outputs of the solver at the current iterate
+
+        Returns
+        -------
+        A list of error index
+        """
+
+        if self.__chunk is not None:
+            row = self.n_iterations % self.chunk_size
+            for i in range(nlpsol_n_out()):
+                start, stop = self.layout[nlpsol_out(i)]
+                if stop > start:
+                    self.__chunk[row, start:stop] = np.asarray(arg[i], dtype=float).reshape(-1)
+            self.n_iterations += 1
+
+            if row == self.chunk_size - 1:
+                # The chunk is complete, it is released and the header is updated so the store is readable as is
+                self.__chunk.flush()
+                self.__write_header()
+                self.__chunk = np.lib.format.open_memmap(
+                    self.__chunk_path(self.n_iterations // self.chunk_size),
+                    mode="w+",
+                    dtype=np.float64,
+                    shape=(self.chunk_size, self.layout["lam_p"][1]),
+                )
+
+        if self.callback is not None:
+            return self.callback.eval(arg)
+        return [0]
+
+    def matches(self, ocp, folder: str, chunk_size: int) -> bool:
+        """
+        Check if the recorder can be used as is for the current structure of an ocp
+
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            A reference to the ocp
+        folder: str
+            The folder of the store
+        chunk_size: int
+            The number of iterates per chunk
+
+        Returns
+        -------
+        If the sizes of the nlp and the store are the same
+        """
+
+        return (
+            self.folder == folder
+            and self.chunk_size == chunk_size
+            and self.nx == ocp.v.vector.shape[0]
+            and self.ng == ocp.penalties.n_g
+            and self.np == ocp.penalties.n_target_rows
+        )
+
+    def start(self):
+        """
+        Empty the store and start recording
+        """
+
+        if os.path.isdir(self.folder):
+            shutil.rmtree(self.folder)
+        os.makedirs(self.folder)
+
+        self.n_iterations = 0
+        self.__write_header()
+        self.__chunk = np.lib.format.open_memmap(
+            self.__chunk_path(0), mode="w+", dtype=np.float64, shape=(self.chunk_size, self.layout["lam_p"][1])
+        )
+
+    def stop(self, stats: dict):
+        """
+        Stop recording and write the statistics of the solver in the header
+
+        Parameters
+        ----------
+        stats: dict
+            The statistics of the solver
+        """
+
+        if self.__chunk is None:
+            return
+        self.__chunk.flush()
+        self.__chunk = None
+        if self.n_iterations % self.chunk_size == 0:
+            # The last chunk was opened but nothing was written in it
+            os.remove(self.__chunk_path(self.n_iterations // self.chunk_size))
+        self.__write_header(stats)
+
+    def __write_header(self, stats: dict = None):
+        """
+        Write the description of the store. The file is written under a temporary name and then renamed, so a reader
+        never sees a partially written header
+
+        Parameters
+        ----------
+        stats: dict
+            The statistics of the solver, if the optimization is finished
+        """
+
+        header = {
+            "n_iterations": self.n_iterations,
+            "chunk_size": self.chunk_size,
+            "layout": self.layout,
+            "finished": stats is not None,
+            "inf_pr": None,
+            "inf_du": None,
+            "status": None,
+        }
+        if stats is not None:
+            iterations = stats.get("iterations", {})
+            header["inf_pr"] = [float(v) for v in iterations.get("inf_pr", [])]
+            header["inf_du"] = [float(v) for v in iterations.get("inf_du", [])]
+            header["status"] = int(not stats.get("success", False))
+
+        path = os.path.join(self.folder, "header.json")
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(header, file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def __chunk_path(self, index: int) -> str:
+        """
+        Get the path of a chunk
+
+        Parameters
+        ----------
+        index: int
+            The index of the chunk
+
+        Returns
+        -------
+        The path of the chunk file
+        """
+
+        return os.path.join(self.folder, f"chunk_{index:05d}.npy")
+
+
+class IterationReader:
+    """
+    Replay the iterates recorded by an IterationRecorder. The chunks are memory mapped and only read when an iterate is
+    accessed, and the iterates are converted into Solution one at a time, so stores larger than the memory can be
+    analyzed
+
+    Attributes
+    ----------
+    folder: str
+        The folder of the store
+    ocp: OptimalControlProgram
+        A reference to the ocp that was recorded, required to build Solution
+    header: dict
+        The description of the store
+    __chunks: dict
+        The chunks that were already opened
+
+    Methods
+    -------
+    values(self, key: str, iteration: int) -> np.ndarray
+        Get an output of the solver at an iteration
+    series(self, key: str) -> np.ndarray
+        Get an output of the solver at all the iterations
+    solution(self, iteration: int) -> Solution
+        Get an iterate as a Solution
+    @property
+    inf_pr(self) -> list
+        The unscaled constraint violation at each iteration
+    @property
+    inf_du(self) -> list
+        The scaled dual infeasibility at each iteration
+    __row(self, iteration: int) -> np.ndarray
+        Get the memory mapped row of an iteration
+    """
+
+    def __init__(self, folder: str, ocp=None):
+        """
+        Parameters
+        ----------
+        folder: str
+            The folder of the store
+        ocp: OptimalControlProgram
+            A reference to the ocp that was recorded. It is only required to build Solution
+        """
+
+        self.folder = folder
+        self.ocp = ocp
+        with open(os.path.join(folder, "header.json"), "r") as file:
+            self.header = json.load(file)
+        self.__chunks = {}
+
+    def __len__(self) -> int:
+        """
+        Returns
+        -------
+        The number of iterates in the store
+        """
+
+        return self.header["n_iterations"]
+
+    def __iter__(self):
+        """
+        Replay the iterates as Solution, one at a time
+
+        Returns
+        -------
+        A generator of Solution
+        """
+
+        return (self.solution(i) for i in range(len(self)))
+
+    def __getitem__(self, iteration: int) -> Solution:
+        """
+        Parameters
+        ----------
+        iteration: int
+            The index of the iterate
+
+        Returns
+        -------
+        The iterate as a Solution (see solution)
+        """
+
+        return self.solution(iteration)
+
+    @property
+    def inf_pr(self) -> list:
+        """
+        The unscaled constraint violation at each iteration. It is None if the optimization did not finish
+        """
+
+        return self.header["inf_pr"]
+
+    @property
+    def inf_du(self) -> list:
+        """
+        The scaled dual infeasibility at each iteration. It is None if the optimization did not finish
+        """
+
+        return self.header["inf_du"]
+
+    def values(self, key: str, iteration: int) -> np.ndarray:
+        """
+        Get an output of the solver at an iteration
+
+        Parameters
+        ----------
+        key: str
+            The name of the output ('x', 'f', 'g', 'lam_x', 'lam_g' or 'lam_p')
+        iteration: int
+            The index of the iterate
+
+        Returns
+        -------
+        The values (read only view on the store)
+        """
+
+        if key not in self.header["layout"]:
+            raise ValueError(f"{key} is not recorded, the available values are {list(self.header['layout'].keys())}")
+        start, stop = self.header["layout"][key]
+        return self.__row(iteration)[start:stop]
+
+    def series(self, key: str) -> np.ndarray:
+        """
+        Get an output of the solver at all the iterations, e.g. to plot the convergence of the cost
+
+        Parameters
+        ----------
+        key: str
+            The name of the output ('x', 'f', 'g', 'lam_x', 'lam_g' or 'lam_p')
+
+        Returns
+        -------
+        The values, one row per iteration
+        """
+
+        if key not in self.header["layout"]:
+            raise ValueError(f"{key} is not recorded, the available values are {list(self.header['layout'].keys())}")
+        start, stop = self.header["layout"][key]
+        out = np.ndarray((len(self), stop - start))
+        for i in range(len(self)):
+            out[i, :] = self.__row(i)[start:stop]
+        return out
+
+    def solution(self, iteration: int) -> Solution:
+        """
+        Get an iterate as a Solution
+
+        Parameters
+        ----------
+        iteration: int
+            The index of the iterate
+
+        Returns
+        -------
+        The Solution of the iterate, with the cost, the constraints and the Lagrange multipliers of the iterate
+        """
+
+        if self.ocp is None:
+            raise RuntimeError("The ocp that was recorded must be given to the IterationReader to build Solution")
+
+        sol = {key: np.array(self.values(key, iteration))[:, np.newaxis] for key in ("x", "g", "lam_x", "lam_g")}
+        sol["f"] = DM(self.values("f", iteration)[0])
+        sol["iter"] = iteration
+        return Solution(self.ocp, sol)
+
+    def __row(self, iteration: int) -> np.ndarray:
+        """
+        Get the memory mapped row of an iteration
+
+        Parameters
+        ----------
+        iteration: int
+            The index of the iterate
+
+        Returns
+        -------
+        The row of the iterate
+        """
+
+        if iteration < 0:
+            iteration += len(self)
+        if iteration < 0 or iteration >= len(self):
+            raise IndexError(f"Iteration {iteration} is out of the {len(self)} recorded iterations")
+
+        index = iteration // self.header["chunk_size"]
+        if index not in self.__chunks:
+            path = os.path.join(self.folder, f"chunk_{index:05d}.npy")
+            self.__chunks[index] = np.load(path, mmap_mode="r")
+        return self.__chunks[index][iteration % self.header["chunk_size"]]
@@ -1,6 +1,6 @@
 from typing import Union
 import numpy as np
-from casadi import Function, sum1, sum2, MX, SX
+from casadi import sum1, sum2, MX, SX
 
 from ..misc.enums import Node
 
@@ -24,15 +24,25 @@ class SolverInterface:
         Set some options
     solve(self) -> dict
         Solve the prepared ocp
+    build(self)
+        Create the solver ahead of the first solve, so this setup can overlap with something else
+    prepare(self)
+        Do the part of the next real-time iteration that does not depend on the new data (preparation phase)
+    feedback(self) -> dict
+        Finish the real-time iteration prepared by prepare, using the current data (feedback phase)
+    invalidate_cache(self)
+        Declare that the structure of the ocp changed so any cached solver must be rebuilt
+    set_warm_start(self, sol: Solution)
+        Use the values of a previous solution as starting point of the next solve
     get_optimized_value(self) -> Union[list[dict], dict]
         Get the previously optimized solution
-    start_get_iterations(self)
+    start_get_iterations(self, folder: str = "iterations", chunk_size: int = 100)
         Create the necessary folder and create the file to store the iterations while optimizing
     finish_get_iterations(self)
         Close the file where iterations are saved and remove temporary folders
     get_objectives(self)
         Retrieve the objective values and put them in the out dict
-    finalize_objective_value(j: dict) -> Union[MX, SX]
+    finalize_objective_value(j: dict, target: Union[MX, SX] = None, target_mask: Union[MX, SX] = None) -> Union[MX, SX]
         Apply weight and dt to all objective values and convert them to scalar value
     """
 
@@ -71,6 +81,53 @@ class SolverInterface:
 
         raise RuntimeError("SolverInterface is an abstract class")
 
+    def build(self):
+        """
+        Create the solver ahead of the first solve, so this setup can overlap with something else (for instance the
+        arrival of the data). By default, the solver is created by solve, so there is nothing to do
+        """
+
+        pass
+
+    def prepare(self):
+        """
+        Do the part of the next real-time iteration that does not depend on the new data (preparation phase)
+        """
+
+        raise RuntimeError("SolverInterface is an abstract class")
+
+    def feedback(self) -> dict:
+        """
+        Finish the real-time iteration prepared by prepare, using the current data (feedback phase)
+
+        Returns
+        -------
+        A reference to the solution
+        """
+
+        raise RuntimeError("SolverInterface is an abstract class")
+
+    def invalidate_cache(self):
+        """
+        Declare that the structure of the ocp changed so any cached solver must be rebuilt. By default, the solver
+        does not keep anything between calls, so there is nothing to do
+        """
+
+        pass
+
+    def set_warm_start(self, sol):
+        """
+        Use the values of a previous solution as starting point of the next solve
+
+        Parameters
+        ----------
+        sol: Solution
+            The solution to start from. None disables the warm start
+        """
+
+        if sol is not None:
+            raise RuntimeError("Warm start is not implemented for this solver")
+
     def get_optimized_value(self) -> Union[list, dict]:
         """
         Get the previously optimized solution
@@ -85,7 +142,7 @@ class SolverInterface:
             out.append(self.out[key])
         return out[0] if len(out) == 1 else out
 
-    def online_optim(self, ocp):
+    def online_optim(self, ocp, show_options: dict = None):
         """
         Declare the online callback to update the graphs while optimizing
 
@@ -93,13 +150,22 @@ class SolverInterface:
         ----------
         ocp: OptimalControlProgram
             A reference to the current OptimalControlProgram
+        show_options: dict
+            The options of the online plots (see PlotOcp)
         """
 
         raise RuntimeError("SolverInterface is an abstract class")
 
-    def start_get_iterations(self):
+    def start_get_iterations(self, folder: str = "iterations", chunk_size: int = 100):
         """
         Create the necessary folder and create the file to store the iterations while optimizing
+
+        Parameters
+        ----------
+        folder: str
+            The folder where the iterations are stored
+        chunk_size: int
+            The number of iterations per file
         """
 
         raise RuntimeError("Get Iteration not implemented for solver")
@@ -174,24 +240,28 @@ class SolverInterface:
                             nodes.append(i)
                 return nodes
 
-            sol = sol["x"]
+            penalties = ocp.penalties
+            weighted = np.array(penalties.evaluate(ocp.v.vector, sol["x"])["weighted"])[:, 0]
             out = []
-            for nlp in ocp.nlp:
+            for idx_phase, nlp in enumerate(ocp.nlp):
                 nJ = len(nlp.J)
                 out.append(np.ndarray((nJ, nlp.ns)))
                 out[-1][:, :] = np.nan
                 for idx_obj_func in range(nJ):
+                    idx = penalties.objective_indices(idx_phase, idx_obj_func)
+                    if not idx.shape[0]:
+                        continue
                     nodes = __get_nodes(nlp.J[idx_obj_func][0]["objective"].node, nlp)
-                    nodes = nodes[: len(nlp.J[idx_obj_func])]
-                    for node, idx_node in enumerate(nodes):
-                        obj = Function("obj", [ocp.V], [self.finalize_objective_value(nlp.J[idx_obj_func][node])])
-                        out[-1][idx_obj_func, idx_node] = obj(sol)
+                    nodes = nodes[: idx.shape[0]]
+                    out[-1][idx_obj_func, nodes] = weighted[idx[: len(nodes)]]
             return out
 
         self.out["sol_obj"] = get_objective_values(self.ocp, self.out["sol"])
 
     @staticmethod
-    def finalize_objective_value(j: dict) -> Union[MX, SX]:
+    def finalize_objective_value(
+        j: dict, target: Union[MX, SX] = None, target_mask: Union[MX, SX] = None
+    ) -> Union[MX, SX]:
         """
         Apply weight and dt to all objective values and convert them to scalar value
 
@@ -199,6 +269,12 @@ class SolverInterface:
         ----------
         j: dict
             The dictionary of all the objective functions
+        target: Union[MX, SX]
+            A symbolic placeholder to use instead of the numerical j["target"]. This allows to change the target
+            without rebuilding the graph
+        target_mask: Union[MX, SX]
+            The symbolic placeholder of the mask associated with target (1 if the target is defined, 0 if it is nan).
+            It must be provided if target is provided
 
         Returns
         -------
@@ -206,10 +282,13 @@ class SolverInterface:
         """
 
         val = j["val"]
-        if j["target"] is not None:
-            nan_idx = np.isnan(j["target"])
-            j["target"][nan_idx] = 0
-            val -= j["target"]
+        if target is not None:
+            val = (val - target) * target_mask
+        elif j["target"] is not None:
+            target = np.array(j["target"], dtype=float)
+            nan_idx = np.isnan(target)
+            target[nan_idx] = 0
+            val -= target
             if np.any(nan_idx):
                 val[np.where(nan_idx)] = 0
 
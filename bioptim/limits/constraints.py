@@ -2,7 +2,7 @@ from typing import Callable, Union, Any
 from enum import Enum
 
 import numpy as np
-from casadi import sum1, horzcat, if_else, vertcat, lt, MX, SX, Function
+from casadi import sum1, horzcat, if_else, vertcat, lt, repmat, MX, SX, Function
 import biorbd
 
 from .path_conditions import Bounds
@@ -106,6 +106,8 @@ class ConstraintFunction(PenaltyFunctionAbstract):
         Add the constraint to the constraint pool
     clear_penalty(ocp: OptimalControlProgram, nlp: NonLinearProgram, penalty: Constraint)
         Resets a penalty. A negative penalty index creates a new empty penalty.
+    __bound_to_column(bound: Union[MX, SX, np.ndarray, float, int], n_rows: int) -> Union[MX, SX, np.ndarray]
+        Broadcast the bound of a constraint to one value per row of the constraint
     _parameter_modifier(constraint: Constraint)
         Apply some default parameters
     _span_checker(constraint, nlp)
@@ -329,32 +331,38 @@ class ConstraintFunction(PenaltyFunctionAbstract):
             penalty.name = f"CONTINUITY {i}"
             penalty.list_index = -1
             ConstraintFunction.clear_penalty(ocp, None, penalty)
-            # Loop over shooting nodes or use parallelization
-            if ocp.n_threads > 1:
-                end_nodes = nlp.par_dynamics(horzcat(*nlp.X[:-1]), horzcat(*nlp.U), nlp.p)[0]
-                val = horzcat(*nlp.X[1:]) - end_nodes
-                ConstraintFunction.add_to_penalty(ocp, None, val.reshape((nlp.nx * nlp.ns, 1)), penalty)
+
+            if nlp.control_type == ControlType.CONSTANT:
+                u = [nlp.U[k] for k in range(nlp.ns)]
+            elif nlp.control_type == ControlType.LINEAR_CONTINUOUS:
+                u = [horzcat(nlp.U[k], nlp.U[k + 1]) for k in range(nlp.ns)]
+            else:
+                raise NotImplementedError(f"Dynamics with {nlp.control_type} is not implemented yet")
+            with_params = (
+                isinstance(nlp.ode_solver, OdeSolver.RK4)
+                or isinstance(nlp.ode_solver, OdeSolver.RK8)
+                or isinstance(nlp.ode_solver, OdeSolver.IRK)
+            )
+
+            # Integrate all the intervals at once when the integrator is the same for all the nodes. Otherwise (e.g.
+            # external forces), each node has its own integrator, but the constraints are still declared all at once
+            if nlp.par_dynamics is not None:
+                if with_params:
+                    end_nodes = nlp.par_dynamics(x0=horzcat(*nlp.X[:-1]), p=horzcat(*u), params=nlp.p)["xf"]
+                else:
+                    end_nodes = nlp.par_dynamics(x0=horzcat(*nlp.X[:-1]), p=horzcat(*u))["xf"]
             else:
+                end_nodes = []
                 for k in range(nlp.ns):
-                    # Create an evaluation node
-                    if (
-                        isinstance(nlp.ode_solver, OdeSolver.RK4)
-                        or isinstance(nlp.ode_solver, OdeSolver.RK8)
-                        or isinstance(nlp.ode_solver, OdeSolver.IRK)
-                    ):
-                        if nlp.control_type == ControlType.CONSTANT:
-                            u = nlp.U[k]
-                        elif nlp.control_type == ControlType.LINEAR_CONTINUOUS:
-                            u = horzcat(nlp.U[k], nlp.U[k + 1])
-                        else:
-                            raise NotImplementedError(f"Dynamics with {nlp.control_type} is not implemented yet")
-                        end_node = nlp.dynamics[k](x0=nlp.X[k], p=u, params=nlp.p)["xf"]
+                    if with_params:
+                        end_nodes.append(nlp.dynamics[k](x0=nlp.X[k], p=u[k], params=nlp.p)["xf"])
                     else:
-                        end_node = nlp.dynamics[k](x0=nlp.X[k], p=nlp.U[k])["xf"]
+                        end_nodes.append(nlp.dynamics[k](x0=nlp.X[k], p=u[k])["xf"])
+                end_nodes = horzcat(*end_nodes)
 
-                    # Save continuity constraints
-                    val = end_node - nlp.X[k + 1]
-                    ConstraintFunction.add_to_penalty(ocp, None, val, penalty)
+            # Save continuity constraints
+            val = end_nodes - horzcat(*nlp.X[1:])
+            ConstraintFunction.add_to_penalty(ocp, None, val.reshape((nlp.nx * nlp.ns, 1)), penalty)
 
     @staticmethod
     def inter_phase_continuity(ocp, pt):
@@ -402,21 +410,13 @@ class ConstraintFunction(PenaltyFunctionAbstract):
             The actual constraint to declare
         """
 
-        g_bounds = Bounds(interpolation=InterpolationType.CONSTANT)
         penalty.min_bound = 0 if penalty.min_bound is None else penalty.min_bound
         penalty.max_bound = 0 if penalty.max_bound is None else penalty.max_bound
-        for i in range(val.rows()):
-            min_bound = (
-                penalty.min_bound[i]
-                if hasattr(penalty.min_bound, "__getitem__") and penalty.min_bound.shape[0] > 1
-                else penalty.min_bound
-            )
-            max_bound = (
-                penalty.max_bound[i]
-                if hasattr(penalty.max_bound, "__getitem__") and penalty.max_bound.shape[0] > 1
-                else penalty.max_bound
-            )
-            g_bounds.concatenate(Bounds(min_bound, max_bound, interpolation=InterpolationType.CONSTANT))
+        g_bounds = Bounds(
+            ConstraintFunction.__bound_to_column(penalty.min_bound, val.rows()),
+            ConstraintFunction.__bound_to_column(penalty.max_bound, val.rows()),
+            interpolation=InterpolationType.CONSTANT,
+        )
 
         g = {
             "constraint": penalty,
@@ -429,6 +429,32 @@ class ConstraintFunction(PenaltyFunctionAbstract):
         else:
             ocp.g[penalty.list_index].append(g)
 
+    @staticmethod
+    def __bound_to_column(bound: Union[MX, SX, np.ndarray, float, int], n_rows: int) -> Union[MX, SX, np.ndarray]:
+        """
+        Broadcast the bound of a constraint to one value per row of the constraint. A bound with more than one row
+        gives the value of each row, otherwise the same value is used for all the rows
+
+        Parameters
+        ----------
+        bound: Union[MX, SX, np.ndarray, float, int]
+            The min or max bound of the constraint
+        n_rows: int
+            The number of rows of the constraint
+
+        Returns
+        -------
+        The bound as a column vector of n_rows elements
+        """
+
+        if isinstance(bound, (MX, SX)):
+            return bound[:n_rows] if bound.shape[0] > 1 else repmat(bound, n_rows, 1)
+
+        bound = np.asarray(bound, dtype=float)
+        if len(bound.shape) and bound.shape[0] > 1:
+            return np.reshape(bound[:n_rows], (n_rows, 1))
+        return np.full((n_rows, 1), bound.reshape(-1)[0])
+
     @staticmethod
     def clear_penalty(ocp, nlp, penalty: Constraint):
         """
@@ -41,6 +41,8 @@ class PathCondition(np.ndarray):
         of required elements and time. If the function exit, then everything is okay
     evaluate_at(self, shooting_point: int)
         Evaluate the interpolation at a specific shooting point
+    evaluate_all(self, n_shooting: int) -> np.ndarray
+        Evaluate the interpolation at all the shooting points from 0 to n_shooting in one call
     """
 
     def __new__(
@@ -284,6 +286,51 @@ class PathCondition(np.ndarray):
         else:
             raise RuntimeError(f"InterpolationType is not implemented yet")
 
+    def evaluate_all(self, n_shooting: int) -> np.ndarray:
+        """
+        Evaluate the interpolation at all the shooting points from 0 to n_shooting in one call. The values are the same
+        as calling evaluate_at for each shooting point, but they are computed in one vectorized operation (except for
+        the CUSTOM interpolation, where the user function is called for each shooting point)
+
+        Parameters
+        ----------
+        n_shooting: int
+            The last shooting point to evaluate the path condition at
+
+        Returns
+        -------
+        The values of the components (rows) at each shooting point (columns)
+        """
+
+        if self.n_shooting is None:
+            raise RuntimeError(f"check_and_adjust_dimensions must be called at least once before evaluating at")
+
+        n_points = n_shooting + 1
+        if self.type == InterpolationType.CONSTANT:
+            return np.repeat(np.asarray(self)[:, 0:1], n_points, axis=1)
+        elif self.type == InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT:
+            if n_shooting > self.n_shooting:
+                raise RuntimeError("shooting point too high")
+            values = np.repeat(np.asarray(self)[:, 1:2], n_points, axis=1)
+            if n_shooting == self.n_shooting:
+                values[:, -1] = self[:, 2]
+            values[:, 0] = self[:, 0]
+            return values
+        elif self.type == InterpolationType.LINEAR:
+            start = np.asarray(self)[:, 0:1]
+            return start + (np.asarray(self)[:, 1:2] - start) * np.arange(n_points) / self.n_shooting
+        elif self.type == InterpolationType.EACH_FRAME:
+            if n_points > self.shape[1]:
+                raise RuntimeError("shooting point too high")
+            return np.array(self[:, :n_points])
+        elif self.type == InterpolationType.SPLINE:
+            spline = interp1d(self.t, np.asarray(self))
+            return spline(np.arange(n_points) / self.n_shooting * (self.t[-1] - self.t[0]))
+        elif self.type == InterpolationType.CUSTOM:
+            return np.array([np.reshape(self.evaluate_at(k), -1) for k in range(n_points)], dtype=float).T
+        else:
+            raise RuntimeError(f"InterpolationType is not implemented yet")
+
 
 class Bounds(OptionGeneric):
     """
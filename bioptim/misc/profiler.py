@@ -0,0 +1,213 @@
+from typing import Union
+from contextlib import contextmanager
+from time import perf_counter
+from sys import platform
+import json
+import tracemalloc
+
+from casadi import Function, MX, SX, jacobian, gradient, dot
+
+try:
+    import resource
+except ImportError:  # pragma: no cover, resource is only available on Unix
+    resource = None
+
+
+class Profiler:
+    """
+    Opt-in collector of the time and memory spent in each stage of the building and solving of an ocp, of the size of
+    the CasADi graphs and of the Ipopt statistics. When it is disabled, all the methods do nothing
+
+    Attributes
+    ----------
+    enabled: bool
+        If the profiler records anything
+    stages: list[dict]
+        The wall time (s), the python memory allocated and its peak during the stage (bytes) and the maximum resident
+        memory of the process at the end of the stage (bytes, None if not available) for each stage run since the
+        last reset, in the order they were run
+    graphs: dict
+        The size of the CasADi graphs (number of nodes and instructions of the nlp, number of nonzeros of the
+        Jacobian of the constraints and of the Hessian of the Lagrangian)
+    solver_stats: dict
+        The timings and counters of the last call to the solver
+
+    Methods
+    -------
+    stage(self, name: str)
+        Context manager that records the time and the memory spent in a stage
+    record_graph(self, x: Union[MX, SX], f: Union[MX, SX], g: Union[MX, SX], p: Union[MX, SX])
+        Record the size of the graph of an nlp
+    record_solver_stats(self, stats: dict)
+        Record the timings and counters of a call to the solver
+    report(self) -> Union[dict, None]
+        Get a copy of all the recorded values
+    reset(self)
+        Forget the stages and the solver statistics recorded so far
+    to_json(report: dict, file_path: str)
+        Export a report to a JSON file
+    __max_rss() -> Union[int, None]
+        Get the maximum resident memory of the process
+    """
+
+    def __init__(self, enabled: bool = False):
+        """
+        Parameters
+        ----------
+        enabled: bool
+            If the profiler records anything
+        """
+
+        self.enabled = enabled
+        self.stages = []
+        self.graphs = {}
+        self.solver_stats = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Context manager that records the time and the memory spent in a stage. Please note that the python memory does
+        not include what is allocated by CasADi itself, which is only reflected in the maximum resident memory. Stages
+        should not be nested, since the peak of python memory is reset at the beginning of each stage. Tracing the
+        python memory slows down the python code, so the wall times are slightly overestimated
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        memory_start, _ = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        tic = perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = perf_counter() - tic
+            memory_end, memory_peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self.stages.append(
+                {
+                    "name": name,
+                    "wall_time": wall_time,
+                    "python_memory": memory_end - memory_start,
+                    "python_memory_peak": memory_peak - memory_start,
+                    "max_rss": self.__max_rss(),
+                }
+            )
+
+    def record_graph(self, x: Union[MX, SX], f: Union[MX, SX], g: Union[MX, SX], p: Union[MX, SX]):
+        """
+        Record the size of the graph of an nlp
+
+        Parameters
+        ----------
+        x: Union[MX, SX]
+            The optimization variables
+        f: Union[MX, SX]
+            The objective function
+        g: Union[MX, SX]
+            The constraints
+        p: Union[MX, SX]
+            The parameters of the nlp
+        """
+
+        if not self.enabled:
+            return
+
+        with self.stage("graph sizes"):
+            nlp = Function("nlp", [x, p], [f, g])
+            lam = type(x).sym("lam", g.shape[0], 1)
+            jac_g = Function("jac_g", [x, p], [jacobian(g, x)])
+            grad_lag = Function("grad_lag", [x, p, lam], [gradient(f + dot(lam, g), x)])
+            self.graphs = {
+                "type": "SX" if isinstance(x, SX) else "MX",
+                "n_variables": x.shape[0],
+                "n_constraints": g.shape[0],
+                "n_nodes": nlp.n_nodes(),
+                "n_instructions": nlp.n_instructions(),
+                "nnz_jacobian_g": jac_g.sparsity_out(0).nnz(),
+                "nnz_hessian_lagrangian": grad_lag.sparsity_jac(0, 0).nnz(),
+            }
+
+    def record_solver_stats(self, stats: dict):
+        """
+        Record the timings and counters of a call to the solver. Only the scalar values are kept, for instance, the
+        t_wall_* and t_proc_* timings of each function evaluated by Ipopt (nlp_f, nlp_g, nlp_grad_f, nlp_jac_g,
+        nlp_hess_l and the total), their number of calls and the number of iterations
+
+        Parameters
+        ----------
+        stats: dict
+            The statistics of the solver
+        """
+
+        if not self.enabled:
+            return
+
+        self.solver_stats = {
+            key: value for key, value in stats.items() if isinstance(value, (bool, int, float, str)) or value is None
+        }
+
+    def report(self) -> Union[dict, None]:
+        """
+        Get a copy of all the recorded values
+
+        Returns
+        -------
+        The report with the keys 'stages', 'graphs' and 'solver_stats'. None if the profiler is disabled
+        """
+
+        if not self.enabled:
+            return None
+        return {"stages": list(self.stages), "graphs": dict(self.graphs), "solver_stats": dict(self.solver_stats)}
+
+    def reset(self):
+        """
+        Forget the stages and the solver statistics recorded so far, so the next report only covers what is run
+        afterward. The size of the graphs is kept, since it does not change until the nlp is rebuilt
+        """
+
+        self.stages = []
+        self.solver_stats = {}
+
+    @staticmethod
+    def to_json(report: dict, file_path: str):
+        """
+        Export a report to a JSON file
+
+        Parameters
+        ----------
+        report: dict
+            The report to export (see report)
+        file_path: str
+            The path of the JSON file
+        """
+
+        with open(file_path, "w") as file:
+            json.dump(report, file, indent=2)
+
+    @staticmethod
+    def __max_rss() -> Union[int, None]:
+        """
+        Get the maximum resident memory of the process
+
+        Returns
+        -------
+        The maximum resident memory in bytes, None if it is not available on this platform
+        """
+
+        if resource is None:
+            return None
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes while the other platforms report kilobytes
+        return max_rss if platform == "darwin" else max_rss * 1024
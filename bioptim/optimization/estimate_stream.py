@@ -0,0 +1,204 @@
+import numpy as np
+
+
+class WindowEstimate:
+    """
+    The estimate of one window of a streamed receding horizon optimization (see MovingHorizonEstimator.stream)
+
+    Attributes
+    ----------
+    index: int
+        The index of the window (starts at 0 and increments after each solve)
+    time: float
+        The time of the first frame of the window since the beginning of the stream, in the time of the ocp
+    timestamp: float
+        The wall time (time.time()) at which the measurement of the window was received
+    states: np.ndarray
+        The estimated states of the frames the window moved by (n_states x n_frames)
+    controls: np.ndarray
+        The estimated controls of the frames the window moved by (n_controls x n_frames)
+    latency: dict
+        The time spent solving the window ('solve', update_function included) and the time from the reception of the
+        measurement to the estimate being available ('total'), in seconds
+    solution: Solution
+        The full solution of the window
+    """
+
+    def __init__(
+        self,
+        index: int,
+        time: float,
+        timestamp: float,
+        states: np.ndarray,
+        controls: np.ndarray,
+        latency: dict,
+        solution,
+    ):
+        """
+        Parameters
+        ----------
+        index: int
+            The index of the window
+        time: float
+            The time of the first frame of the window since the beginning of the stream
+        timestamp: float
+            The wall time at which the measurement of the window was received
+        states: np.ndarray
+            The estimated states of the frames the window moved by
+        controls: np.ndarray
+            The estimated controls of the frames the window moved by
+        latency: dict
+            The time spent solving the window and the total latency of the estimate
+        solution: Solution
+            The full solution of the window
+        """
+
+        self.index = index
+        self.time = time
+        self.timestamp = timestamp
+        self.states = states
+        self.controls = controls
+        self.latency = latency
+        self.solution = solution
+
+
+class EstimateHistory:
+    """
+    The last frames estimated by a streamed receding horizon optimization. The frames are stored in preallocated ring
+    buffers, so the memory used does not grow with the length of the stream
+
+    Attributes
+    ----------
+    max_len: int
+        The maximum number of frames kept, the oldest ones being overwritten
+    __states: np.ndarray
+        The ring buffer of the states (n_states x max_len)
+    __controls: np.ndarray
+        The ring buffer of the controls (n_controls x max_len)
+    __time: np.ndarray
+        The ring buffer of the time of the frames
+    __timestamps: np.ndarray
+        The ring buffer of the wall time at which the measurement of the frames was received
+    __n_frames: int
+        The number of frames appended since the beginning
+
+    Methods
+    -------
+    __len__(self) -> int
+        The number of frames kept
+    append(self, estimate: WindowEstimate, dt: float)
+        Add the frames of a window to the history
+    __ordered(self, data: np.ndarray) -> np.ndarray
+        Get the content of a ring buffer from the oldest to the newest frame
+    @property
+    states(self) -> np.ndarray
+        The states of the frames kept, from the oldest to the newest
+    @property
+    controls(self) -> np.ndarray
+        The controls of the frames kept, from the oldest to the newest
+    @property
+    time(self) -> np.ndarray
+        The time of the frames kept
+    @property
+    timestamps(self) -> np.ndarray
+        The wall time at which the measurement of the frames kept was received
+    """
+
+    def __init__(self, n_states: int, n_controls: int, max_len: int):
+        """
+        Parameters
+        ----------
+        n_states: int
+            The number of states
+        n_controls: int
+            The number of controls
+        max_len: int
+            The maximum number of frames kept
+        """
+
+        if max_len < 1:
+            raise ValueError("history_len must be a positive integer")
+        self.max_len = max_len
+        self.__states = np.ndarray((n_states, max_len))
+        self.__controls = np.ndarray((n_controls, max_len))
+        self.__time = np.ndarray((max_len,))
+        self.__timestamps = np.ndarray((max_len,))
+        self.__n_frames = 0
+
+    def __len__(self) -> int:
+        """
+        The number of frames kept
+        """
+
+        return min(self.__n_frames, self.max_len)
+
+    def append(self, estimate: WindowEstimate, dt: float):
+        """
+        Add the frames of a window to the history, overwriting the oldest ones if the history is full
+
+        Parameters
+        ----------
+        estimate: WindowEstimate
+            The estimate of the window
+        dt: float
+            The time between two frames
+        """
+
+        n_frames = estimate.states.shape[1]
+        idx = np.arange(self.__n_frames, self.__n_frames + n_frames) % self.max_len
+        self.__states[:, idx] = estimate.states
+        self.__controls[:, idx] = estimate.controls
+        self.__time[idx] = estimate.time + np.arange(n_frames) * dt
+        self.__timestamps[idx] = estimate.timestamp
+        self.__n_frames += n_frames
+
+    def __ordered(self, data: np.ndarray) -> np.ndarray:
+        """
+        Get the content of a ring buffer from the oldest to the newest frame
+
+        Parameters
+        ----------
+        data: np.ndarray
+            The ring buffer
+
+        Returns
+        -------
+        A copy of the frames kept, in chronological order
+        """
+
+        if self.__n_frames <= self.max_len:
+            return data[..., : self.__n_frames].copy()
+        start = self.__n_frames % self.max_len
+        return np.concatenate((data[..., start:], data[..., :start]), axis=-1)
+
+    @property
+    def states(self) -> np.ndarray:
+        """
+        The states of the frames kept, from the oldest to the newest
+        """
+
+        return self.__ordered(self.__states)
+
+    @property
+    def controls(self) -> np.ndarray:
+        """
+        The controls of the frames kept, from the oldest to the newest
+        """
+
+        return self.__ordered(self.__controls)
+
+    @property
+    def time(self) -> np.ndarray:
+        """
+        The time of the frames kept, from the oldest to the newest
+        """
+
+        return self.__ordered(self.__time)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """
+        The wall time at which the measurement of the frames kept was received
+        """
+
+        return self.__ordered(self.__timestamps)
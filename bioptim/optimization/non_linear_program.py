@@ -15,6 +15,9 @@ class NonLinearProgram:
 
     Attributes
     ----------
+    accum_dynamics: casadi.Function
+        The casadi function of the dynamics chained over all the nodes, the final state of a node being the initial
+        state of the next one. It is None if each node has its own integrator (e.g. with external forces)
     casadi_func: dict
         All the declared casadi function
     contact_forces_func = function
@@ -62,7 +65,8 @@ class NonLinearProgram:
     parameters: ParameterList
         Reference to the optimized parameters in the underlying ocp
     par_dynamics: casadi.Function
-        The casadi function of the threaded dynamics
+        The casadi function of the dynamics mapped over all the nodes (threaded if n_threads > 1). It is None if each
+        node has its own integrator (e.g. with external forces)
     phase_idx: int
         The index of the current nlp in the ocp.nlp structure
     plot: dict
@@ -114,6 +118,7 @@ class NonLinearProgram:
     """
 
     def __init__(self):
+        self.accum_dynamics = None
         self.casadi_func = {}
         self.contact_forces_func = None
         self.control_type = ControlType.NONE
@@ -6,11 +6,13 @@ from math import inf
 
 import biorbd
 import casadi
+import numpy as np
 from casadi import MX, SX
 
 from .non_linear_program import NonLinearProgram as NLP
 from .variable import OptimizationVariable
 from ..dynamics.dynamics_type import DynamicsList, Dynamics
+from ..dynamics.function_cache import FunctionCache
 from ..dynamics.ode_solver import OdeSolver, OdeSolverBase
 from ..dynamics.problem import Problem
 from ..gui.plot import CustomPlot, PlotOcp
@@ -26,9 +28,12 @@ from ..limits.objective_functions import ObjectiveFunction
 from ..misc.__version__ import __version__
 from ..misc.enums import ControlType, Solver, Shooting
 from ..misc.mapping import BiMapping, Mapping
+from ..misc.profiler import Profiler
 from ..misc.utils import check_version
 from ..optimization.parameters import ParameterList, Parameter
+from ..optimization.penalty_registry import PenaltyRegistry
 from ..optimization.solution import Solution
+from ..optimization.solution_file import SolutionFile
 
 check_version(biorbd, "1.5.3", "1.6.0")
 
@@ -42,6 +47,8 @@ class OptimalControlProgram:
     ----------
     cx: [MX, SX]
         The base type for the symbolic casadi variables
+    function_cache: FunctionCache
+        The persistent cache of the expanded dynamics functions
     g: list
         Constraints that are not phase dependent (mostly parameters and continuity constraints)
     J: list
@@ -64,8 +71,12 @@ class OptimalControlProgram:
         The time vector as sent by the user
     original_values: dict
         A copy of the ocp as it is after defining everything
+    _penalties: PenaltyRegistry
+        The cached flat index of the objectives and constraints, None if it must be rebuilt
     phase_transitions: list[PhaseTransition]
         The list of transition constraint between phases
+    profiler: Profiler
+        The collector of the time and memory spent in each stage of the building and solving of the ocp
     solver: SolverInterface
         A reference to the ocp solver
     solver_type: Solver
@@ -77,6 +88,9 @@ class OptimalControlProgram:
 
     Methods
     -------
+    @property
+    penalties(self) -> PenaltyRegistry
+        Get the flat index of all the objectives and constraints of the ocp
     update_objectives(self, new_objective_function: Union[Objective, ObjectiveList])
         The main user interface to add or modify objective functions in the ocp
     update_objectives_target(self, target, phase=None, list_index=None)
@@ -99,8 +113,12 @@ class OptimalControlProgram:
         The main user interface to add a new plot to the ocp
     prepare_plots(self, automatically_organize: bool, adapt_graph_size_to_bounds: bool, shooting_type: Shooting) -> PlotOCP
         Create all the plots associated with the OCP
-    solve(self, solver: Solver, show_online_optim: bool, solver_options: dict) -> Solution
+    solve(self, solver: Solver, show_online_optim: bool, solver_options: dict, warm_start: Solution, show_options: dict) -> Solution
         Call the solver to actually solve the ocp
+    solve_batch(self, updates: list, n_workers: int, solver_options: dict, stop_function: Callable) -> list
+        Solve several variants of the ocp which only differ by numerical values, in parallel
+    _set_solver(self, solver: Solver, solver_options: dict = None)
+        Declare the interface to the solver, if it is not already the current one
     save(self, sol: Solution, file_path: str, stand_alone: bool = False)
         Save the ocp and solution structure to the hard drive. It automatically create the required
         folder if it does not exists. Please note that biorbd is required to load back this structure.
@@ -113,6 +131,10 @@ class OptimalControlProgram:
     __modify_penalty(self, new_penalty: Union[PenaltyOption, Parameter])
         The internal function to modify a penalty. It is also stored in the original_values, meaning that if one
         overrides an objective only the latter is preserved when saved
+    __apply_numerical_update(self, update: dict)
+        Apply the numerical values of a variant of solve_batch to the ocp
+    __invalidate_solver(self)
+        Inform the solver (if any) and the penalty registry that the structure of the ocp changed so they are rebuilt
     """
 
     def __init__(
@@ -139,6 +161,8 @@ class OptimalControlProgram:
         phase_transitions: PhaseTransitionList = PhaseTransitionList(),
         n_threads: int = 1,
         use_sx: bool = False,
+        profile: bool = False,
+        function_cache_folder: str = None,
     ):
         """
         Parameters
@@ -187,6 +211,12 @@ class OptimalControlProgram:
             The number of thread to use while solving (multi-threading if > 1)
         use_sx: bool
             The nature of the casadi variables. MX are used if False.
+        profile: bool
+            If the time and memory spent in each stage of the building and solving of the ocp, the size of the graphs
+            and the solver statistics should be recorded. The report is available in Solution.profile
+        function_cache_folder: str
+            The folder where the expanded dynamics functions are cached between the constructions of the ocp. The
+            cache is disabled if it is None
         """
 
         if isinstance(biorbd_model, str):
@@ -232,6 +262,8 @@ class OptimalControlProgram:
             "phase_transitions": phase_transitions,
             "n_threads": n_threads,
             "use_sx": use_sx,
+            "profile": profile,
+            "function_cache_folder": function_cache_folder,
         }
 
         # Check integrity of arguments
@@ -307,6 +339,12 @@ class OptimalControlProgram:
         if not isinstance(use_sx, bool):
             raise RuntimeError("use_sx should be a bool")
 
+        if function_cache_folder is not None and not isinstance(function_cache_folder, str):
+            raise RuntimeError("function_cache_folder should be a str")
+
+        self.profiler = Profiler(profile)
+        self.function_cache = FunctionCache(function_cache_folder)
+
         # Type of CasADi graph
         if use_sx:
             self.cx = SX
@@ -316,6 +354,7 @@ class OptimalControlProgram:
         # Declare optimization variables
         self.J = []
         self.g = []
+        self._penalties = None
         self.v = OptimizationVariable(self)
 
         # nlp is the core of a phase
@@ -371,35 +410,59 @@ class OptimalControlProgram:
         # Prepare the dynamics
         for i in range(self.n_phases):
             self.nlp[i].initialize(self.cx)
-            Problem.initialize(self, self.nlp[i])
+            with self.profiler.stage(f"Problem.initialize (phase {i})"):
+                Problem.initialize(self, self.nlp[i])
             if self.nlp[0].nx != self.nlp[i].nx or self.nlp[0].nu != self.nlp[i].nu:
                 raise RuntimeError("Dynamics with different nx or nu is not supported yet")
-            self.nlp[i].ode_solver.prepare_dynamic_integrator(self, self.nlp[i])
+            with self.profiler.stage(f"prepare_dynamic_integrator (phase {i})"):
+                self.nlp[i].ode_solver.prepare_dynamic_integrator(self, self.nlp[i])
 
         # Define the actual NLP problem
-        self.v.define_ocp_shooting_points()
+        with self.profiler.stage("define_ocp_shooting_points"):
+            self.v.define_ocp_shooting_points()
 
         # Define continuity constraints
         # Prepare phase transitions (Reminder, it is important that parameters are declared before,
         # otherwise they will erase the phase_transitions)
-        self.phase_transitions = PhaseTransitionFunctions.prepare_phase_transitions(self, phase_transitions)
+        with self.profiler.stage("prepare_phase_transitions"):
+            self.phase_transitions = PhaseTransitionFunctions.prepare_phase_transitions(self, phase_transitions)
 
         # Inner- and inter-phase continuity
-        ContinuityFunctions.continuity(self)
+        with self.profiler.stage("ContinuityFunctions.continuity"):
+            ContinuityFunctions.continuity(self)
 
         self.isdef_x_init = False
         self.isdef_u_init = False
         self.isdef_x_bounds = False
         self.isdef_u_bounds = False
 
-        self.update_bounds(x_bounds, u_bounds)
-        self.update_initial_guess(x_init, u_init)
+        with self.profiler.stage("update_bounds"):
+            self.update_bounds(x_bounds, u_bounds)
+        with self.profiler.stage("update_initial_guess"):
+            self.update_initial_guess(x_init, u_init)
 
         # Prepare constraints
-        self.update_constraints(constraints)
+        with self.profiler.stage("update_constraints"):
+            self.update_constraints(constraints)
 
         # Prepare objectives
-        self.update_objectives(objective_functions)
+        with self.profiler.stage("update_objectives"):
+            self.update_objectives(objective_functions)
+
+    @property
+    def penalties(self) -> PenaltyRegistry:
+        """
+        Get the flat index of all the objectives and constraints of the ocp. It is built at the first access and kept
+        until the structure of the ocp changes
+
+        Returns
+        -------
+        The penalty registry
+        """
+
+        if self._penalties is None:
+            self._penalties = PenaltyRegistry(self)
+        return self._penalties
 
     def update_objectives(self, new_objective_function: Union[Objective, ObjectiveList]):
         """
@@ -444,7 +507,14 @@ class OptimalControlProgram:
         if list_index is None:
             raise ValueError("'phase' must be defined")
 
-        ObjectiveFunction.update_target(self.nlp[phase] if phase >= 0 else self, list_index, target)
+        ocp_or_nlp = self.nlp[phase] if phase >= 0 else self
+        had_target = list_index < len(ocp_or_nlp.J) and all(j["target"] is not None for j in ocp_or_nlp.J[list_index])
+        ObjectiveFunction.update_target(ocp_or_nlp, list_index, target)
+
+        # Targets are parameters of the solver, changing their values does not require to rebuild it. Only adding a
+        # target to an objective which had none modifies the structure of the problem
+        if not had_target:
+            self.__invalidate_solver()
 
     def update_constraints(self, new_constraint: Union[Constraint, ConstraintList]):
         """
@@ -545,6 +615,7 @@ class OptimalControlProgram:
                 self.v.parameters_in_list[idx].initial_guess.init = param.init
             except ValueError:
                 raise ValueError("update_initial_guess cannot declare new parameters")
+            self.v.invalidate_parameters()
 
         if self.isdef_x_init and self.isdef_u_init:
             self.v.define_ocp_initial_guess()
@@ -631,6 +702,8 @@ class OptimalControlProgram:
         solver: Solver = Solver.IPOPT,
         show_online_optim: bool = False,
         solver_options: dict = None,
+        warm_start: Solution = None,
+        show_options: dict = None,
     ) -> Solution:
         """
         Call the solver to actually solve the ocp
@@ -645,12 +718,45 @@ class OptimalControlProgram:
         solver_options: dict
             Any options to change the behavior of the solver. To know which options are available, you can refer to the
             manual of the corresponding solver
+        warm_start: Solution
+            A previous solution of the same ocp to start from. The primal values and the Lagrange multipliers are
+            used to initialize the solver (only available with Solver.IPOPT)
+        show_options: dict
+            The options of the online plots when show_online_optim is True (see PlotOcp), for instance
+            'max_update_frequency' (Hz) and 'update_every' (number of iterations) to limit the refresh rate
 
         Returns
         -------
         The optimized solution structure
         """
 
+        self._set_solver(solver, solver_options)
+
+        if show_online_optim:
+            self.solver.online_optim(self, show_options)
+
+        self.solver.set_warm_start(warm_start)
+        self.solver.configure(solver_options)
+        self.solver.solve()
+
+        sol = Solution(self, self.solver.get_optimized_value())
+        # Each report covers a single solve (and the building of the ocp for the first one)
+        sol.profile = self.profiler.report()
+        self.profiler.reset()
+        return sol
+
+    def _set_solver(self, solver: Solver, solver_options: dict = None):
+        """
+        Declare the interface to the solver, if it is not already the current one
+
+        Parameters
+        ----------
+        solver: Solver
+            The solver which will be used to solve the ocp
+        solver_options: dict
+            The options of the solver. Some solvers (ACADOS) need them to be created
+        """
+
         if solver == Solver.IPOPT and self.solver_type != Solver.IPOPT:
             from ..interfaces.ipopt_interface import IpoptInterface
 
@@ -667,13 +773,108 @@ class OptimalControlProgram:
             raise RuntimeError("Solver not specified")
         self.solver_type = solver
 
-        if show_online_optim:
-            self.solver.online_optim(self)
+    def solve_batch(
+        self,
+        updates: list,
+        n_workers: int = 1,
+        solver_options: dict = None,
+        stop_function: Callable = None,
+    ) -> list:
+        """
+        Solve several variants of the ocp which only differ by numerical values (bounds, initial guesses and objective
+        targets). The nlp is built once with Ipopt and the solves are dispatched to n_workers processes. Each update is
+        applied to the ocp in turn, so the ocp is left with the last one when the function returns
 
+        Parameters
+        ----------
+        updates: list[dict]
+            The numerical values of each variant. The keys can be 'x_bounds' and 'u_bounds' (sent to update_bounds),
+            'x_init', 'u_init' and 'param_init' (sent to update_initial_guess) and 'objectives_target' which is a
+            list of dict with the keys 'target', 'phase' and 'list_index' (sent to update_objectives_target)
+        n_workers: int
+            The number of solves to run simultaneously
+        solver_options: dict
+            Any options to change the behavior of Ipopt
+        stop_function: Callable
+            A function with the signature stop_function(index, sol), called each time a solve finishes, where index is
+            the position of the variant in updates and sol is its Solution. If it returns True, the solves that are not
+            started yet are cancelled
+
+        Returns
+        -------
+        The optimized solution structure of each variant, in the same order as updates. The cancelled variants are
+        None. The time_to_optimize of each Solution is the time spent in its own solve
+        """
+
+        if self.solver_type != Solver.IPOPT:
+            from ..interfaces.ipopt_interface import IpoptInterface
+
+            self.solver = IpoptInterface(self)
+            self.solver_type = Solver.IPOPT
+        if n_workers < 1:
+            raise ValueError("n_workers must be a positive integer")
+
+        self.solver.set_warm_start(None)
         self.solver.configure(solver_options)
-        self.solver.solve()
 
-        return Solution(self, self.solver.get_optimized_value())
+        # The first update may change the structure of an already solved ocp (e.g. a target added to an objective that
+        # had none), so the reference solver is the one built after it
+        all_limits = []
+        reference_solver = None
+        for update in updates:
+            self.__apply_numerical_update(update)
+            self.solver.build()
+            if reference_solver is None:
+                reference_solver = self.solver.ocp_solver
+            elif reference_solver is not self.solver.ocp_solver:
+                raise RuntimeError(
+                    "The updates of solve_batch must only change numerical values, the structure of the ocp must "
+                    "remain the same for all the variants"
+                )
+            all_limits.append({key: np.array(value, dtype=float) for key, value in self.solver.get_limits().items()})
+
+        solutions = [None] * len(updates)
+
+        def on_solved(index: int, out: dict) -> bool:
+            # The ocp holds the last update, so each Solution keeps the targets of its own variant
+            solutions[index] = Solution(self, out["sol"])
+            solutions[index].targets = all_limits[index].get("p")
+            return stop_function is not None and bool(stop_function(index, solutions[index]))
+
+        self.solver.solve_batch(all_limits, n_workers, on_solved)
+        return solutions
+
+    def __apply_numerical_update(self, update: dict):
+        """
+        Apply the numerical values of a variant of solve_batch to the ocp
+
+        Parameters
+        ----------
+        update: dict
+            The new numerical values (see solve_batch)
+        """
+
+        unknown_keys = set(update.keys()) - {
+            "x_bounds",
+            "u_bounds",
+            "x_init",
+            "u_init",
+            "param_init",
+            "objectives_target",
+        }
+        if unknown_keys:
+            raise ValueError(f"{sorted(unknown_keys)} cannot be updated in solve_batch")
+
+        if "x_bounds" in update or "u_bounds" in update:
+            self.update_bounds(update.get("x_bounds", BoundsList()), update.get("u_bounds", BoundsList()))
+        if "x_init" in update or "u_init" in update or "param_init" in update:
+            self.update_initial_guess(
+                update.get("x_init", InitialGuessList()),
+                update.get("u_init", InitialGuessList()),
+                update.get("param_init", InitialGuessList()),
+            )
+        for target in update.get("objectives_target", []):
+            self.update_objectives_target(target["target"], phase=target.get("phase"), list_index=target["list_index"])
 
     def save(self, sol: Solution, file_path: str, stand_alone: bool = False):
         """
@@ -689,14 +890,21 @@ class OptimalControlProgram:
         stand_alone: bool
             If set to True, the variable dictionaries (states, controls and parameters) are saved instead of the full
             Solution class itself. This allows to load the saved file into a setting where bioptim is not installed
-            using the pickle package, but prevents from using the class methods Solution offers after loading the file
+            using the pickle package, but prevents from using the class methods Solution offers after loading the file.
+            For the compact format (.npz), the arguments of the ocp are not saved, so the file can only be read using
+            SolutionFile
         """
 
         _, ext = os.path.splitext(file_path)
         if ext == "":
             file_path = file_path + ".bo"
+        elif ext == ".npz":
+            SolutionFile.save(file_path, sol, None if stand_alone else self.original_values, self.version)
+            return
         elif ext != ".bo":
-            raise RuntimeError(f"Incorrect extension({ext}), it should be (.bo) or (.bob) if you use save_get_data.")
+            raise RuntimeError(
+                f"Incorrect extension({ext}), it should be (.bo), (.npz) or (.bob) if you use save_get_data."
+            )
 
         if stand_alone:
             # TODO check if this file is loaded when load is used, and raise an error
@@ -717,18 +925,23 @@ class OptimalControlProgram:
     @staticmethod
     def load(file_path: str) -> list:
         """
-        Reload a previous optimization (*.bo) saved using save
+        Reload a previous optimization (*.bo or *.npz) saved using save. To only read some of the variables of a *.npz
+        file without rebuilding the ocp, SolutionFile can be used instead
 
         Parameters
         ----------
         file_path: str
-            The path to the *.bo file
+            The path to the *.bo or *.npz file
 
         Returns
         -------
         The ocp and sol structure. If it was saved, the iterations are also loaded
         """
 
+        if os.path.splitext(file_path)[1] == ".npz":
+            file = SolutionFile(file_path)
+            return [file.ocp, file.solution]
+
         with open(file_path, "rb") as file:
             data = pickle.load(file)
             ocp = OptimalControlProgram(**data["ocp_initializer"])
@@ -872,3 +1085,13 @@ class OptimalControlProgram:
         pen = new_penalty.type.get_type()
         self.original_values[pen.penalty_nature()].add(deepcopy(new_penalty))
         pen.add_or_replace(self, self.nlp[phase_idx], new_penalty)
+        self.__invalidate_solver()
+
+    def __invalidate_solver(self):
+        """
+        Inform the solver (if any) and the penalty registry that the structure of the ocp changed so they are rebuilt
+        """
+
+        self._penalties = None
+        if self.solver is not None:
+            self.solver.invalidate_cache()
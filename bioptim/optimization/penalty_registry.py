@@ -0,0 +1,343 @@
+from typing import Union
+
+import numpy as np
+from casadi import MX, SX, DM, Function, vertcat, sum1, sum2
+
+
+class PenaltyRegistry:
+    """
+    A flat index of all the objectives and constraints of an ocp. The penalties are still declared in ocp.J, ocp.g,
+    nlp.J and nlp.g (lists of lists of dict), but they are numbered here once in the order they appear in the nlp
+    sent to the solver (the global penalties first, then phase by phase), so the consumers can find a penalty, its
+    rows in the constraint vector or its rows in the target parameters with a lookup instead of walking the nested lists
+
+    Attributes
+    ----------
+    objectives: list[dict]
+        All the objective entries (one per node) in the order they appear in the nlp
+    objective_phase: np.ndarray
+        The phase of each objective entry (-1 for the global objectives of ocp.J)
+    objective_list_index: np.ndarray
+        The index in J of the objective of each entry
+    objective_node: np.ndarray
+        The position of each entry in the list of its objective
+    objective_weight: np.ndarray
+        The weight of each objective entry
+    objective_target_rows: np.ndarray
+        The first and last (excluded) rows of the target and of its mask in the target parameters of each objective
+        entry. The target is in the first half and its mask in the second half. It is [-1, -1] if the entry has no target
+    n_target_rows: int
+        The number of rows of the target parameters
+    constraints: list[dict]
+        All the constraint entries (one per node) in the order they appear in the nlp
+    constraint_phase: np.ndarray
+        The phase of each constraint entry (-1 for the global constraints of ocp.g)
+    constraint_list_index: np.ndarray
+        The index in g of the constraint of each entry
+    constraint_node: np.ndarray
+        The position of each entry in the list of its constraint
+    constraint_rows: np.ndarray
+        The first and last (excluded) rows of each constraint entry in the constraint vector
+    n_g: int
+        The number of rows of the constraint vector
+    g_min: np.ndarray
+        The minimal bounds of the constraint vector. It is None if a bound is symbolic
+    g_max: np.ndarray
+        The maximal bounds of the constraint vector. It is None if a bound is symbolic
+    __objective_groups: dict
+        The indices of the entries of each (phase, list_index) objective
+    __constraint_groups: dict
+        The indices of the entries of each (phase, list_index) constraint
+    __values_function: Function
+        The compiled function that computes all the penalty values at once. It is built at the first call to evaluate
+    __values_input: Union[MX, SX]
+        The optimization vector __values_function was built with
+
+    Methods
+    -------
+    objective_groups(self) -> list
+        Get the (phase, list_index) of all the objectives
+    constraint_groups(self) -> list
+        Get the (phase, list_index) of all the constraints
+    objective_indices(self, phase: int, list_index: int) -> np.ndarray
+        Get the indices of the entries of an objective
+    constraint_indices(self, phase: int, list_index: int) -> np.ndarray
+        Get the indices of the entries of a constraint
+    constraint_slice(self, phase: int, list_index: int) -> slice
+        Get the rows of a constraint in the constraint vector
+    targets(self) -> np.ndarray
+        Get the current numerical values of the targets and of their masks
+    evaluate(self, v: Union[MX, SX], v_num: Union[np.ndarray, DM], targets: np.ndarray = None) -> dict
+        Compute the value of all the objective and constraint entries at a given optimization vector
+    target_shape(target: np.ndarray) -> tuple
+        Get the two-dimensional shape of a target, as seen by casadi
+    __build_values_function(self, v: Union[MX, SX]) -> Function
+        Build the function that computes all the penalty values at once
+    """
+
+    def __init__(self, ocp):
+        """
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            A reference to the ocp (or to its simplified version in a Solution)
+        """
+
+        self.objectives = []
+        self.constraints = []
+        self.__objective_groups = {}
+        self.__constraint_groups = {}
+        self.__values_function = None
+        self.__values_input = None
+        objective_keys = []
+        constraint_keys = []
+        for phase, ocp_or_nlp in [(-1, ocp)] + list(enumerate(ocp.nlp)):
+            for list_index, penalties in enumerate(ocp_or_nlp.J):
+                for node, penalty in enumerate(penalties):
+                    self.__objective_groups.setdefault((phase, list_index), []).append(len(self.objectives))
+                    self.objectives.append(penalty)
+                    objective_keys.append((phase, list_index, node))
+            for list_index, penalties in enumerate(ocp_or_nlp.g):
+                for node, penalty in enumerate(penalties):
+                    self.__constraint_groups.setdefault((phase, list_index), []).append(len(self.constraints))
+                    self.constraints.append(penalty)
+                    constraint_keys.append((phase, list_index, node))
+        self.__objective_groups = {key: np.array(idx) for key, idx in self.__objective_groups.items()}
+        self.__constraint_groups = {key: np.array(idx) for key, idx in self.__constraint_groups.items()}
+
+        objective_keys = np.array(objective_keys, dtype=int).reshape((-1, 3))
+        self.objective_phase = objective_keys[:, 0]
+        self.objective_list_index = objective_keys[:, 1]
+        self.objective_node = objective_keys[:, 2]
+        self.objective_weight = np.array([obj["objective"].weight for obj in self.objectives], dtype=float)
+
+        self.objective_target_rows = np.full((len(self.objectives), 2), -1, dtype=int)
+        self.n_target_rows = 0
+        for i, obj in enumerate(self.objectives):
+            if obj["target"] is None:
+                continue
+            size = int(np.prod(self.target_shape(obj["target"])))
+            self.objective_target_rows[i, :] = self.n_target_rows, self.n_target_rows + 2 * size
+            self.n_target_rows += 2 * size
+
+        constraint_keys = np.array(constraint_keys, dtype=int).reshape((-1, 3))
+        self.constraint_phase = constraint_keys[:, 0]
+        self.constraint_list_index = constraint_keys[:, 1]
+        self.constraint_node = constraint_keys[:, 2]
+
+        n_rows = np.array([g["val"].shape[0] for g in self.constraints], dtype=int)
+        self.constraint_rows = np.zeros((len(self.constraints), 2), dtype=int)
+        self.constraint_rows[:, 1] = np.cumsum(n_rows)
+        self.constraint_rows[:, 0] = self.constraint_rows[:, 1] - n_rows
+        self.n_g = int(np.sum(n_rows))
+
+        # The bounds are copied once in preallocated vectors, so assembling lbg and ubg does not depend on the number
+        # of constraints
+        self.g_min = np.empty((self.n_g, 1))
+        self.g_max = np.empty((self.n_g, 1))
+        for g, (start, stop) in zip(self.constraints, self.constraint_rows):
+            if isinstance(g["bounds"].min, (MX, SX)) or isinstance(g["bounds"].max, (MX, SX)):
+                self.g_min, self.g_max = None, None
+                break
+            self.g_min[start:stop, 0] = np.asarray(g["bounds"].min)[:, 0]
+            self.g_max[start:stop, 0] = np.asarray(g["bounds"].max)[:, 0]
+
+    def objective_groups(self) -> list:
+        """
+        Get the (phase, list_index) of all the objectives, in the order they appear in the nlp
+
+        Returns
+        -------
+        The list of (phase, list_index)
+        """
+
+        return list(self.__objective_groups.keys())
+
+    def constraint_groups(self) -> list:
+        """
+        Get the (phase, list_index) of all the constraints, in the order they appear in the nlp
+
+        Returns
+        -------
+        The list of (phase, list_index)
+        """
+
+        return list(self.__constraint_groups.keys())
+
+    def objective_indices(self, phase: int, list_index: int) -> np.ndarray:
+        """
+        Get the indices of the entries of an objective
+
+        Parameters
+        ----------
+        phase: int
+            The phase of the objective (-1 for ocp.J)
+        list_index: int
+            The index of the objective in J
+
+        Returns
+        -------
+        The indices in objectives, empty if the objective does not exist
+        """
+
+        return self.__objective_groups.get((phase, list_index), np.ndarray((0,), dtype=int))
+
+    def constraint_indices(self, phase: int, list_index: int) -> np.ndarray:
+        """
+        Get the indices of the entries of a constraint
+
+        Parameters
+        ----------
+        phase: int
+            The phase of the constraint (-1 for ocp.g)
+        list_index: int
+            The index of the constraint in g
+
+        Returns
+        -------
+        The indices in constraints, empty if the constraint does not exist
+        """
+
+        return self.__constraint_groups.get((phase, list_index), np.ndarray((0,), dtype=int))
+
+    def constraint_slice(self, phase: int, list_index: int) -> slice:
+        """
+        Get the rows of a constraint in the constraint vector. The entries of a constraint are always contiguous
+
+        Parameters
+        ----------
+        phase: int
+            The phase of the constraint (-1 for ocp.g)
+        list_index: int
+            The index of the constraint in g
+
+        Returns
+        -------
+        The slice of the constraint in the constraint vector (empty if the constraint does not exist)
+        """
+
+        idx = self.constraint_indices(phase, list_index)
+        if not idx.shape[0]:
+            return slice(0, 0)
+        return slice(int(self.constraint_rows[idx[0], 0]), int(self.constraint_rows[idx[-1], 1]))
+
+    def targets(self) -> np.ndarray:
+        """
+        Get the current numerical values of the targets and of their masks (1 if the target is defined, 0 if it is
+        nan), in the order of objective_target_rows. The nan of the targets are replaced by 0
+
+        Returns
+        -------
+        The column vector of the targets and their masks
+        """
+
+        all_targets = np.empty((self.n_target_rows, 1))
+        for i in np.where(self.objective_target_rows[:, 0] >= 0)[0]:
+            start, stop = self.objective_target_rows[i]
+            middle = (start + stop) // 2
+            target = np.array(self.objectives[i]["target"], dtype=float).reshape(
+                self.target_shape(self.objectives[i]["target"])
+            )
+            nan_idx = np.isnan(target)
+            target[nan_idx] = 0
+            all_targets[start:middle, 0] = target.reshape(-1, order="F")
+            all_targets[middle:stop, 0] = (~nan_idx).astype(float).reshape(-1, order="F")
+        return all_targets
+
+    def evaluate(self, v: Union[MX, SX], v_num: Union[np.ndarray, DM], targets: np.ndarray = None) -> dict:
+        """
+        Compute the value of all the objective and constraint entries at a given optimization vector. The
+        function is compiled once for the registry and reused for all the following evaluations, the targets being
+        sent as parameters so they can change in between
+
+        Parameters
+        ----------
+        v: Union[MX, SX]
+            The symbolic optimization vector of the ocp
+        v_num: Union[np.ndarray, DM]
+            The numerical optimization vector to evaluate the penalties at
+        targets: np.ndarray
+            The targets and their masks to evaluate the penalties with (see targets). If None, the current targets
+            of the objectives are used
+
+        Returns
+        -------
+        The values of the objective entries ('objectives', target subtracted and squared if quadratic, but not
+        weighted), their weighted values ('weighted', multiplied by the weight and dt) and the constraint vector
+        ('constraints'), all of them in the order of the registry
+        """
+
+        if self.__values_function is None or self.__values_input is not v:
+            self.__values_function = self.__build_values_function(v)
+            self.__values_input = v
+        targets = self.targets() if targets is None else targets
+        objectives, weighted, constraints = self.__values_function(v_num, targets)
+        return {"objectives": objectives, "weighted": weighted, "constraints": constraints}
+
+    def __build_values_function(self, v: Union[MX, SX]) -> Function:
+        """
+        Build the function that computes all the penalty values at once
+
+        Parameters
+        ----------
+        v: Union[MX, SX]
+            The symbolic optimization vector of the ocp
+
+        Returns
+        -------
+        The function of the optimization vector and of the targets (see targets) that returns the unweighted and the
+        weighted objective entries and the constraint vector
+        """
+
+        cx = type(v)
+        all_targets = []
+        all_objectives = []
+        all_weighted = []
+        for idx, obj in enumerate(self.objectives):
+            val = cx(obj["val"])
+            if self.objective_target_rows[idx, 0] >= 0:
+                shape = self.target_shape(obj["target"])
+                target = cx.sym(f"target_{idx}", shape[0], shape[1])
+                target_mask = cx.sym(f"target_mask_{idx}", shape[0], shape[1])
+                all_targets += [target.reshape((-1, 1)), target_mask.reshape((-1, 1))]
+                val = (val - target) * target_mask
+            if obj["objective"].quadratic:
+                val = val ** 2
+            val = sum1(sum2(val))
+            all_objectives.append(val)
+            all_weighted.append(obj["objective"].weight * val * obj["dt"])
+
+        all_constraints = []
+        for g, phase in zip(self.constraints, self.constraint_phase):
+            if phase >= 0 and g["constraint"].target is not None:
+                all_constraints.append(cx(g["val"]) - g["target"])
+            else:
+                all_constraints.append(cx(g["val"]))
+
+        return Function(
+            "penalty_values",
+            [v, vertcat(cx(), *all_targets)],
+            [vertcat(cx(), *all_objectives), vertcat(cx(), *all_weighted), vertcat(cx(), *all_constraints)],
+        ).expand()
+
+    @staticmethod
+    def target_shape(target: Union[np.ndarray, list, float]) -> tuple:
+        """
+        Get the two-dimensional shape of a target, as seen by casadi
+
+        Parameters
+        ----------
+        target: Union[np.ndarray, list, float]
+            The target
+
+        Returns
+        -------
+        The (rows, columns) shape of the target
+        """
+
+        shape = np.array(target).shape
+        if len(shape) == 0:
+            return 1, 1
+        elif len(shape) == 1:
+            return shape[0], 1
+        return shape[0], int(np.prod(shape[1:]))
@@ -1,16 +1,21 @@
-from typing import Union, Callable
-from time import time
+from typing import Union, Callable, Iterable, Iterator, AsyncIterator
+from time import time, perf_counter
+import asyncio
+import queue
+import threading
 
 import numpy as np
 import biorbd
 
 from .optimal_control_program import OptimalControlProgram
 from .solution import Solution
+from .warm_start import WarmStartBase, WarmStart
+from .estimate_stream import WindowEstimate, EstimateHistory
 from ..dynamics.dynamics_type import Dynamics, DynamicsList
 from ..limits.constraints import ConstraintFcn
 from ..limits.objective_functions import ObjectiveFcn
 from ..limits.path_conditions import InitialGuess, Bounds
-from ..misc.enums import Solver, InterpolationType
+from ..misc.enums import Solver, InterpolationType, ControlType, Node
 
 
 class RecedingHorizonOptimization(OptimalControlProgram):
@@ -18,10 +23,41 @@ class RecedingHorizonOptimization(OptimalControlProgram):
     The main class to define an MHE. This class prepares the full program and gives all
     the needed interface to modify and solve the program
 
+    Attributes
+    ----------
+    history: EstimateHistory
+        The last frames estimated by stream or stream_async (None before the first stream)
+
     Methods
     -------
-    solve(self, solver: Solver, show_online_optim: bool, solver_options: dict) -> Solution
+    solve(self, update_function: Callable, solver: Solver, solver_options: dict, solver_options_first_iter: dict,
+            warm_start: bool, rti: bool, warm_start_strategy: WarmStartBase) -> Solution
         Call the solver to actually solve the ocp
+    __solve_rti(self, update_function: Callable, solver: Solver, solver_options: dict, solver_options_first_iter: dict,
+            warm_start_strategy: WarmStartBase) -> Solution
+        Run the windows with the real-time iteration scheme
+    stream(self, measurements: Iterable, update_function: Callable, solver: Solver, solver_options: dict,
+            solver_options_first_iter: dict, warm_start: bool, warm_start_strategy: WarmStartBase,
+            history_len: int, prefetch: int) -> Iterator[WindowEstimate]
+        Solve a window for each measurement and yield the estimates as they are available
+    stream_async(self, measurements: asyncio.Queue, update_function: Callable, solver: Solver, solver_options: dict,
+            solver_options_first_iter: dict, warm_start: bool, warm_start_strategy: WarmStartBase,
+            history_len: int) -> AsyncIterator[WindowEstimate]
+        The asyncio version of stream
+    __stream_setup(self, solver: Solver, solver_options: dict, solver_options_first_iter: dict, warm_start: bool,
+            warm_start_strategy: WarmStartBase, history_len: int) -> dict
+        Create the solver and the history of a stream
+    __stream_window(self, update_function: Callable, t: int, measurement, arrival: tuple, sol: Solution,
+            options: dict, warm_start: bool, warm_start_strategy: WarmStartBase) -> WindowEstimate
+        Solve the window of a measurement of a stream
+    __prepare_window(self, warm_start_strategy: WarmStartBase)
+        Convert the bounds and initial guesses once, so they can be updated in place after each window
+    __update_window(self, sol: Solution, warm_start_strategy: WarmStartBase)
+        Set the bounds of the first frame and the initial guess of the next window from the solution of the current one
+    __final_solution(self, states: list, controls: list, total_time: float, real_time: float) -> Solution
+        Gather the first frames of each window into the solution of the full horizon
+    _shift_solution(self, sol: Solution, warm_start_strategy: WarmStartBase = None) -> Solution
+        Shift a solution of the window so it can be used to warm start the next window
     """
 
     def __init__(
@@ -51,6 +87,7 @@ class RecedingHorizonOptimization(OptimalControlProgram):
             use_sx=use_sx,
             **kwargs,
         )
+        self.history = None
 
     def solve(
         self,
@@ -58,12 +95,15 @@ class RecedingHorizonOptimization(OptimalControlProgram):
         solver: Solver = Solver.ACADOS,
         solver_options: dict = None,
         solver_options_first_iter: dict = None,
+        warm_start: bool = False,
+        rti: bool = False,
+        warm_start_strategy: WarmStartBase = WarmStart.Shift(shift_controls=False),
     ) -> Solution:
         """
         Solve MHE program. The program runs until 'update_function' returns False. This function can be used to
-        modify the objective set, for instance. The warm_start_function can be provided by the user. Otherwise, the
-        initial guess is the solution where the first frame is dropped and the last frame is duplicated. Moreover,
-        the bounds at first frame is set to the new first frame of the initial guess
+        modify the objective set, for instance. The initial guess of the next window is computed from the solution of
+        the current one by the warm_start_strategy. By default, the first frame is dropped and the last frame is
+        duplicated. Moreover, the bounds at first frame is set to the new first frame of the initial guess
 
         Parameters
         ----------
@@ -82,6 +122,21 @@ class RecedingHorizonOptimization(OptimalControlProgram):
         solver_options_first_iter: dict
             A special set of options to pass to the solver for the first frame only,
             and then replaced by solver_options if present.
+        warm_start: bool
+            If the solution of the previous window, shifted by one frame, should be used to warm start the solver
+            (primal values and Lagrange multipliers). This is only available with Solver.IPOPT, since ACADOS already
+            starts from its previous iterate
+        rti: bool
+            If the real-time iteration scheme should be used: a single SQP step per window, split into a preparation
+            phase (run before update_function, so before the new data is known) and a feedback phase (run after it).
+            With Solver.ACADOS, the 'SQP_RTI' solver is used. With Solver.IPOPT, it is emulated by a single Newton
+            step warm started from the shifted solution of the previous window (the first window is fully solved).
+            The time spent in each phase is reported in the 'latency' attribute of the solution of each window, and of
+            the final solution (one value per window)
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed from the solution of the current one (see
+            WarmStart). The window moves by warm_start_strategy.n_frames frames at each solve, and these first frames
+            of each window are gathered in the returned solution
 
         Returns
         -------
@@ -90,6 +145,13 @@ class RecedingHorizonOptimization(OptimalControlProgram):
 
         if len(self.nlp) != 1:
             raise NotImplementedError("MHE is only available for 1 phase program")
+        if warm_start and solver != Solver.IPOPT:
+            raise RuntimeError("warm_start is only available with Solver.IPOPT")
+        self.__prepare_window(warm_start_strategy)
+        if rti:
+            return self.__solve_rti(
+                update_function, solver, solver_options, solver_options_first_iter, warm_start_strategy
+            )
 
         t = 0
         sol = None
@@ -103,44 +165,494 @@ class RecedingHorizonOptimization(OptimalControlProgram):
         total_time = 0
         real_time = 0
         while update_function(self, t, sol):
-            sol = super(RecedingHorizonOptimization, self).solve(solver=solver, solver_options=solver_option_current)
+            sol = super(RecedingHorizonOptimization, self).solve(
+                solver=solver,
+                solver_options=solver_option_current,
+                warm_start=self._shift_solution(sol, warm_start_strategy) if warm_start and sol is not None else None,
+            )
             solver_option_current = solver_options if t == 0 else None
 
             total_time += sol.time_to_optimize
             if t == 0:
                 real_time = time()  # Skip the compile time (so skip the first call to solve)
 
-            # Solve and save the current window
-            states.append(sol.states["all"][:, 0:1])
-            controls.append(sol.controls["all"][:, 0:1])
-
-            # Update the initial frame bounds
-            if self.nlp[0].x_bounds.type != InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT:
-                if self.nlp[0].x_bounds.type == InterpolationType.CONSTANT:
-                    x_min = np.repeat(self.nlp[0].x_bounds.min[:, 0:1], 3, axis=1)
-                    x_max = np.repeat(self.nlp[0].x_bounds.max[:, 0:1], 3, axis=1)
-                    self.nlp[0].x_bounds = Bounds(x_min, x_max)
-                else:
-                    raise NotImplementedError(
-                        "The MHE is not implemented yet for x_bounds not being "
-                        "CONSTANT or CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT"
-                    )
-                self.nlp[0].x_bounds.check_and_adjust_dimensions(self.nlp[0].nx, 3)
-            self.nlp[0].x_bounds[:, 0] = sol.states["all"][:, 1]
-
-            if self.nlp[0].x_init.type != InterpolationType.EACH_FRAME:
-                self.nlp[0].x_init = InitialGuess(
-                    np.ndarray(sol.states["all"].shape), interpolation=InterpolationType.EACH_FRAME
-                )
-                self.nlp[0].x_init.check_and_adjust_dimensions(self.nlp[0].nx, self.nlp[0].ns)
-            self.nlp[0].x_init.init[:, :] = np.concatenate(
-                (sol.states["all"][:, 1:], sol.states["all"][:, -1][:, np.newaxis]), axis=1
-            )
+            # Solve and save the current window. The first frames are copied so the data of the window can be freed
+            states.append(sol.states["all"][:, : warm_start_strategy.n_frames].copy())
+            controls.append(sol.controls["all"][:, : warm_start_strategy.n_frames].copy())
+            self.__update_window(sol, warm_start_strategy)
+
+            t += 1
+        real_time = time() - real_time
+
+        return self.__final_solution(states, controls, total_time, real_time)
+
+    def __solve_rti(
+        self,
+        update_function: Callable,
+        solver: Solver,
+        solver_options: dict = None,
+        solver_options_first_iter: dict = None,
+        warm_start_strategy: WarmStartBase = WarmStart.Shift(shift_controls=False),
+    ) -> Solution:
+        """
+        Run the windows with the real-time iteration scheme (see the rti parameter of solve). At each window, the
+        preparation phase is run, then update_function is called with the new data and the feedback phase finishes
+        the window
+
+        Parameters
+        ----------
+        update_function: Callable
+            The function called before the feedback phase of each window (see solve)
+        solver: Solver
+            The Solver to use (ACADOS or IPOPT)
+        solver_options: dict
+            The options to pass to the solver
+        solver_options_first_iter: dict
+            A special set of options to pass to the solver for the first window only
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed from the solution of the current one
+
+        Returns
+        -------
+        The solution of the MHE
+        """
+
+        if solver not in (Solver.ACADOS, Solver.IPOPT):
+            raise NotImplementedError("The real-time iteration is only available with Solver.ACADOS and Solver.IPOPT")
+
+        if solver_options_first_iter is None and solver_options is not None:
+            solver_options_first_iter = solver_options
+            solver_options = None
+        first_options = dict(solver_options_first_iter if solver_options_first_iter else {})
+        if solver == Solver.ACADOS:
+            # The type of nlp solver is fixed when the ACADOS solver is created
+            first_options["nlp_solver_type"] = "SQP_RTI"
+            next_options = dict(solver_options if solver_options else {})
+        else:
+            # A single Newton step, with a barrier parameter consistent with the warm start (bounds pushed by 1e-9)
+            next_options = {**(solver_options or {}), "max_iter": 1, "mu_init": 1e-9}
+        self._set_solver(solver, first_options)
+
+        t = 0
+        sol = None
+        states = []
+        controls = []
+        preparation_times = []
+        feedback_times = []
+        total_time = 0
+        real_time = 0
+        while True:
+            # Preparation phase, nothing depends on the new data yet
+            tic = perf_counter()
+            if t == 0:
+                self.solver.set_warm_start(None)
+                self.solver.configure(first_options)
+            elif solver == Solver.IPOPT:
+                self.solver.set_warm_start(self._shift_solution(sol, warm_start_strategy))
+                self.solver.configure(next_options)
+            else:
+                self.solver.configure(next_options)
+            self.solver.prepare()
+            preparation_time = perf_counter() - tic
+
+            if not update_function(self, t, sol):
+                break
+
+            # Feedback phase, with the new data
+            tic = perf_counter()
+            self.solver.feedback()
+            sol = Solution(self, self.solver.get_optimized_value())
+            feedback_time = perf_counter() - tic
+            sol.profile = self.profiler.report()
+            self.profiler.reset()
+
+            sol.latency = {"preparation": preparation_time, "feedback": feedback_time}
+            preparation_times.append(preparation_time)
+            feedback_times.append(feedback_time)
+            total_time += sol.time_to_optimize
+            if t == 0:
+                real_time = time()  # Skip the compile time (so skip the first window)
 
+            states.append(sol.states["all"][:, : warm_start_strategy.n_frames].copy())
+            controls.append(sol.controls["all"][:, : warm_start_strategy.n_frames].copy())
+            self.__update_window(sol, warm_start_strategy)
             t += 1
         real_time = time() - real_time
 
+        sol = self.__final_solution(states, controls, total_time, real_time)
+        sol.latency = {"preparation": np.array(preparation_times), "feedback": np.array(feedback_times)}
+        return sol
+
+    def stream(
+        self,
+        measurements: Iterable,
+        update_function: Callable,
+        solver: Solver = Solver.ACADOS,
+        solver_options: dict = None,
+        solver_options_first_iter: dict = None,
+        warm_start: bool = False,
+        warm_start_strategy: WarmStartBase = WarmStart.Shift(shift_controls=False),
+        history_len: int = 100,
+        prefetch: int = 1,
+    ) -> Iterator[WindowEstimate]:
+        """
+        Solve a window for each measurement and yield the estimates as they are available. The measurements are read
+        by a background thread, so the creation of the solver and the solve of each window overlap with the arrival
+        of the next measurements. Nothing is accumulated: the last frames are kept in the ring buffers of self.history
+
+        Parameters
+        ----------
+        measurements: Iterable
+            The measurements, one per window. It can be any iterable (for instance a generator reading a sensor) or a
+            queue.Queue, in which case None ends the stream
+        update_function: Callable
+            A function with the signature: update_function(mhe, current_time_index, measurement), called before each
+            solve to send the measurement to the program (usually by updating the targets of some objective functions)
+        solver: Solver
+            The Solver to use (default being ACADOS)
+        solver_options: dict
+            The options to pass to the solver
+        solver_options_first_iter: dict
+            A special set of options to pass to the solver for the first window only
+        warm_start: bool
+            If the shifted solution of the previous window should be used to warm start the solver (see solve)
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed from the solution of the current one (see solve)
+        history_len: int
+            The number of frames kept in self.history
+        prefetch: int
+            The maximum number of measurements read in advance. When the solver is slower than the measurements, the
+            reading is paused until a window is solved
+
+        Returns
+        -------
+        The estimate of each window
+        """
+
+        if isinstance(measurements, queue.Queue):
+            measurements = iter(measurements.get, None)
+
+        buffer = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read():
+            try:
+                for measurement in measurements:
+                    if not put(("data", (time(), perf_counter()), measurement)):
+                        return
+                put(("end", None, None))
+            except Exception as e:
+                put(("error", None, e))
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        try:
+            options = self.__stream_setup(
+                solver, solver_options, solver_options_first_iter, warm_start, warm_start_strategy, history_len
+            )
+            t = 0
+            sol = None
+            while True:
+                kind, arrival, measurement = buffer.get()
+                if kind == "end":
+                    return
+                elif kind == "error":
+                    raise measurement
+                estimate = self.__stream_window(
+                    update_function, t, measurement, arrival, sol, options, warm_start, warm_start_strategy
+                )
+                sol = estimate.solution
+                yield estimate
+                t += 1
+        finally:
+            stop.set()
+
+    async def stream_async(
+        self,
+        measurements: asyncio.Queue,
+        update_function: Callable,
+        solver: Solver = Solver.ACADOS,
+        solver_options: dict = None,
+        solver_options_first_iter: dict = None,
+        warm_start: bool = False,
+        warm_start_strategy: WarmStartBase = WarmStart.Shift(shift_controls=False),
+        history_len: int = 100,
+    ) -> AsyncIterator[WindowEstimate]:
+        """
+        The asyncio version of stream. The creation of the solver and the solve of the windows are run in the default
+        executor of the event loop, so the loop keeps receiving the measurements in the meantime
+
+        Parameters
+        ----------
+        measurements: asyncio.Queue
+            The queue of the measurements, one per window. None ends the stream
+        update_function: Callable
+            A function with the signature: update_function(mhe, current_time_index, measurement) (see stream). It is
+            called from the executor
+        solver: Solver
+            The Solver to use (default being ACADOS)
+        solver_options: dict
+            The options to pass to the solver
+        solver_options_first_iter: dict
+            A special set of options to pass to the solver for the first window only
+        warm_start: bool
+            If the shifted solution of the previous window should be used to warm start the solver (see solve)
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed from the solution of the current one (see solve)
+        history_len: int
+            The number of frames kept in self.history
+
+        Returns
+        -------
+        The estimate of each window
+        """
+
+        loop = asyncio.get_running_loop()
+        setup = loop.run_in_executor(
+            None,
+            self.__stream_setup,
+            solver,
+            solver_options,
+            solver_options_first_iter,
+            warm_start,
+            warm_start_strategy,
+            history_len,
+        )
+        try:
+            t = 0
+            sol = None
+            while True:
+                measurement = await measurements.get()
+                if measurement is None:
+                    return
+                arrival = (time(), perf_counter())
+                options = await setup
+                estimate = await loop.run_in_executor(
+                    None,
+                    self.__stream_window,
+                    update_function,
+                    t,
+                    measurement,
+                    arrival,
+                    sol,
+                    options,
+                    warm_start,
+                    warm_start_strategy,
+                )
+                sol = estimate.solution
+                yield estimate
+                t += 1
+        finally:
+            # Never leave the setup running in the background
+            await asyncio.wait([setup])
+
+    def __stream_setup(
+        self,
+        solver: Solver,
+        solver_options: dict,
+        solver_options_first_iter: dict,
+        warm_start: bool,
+        warm_start_strategy: WarmStartBase,
+        history_len: int,
+    ) -> dict:
+        """
+        Create the solver and the history of a stream, before the first measurement is needed
+
+        Parameters
+        ----------
+        solver: Solver
+            The Solver to use
+        solver_options: dict
+            The options to pass to the solver
+        solver_options_first_iter: dict
+            A special set of options to pass to the solver for the first window only
+        warm_start: bool
+            If the shifted solution of the previous window should be used to warm start the solver
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed from the solution of the current one
+        history_len: int
+            The number of frames kept in self.history
+
+        Returns
+        -------
+        The options to send to the solver after the first window (None to keep the current ones)
+        """
+
+        if len(self.nlp) != 1:
+            raise NotImplementedError("MHE is only available for 1 phase program")
+        if warm_start and solver != Solver.IPOPT:
+            raise RuntimeError("warm_start is only available with Solver.IPOPT")
+        if solver_options_first_iter is None and solver_options is not None:
+            solver_options_first_iter = solver_options
+            solver_options = None
+
+        self.history = EstimateHistory(self.nlp[0].nx, self.nlp[0].nu, history_len)
+        self.__prepare_window(warm_start_strategy)
+        self._set_solver(solver, solver_options_first_iter)
+        self.solver.configure(dict(solver_options_first_iter) if solver_options_first_iter else None)
+        self.solver.build()
+        return solver_options
+
+    def __stream_window(
+        self,
+        update_function: Callable,
+        t: int,
+        measurement,
+        arrival: tuple,
+        sol: Solution,
+        options: dict,
+        warm_start: bool,
+        warm_start_strategy: WarmStartBase,
+    ) -> WindowEstimate:
+        """
+        Solve the window of a measurement of a stream, add its frames to the history and prepare the next window
+
+        Parameters
+        ----------
+        update_function: Callable
+            The function that sends the measurement to the program (see stream)
+        t: int
+            The index of the window
+        measurement: Any
+            The measurement of the window
+        arrival: tuple
+            The wall time (time.time()) and the perf_counter at which the measurement was received
+        sol: Solution
+            The solution of the previous window (None for the first one)
+        options: dict
+            The options to send to the solver after the first window
+        warm_start: bool
+            If the shifted solution of the previous window should be used to warm start the solver
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed from the solution of the current one
+
+        Returns
+        -------
+        The estimate of the window
+        """
+
+        tic = perf_counter()
+        update_function(self, t, measurement)
+        sol = super(RecedingHorizonOptimization, self).solve(
+            solver=self.solver_type,
+            solver_options=options if t == 1 else None,
+            warm_start=self._shift_solution(sol, warm_start_strategy) if warm_start and sol is not None else None,
+        )
+        solve_time = perf_counter() - tic
+
+        n_frames = warm_start_strategy.n_frames
+        states = sol.states["all"][:, :n_frames].copy()
+        controls = sol.controls["all"][:, :n_frames].copy()
+        self.__update_window(sol, warm_start_strategy)
+
+        estimate = WindowEstimate(
+            index=t,
+            time=t * n_frames * self.nlp[0].dt,
+            timestamp=arrival[0],
+            states=states,
+            controls=controls,
+            latency={"solve": solve_time, "total": perf_counter() - arrival[1]},
+            solution=sol,
+        )
+        self.history.append(estimate, self.nlp[0].dt)
+        return estimate
+
+    def __prepare_window(self, warm_start_strategy: WarmStartBase):
+        """
+        Convert the bounds of the states and the initial guesses once, so they can be updated in place after each
+        window instead of being reallocated
+
+        Parameters
+        ----------
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed (it tells if the controls are shifted)
+        """
+
+        nlp = self.nlp[0]
+        if nlp.x_bounds.type != InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT:
+            if nlp.x_bounds.type == InterpolationType.CONSTANT:
+                x_min = np.repeat(nlp.x_bounds.min[:, 0:1], 3, axis=1)
+                x_max = np.repeat(nlp.x_bounds.max[:, 0:1], 3, axis=1)
+                nlp.x_bounds = Bounds(x_min, x_max)
+            else:
+                raise NotImplementedError(
+                    "The MHE is not implemented yet for x_bounds not being "
+                    "CONSTANT or CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT"
+                )
+            nlp.x_bounds.check_and_adjust_dimensions(nlp.nx, 3)
+
+        if nlp.x_init.type != InterpolationType.EACH_FRAME:
+            nlp.x_init = InitialGuess(nlp.x_init.init.evaluate_all(nlp.ns), interpolation=InterpolationType.EACH_FRAME)
+            nlp.x_init.check_and_adjust_dimensions(nlp.nx, nlp.ns)
+
+        if warm_start_strategy.shift_controls and nlp.u_init.type != InterpolationType.EACH_FRAME:
+            n_shooting = nlp.ns if nlp.control_type == ControlType.LINEAR_CONTINUOUS else nlp.ns - 1
+            nlp.u_init = InitialGuess(
+                nlp.u_init.init.evaluate_all(n_shooting), interpolation=InterpolationType.EACH_FRAME
+            )
+            nlp.u_init.check_and_adjust_dimensions(nlp.nu, n_shooting)
+
+    def __update_window(self, sol: Solution, warm_start_strategy: WarmStartBase):
+        """
+        Set the bounds of the first frame and the initial guess of the next window from the solution of the current
+        one. The bounds and initial guesses prepared by __prepare_window are written in place, as well as the vectors
+        of the optimization variables (v) which the solver reads
+
+        Parameters
+        ----------
+        sol: Solution
+            The solution of the current window
+        warm_start_strategy: WarmStartBase
+            How the initial guess of the next window is computed
+        """
+
+        nlp = self.nlp[0]
+        if nlp.x_init.type != InterpolationType.EACH_FRAME or (
+            warm_start_strategy.shift_controls and nlp.u_init.type != InterpolationType.EACH_FRAME
+        ):
+            # The initial guesses were replaced (e.g. by update_function)
+            self.__prepare_window(warm_start_strategy)
+
+        warm_start_strategy.shift(
+            self, sol, nlp.x_init.init, nlp.u_init.init if warm_start_strategy.shift_controls else None
+        )
+        nlp.x_bounds[:, 0] = nlp.x_init.init[:, 0]
+        self.v.update_phase_initial_guess(
+            0, nlp.x_init.init, nlp.u_init.init if warm_start_strategy.shift_controls else None
+        )
+        self.v.update_initial_state_bounds(0, nlp.x_init.init[:, 0], nlp.x_init.init[:, 0])
+
+    def __final_solution(self, states: list, controls: list, total_time: float, real_time: float) -> Solution:
+        """
+        Gather the first frames of each window into the solution of the full horizon
+
+        Parameters
+        ----------
+        states: list
+            The states of the first frames of each window
+        controls: list
+            The controls of the first frames of each window
+        total_time: float
+            The time spent in the solver
+        real_time: float
+            The wall time of the windows (the first one excluded)
+
+        Returns
+        -------
+        The solution of the MHE
+        """
+
         # Prepare the modified ocp that fits the solution dimension
+        t = sum([frames.shape[1] for frames in states])
         solution_ocp = OptimalControlProgram(
             biorbd_model=self.original_values["biorbd_model"][0],
             dynamics=self.original_values["dynamics"][0],
@@ -155,6 +667,88 @@ class RecedingHorizonOptimization(OptimalControlProgram):
         sol.real_time_to_optimize = real_time
         return sol
 
+    def _shift_solution(self, sol: Solution, warm_start_strategy: WarmStartBase = None) -> Solution:
+        """
+        Shift a solution of the window so it can be used to warm start the next window. The states and the controls
+        are shifted by the warm_start_strategy (the controls are shifted even if the strategy does not shift their
+        initial guess). For the Lagrange multipliers, the first frames are dropped and the last one is duplicated. The
+        Lagrange multipliers of the constraints are shifted the same way for the constraints declared at every node
+
+        Parameters
+        ----------
+        sol: Solution
+            The solution of the previous window
+        warm_start_strategy: WarmStartBase
+            How the states and controls are shifted (WarmStart.Shift() if None)
+
+        Returns
+        -------
+        The shifted solution
+        """
+
+        if warm_start_strategy is None:
+            warm_start_strategy = WarmStart.Shift()
+        n_frames = warm_start_strategy.n_frames
+
+        def shift(data: np.ndarray, n_rows: int) -> np.ndarray:
+            data = data.reshape((n_rows, -1), order="F")
+            return np.concatenate(
+                (data[:, n_frames:], np.repeat(data[:, -1:], n_frames, axis=1)), axis=1
+            ).reshape((-1, 1), order="F")
+
+        def shift_variables(vector) -> np.ndarray:
+            vector = np.array(vector, dtype=float).reshape((-1, 1))
+            n_x, n_u = self.v.n_all_x, self.v.n_all_u
+            return np.concatenate(
+                (
+                    shift(vector[:n_x], self.nlp[0].nx),
+                    shift(vector[n_x : n_x + n_u], self.nlp[0].nu),
+                    vector[n_x + n_u :],
+                )
+            )
+
+        x, u = warm_start_strategy.shift(self, sol)
+        if u is None:
+            _, u = WarmStart.Shift(n_frames).shift(self, sol)
+        n_x, n_u = self.v.n_all_x, self.v.n_all_u
+        vector = np.concatenate(
+            (
+                x.reshape((-1, 1), order="F"),
+                u.reshape((-1, 1), order="F"),
+                np.array(sol.vector, dtype=float).reshape((-1, 1))[n_x + n_u :],
+            )
+        )
+
+        def is_consecutive(nodes) -> bool:
+            nodes = nodes if isinstance(nodes, (list, tuple)) else (nodes,)
+            if len(nodes) == 1 and nodes[0] in (Node.ALL, Node.INTERMEDIATES):
+                return True
+            return all(isinstance(node, int) for node in nodes) and list(nodes) == list(
+                range(nodes[0], nodes[0] + len(nodes))
+            )
+
+        def shift_constraints(lam_g) -> np.ndarray:
+            lam_g = np.array(lam_g, dtype=float).reshape((-1, 1))
+            shifted = lam_g.copy()
+            penalties = self.penalties
+            for phase, list_index in penalties.constraint_groups():
+                idx = penalties.constraint_indices(phase, list_index)
+                rows = penalties.constraint_slice(phase, list_index)
+                sizes = penalties.constraint_rows[idx, 1] - penalties.constraint_rows[idx, 0]
+                constraint = penalties.constraints[idx[0]]["constraint"]
+                if constraint.name.startswith("CONTINUITY"):
+                    # The continuity of a phase is a single entry stacking the constraints of all its intervals
+                    shifted[rows] = shift(lam_g[rows], self.nlp[0].nx)
+                elif idx.shape[0] > 1 and np.all(sizes == sizes[0]) and is_consecutive(constraint.node):
+                    # The multipliers of the constraints declared on sparse nodes (e.g. START and END) are kept
+                    shifted[rows] = shift(lam_g[rows], sizes[0])
+            return shifted
+
+        shifted_sol = Solution(self, vector)
+        shifted_sol.lam_x = shift_variables(sol.lam_x) if sol.lam_x is not None else None
+        shifted_sol.lam_g = shift_constraints(sol.lam_g) if sol.lam_g is not None else None
+        return shifted_sol
+
     def _define_time(
         self,
         phase_time: Union[int, float, list, tuple],
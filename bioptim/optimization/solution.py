@@ -4,18 +4,68 @@ from copy import deepcopy
 import biorbd
 import numpy as np
 from scipy import interpolate as sci_interp
-from casadi import Function, DM
-from matplotlib import pyplot as plt
+from casadi import DM, horzcat, sum1
 
 from ..limits.path_conditions import InitialGuess, InitialGuessList
 from ..misc.enums import ControlType, CostType, Shooting, InterpolationType
+from ..misc.profiler import Profiler
 from ..misc.utils import check_version
 from ..optimization.non_linear_program import NonLinearProgram
 
 
+class SolutionData(dict):
+    """
+    The data of the states, controls or parameters of a phase. The arrays are read only and the keys are views on
+    the "all" key. Assigning a key replaces "all" by a new array and slices all the keys again, so they always agree
+
+    Methods
+    -------
+    __setitem__(self, key: str, value: np.ndarray)
+        Replace the data of a key, keeping "all" and the other keys consistent
+    """
+
+    def __setitem__(self, key: str, value: np.ndarray):
+        """
+        Replace the data of a key, keeping "all" and the other keys consistent
+
+        Parameters
+        ----------
+        key: str
+            The name of the variable or "all"
+        value: np.ndarray
+            The new data. It must have the number of rows of the key it replaces
+        """
+
+        if key not in self or "all" not in self:
+            super().__setitem__(key, value)
+            return
+
+        rows = {}
+        offset = 0
+        for name in self:
+            if name != "all":
+                rows[name] = slice(offset, offset + self[name].shape[0])
+                offset += self[name].shape[0]
+
+        if key == "all":
+            data = np.array(value, dtype=float)
+            if data.shape[0] != offset:
+                raise ValueError(f"'all' must have {offset} rows, but has {data.shape[0]}")
+        else:
+            data = np.array(self["all"])
+            data[rows[key], :] = value
+        data.flags.writeable = False
+
+        super().__setitem__("all", data)
+        for name in rows:
+            super().__setitem__(name, data[rows[name], :])
+
+
 class Solution:
     """
-    Data manipulation, graphing and storage
+    Data manipulation, graphing and storage. The arrays of the states, controls and parameters are read only, so the
+    Solutions derived from one another (copy, integrate, interpolate and merge_phases) share them instead of copying
+    them. New arrays are only created for the data that actually changes
 
     Attributes
     ----------
@@ -51,6 +101,15 @@ class Solution:
         The number of iterations that were required to solve the program
     status: int
         Optimization success status (Ipopt: 0=Succeeded, 1=Failed)
+    targets: np.ndarray
+        The targets of the objectives (and their masks, see PenaltyRegistry.targets) the solution was optimized with.
+        If None, the current targets of the ocp are used
+    profile: dict
+        The time and memory spent in each stage of the building and solving of the ocp, the size of the graphs and
+        the solver statistics. It is None if the ocp was not declared with profile=True
+    latency: dict
+        The time spent in the 'preparation' and 'feedback' phases of a real-time iteration (see the rti mode of
+        RecedingHorizonOptimization.solve). It is None if the solution does not come from a real-time iteration
     _states: list
         The data structure that holds the states
     _controls: list
@@ -63,7 +122,9 @@ class Solution:
     Methods
     -------
     copy(self, skip_data: bool = False) -> Any
-        Create a deepcopy of the Solution
+        Create a copy of the Solution that shares the (read only) data with the original
+    save_profile(self, file_path: str)
+        Export the profile of the optimization to a JSON file
     @property
     states(self) -> Union[list, dict]
         Returns the state in list if more than one phases, otherwise it returns the only dict
@@ -80,12 +141,16 @@ class Solution:
         Actually performing the phase merging
     _complete_control(self)
         Controls don't necessarily have dimensions that matches the states. This method aligns them
+    _freeze_data(self)
+        Set the arrays of the states, controls and parameters to read only so they can be shared between Solutions
     graphs(self, automatically_organize: bool, adapt_graph_size_to_bounds: bool, show_now: bool, shooting_type: Shooting)
         Show the graphs of the simulation
     animate(self, n_frames: int = 0, show_now: bool = True, **kwargs: Any) -> Union[None, list]
         Animate the simulation
     print(self, cost_type: CostType = CostType.ALL)
         Print the objective functions and/or constraints to the console
+    __objective_value(self, values: dict, phase: int, list_index: int) -> tuple
+        Gather the value of an objective function from the values of all the penalties
     """
 
     class SimplifiedNLP:
@@ -98,6 +163,10 @@ class Solution:
             The control type for the current nlp
         dynamics: list[ODE_SOLVER]
             All the dynamics for each of the node of the phase
+        par_dynamics: casadi.Function
+            The dynamics mapped over all the nodes of the phase (None if each node has its own integrator)
+        accum_dynamics: casadi.Function
+            The dynamics chained over all the nodes of the phase (None if each node has its own integrator)
         g: list[list[Constraint]]
             All the constraints at each of the node of the phase
         J: list[list[Objective]]
@@ -130,6 +199,8 @@ class Solution:
             self.nx = nlp.nx
             self.nu = nlp.nu
             self.dynamics = nlp.dynamics
+            self.par_dynamics = nlp.par_dynamics
+            self.accum_dynamics = nlp.accum_dynamics
             self.ode_solver = nlp.ode_solver
             self.mapping = nlp.mapping
             self.var_states = nlp.var_states
@@ -152,6 +223,8 @@ class Solution:
             Objective values that are not phase dependent (mostly parameters)
         nlp: NLP
             All the phases of the ocp
+        penalties: PenaltyRegistry
+            The flat index of all the objectives and constraints
         phase_transitions: list[PhaseTransition]
             The list of transition constraint between phases
         prepare_plots: Callable
@@ -172,6 +245,7 @@ class Solution:
             self.v = ocp.v
             self.J = ocp.J
             self.g = ocp.g
+            self.penalties = ocp.penalties
             self.phase_transitions = ocp.phase_transitions
             self.prepare_plots = ocp.prepare_plots
 
@@ -205,6 +279,9 @@ class Solution:
         self.time_to_optimize = None
         self.real_time_to_optimize = None
         self.iterations = None
+        self.targets = None
+        self.profile = None
+        self.latency = None
 
         # Extract the data now for further use
         self._states, self._controls, self.parameters = [], [], {}
@@ -273,13 +350,12 @@ class Solution:
                         "should be a unique vector of size equal to n_param"
                     )
 
-            self.vector = np.ndarray((0, 1))
+            all_vectors = [np.ndarray((0, 1))]
             sol_states, sol_controls = sol[0], sol[1]
             for p, s in enumerate(sol_states):
                 ns = self.ocp.nlp[p].ns + 1 if s.init.type != InterpolationType.EACH_FRAME else self.ocp.nlp[p].ns
                 s.init.check_and_adjust_dimensions(self.ocp.nlp[p].nx, ns, "states")
-                for i in range(self.ns[p] + 1):
-                    self.vector = np.concatenate((self.vector, s.init.evaluate_at(i)[:, np.newaxis]))
+                all_vectors.append(s.init.evaluate_all(self.ns[p]).reshape((-1, 1), order="F"))
             for p, s in enumerate(sol_controls):
                 control_type = self.ocp.nlp[p].control_type
                 if control_type == ControlType.CONSTANT:
@@ -289,13 +365,13 @@ class Solution:
                 else:
                     raise NotImplementedError(f"control_type {control_type} is not implemented in Solution")
                 s.init.check_and_adjust_dimensions(self.ocp.nlp[p].nu, self.ns[p], "controls")
-                for i in range(self.ns[p] + off):
-                    self.vector = np.concatenate((self.vector, s.init.evaluate_at(i)[:, np.newaxis]))
+                all_vectors.append(s.init.evaluate_all(self.ns[p] + off - 1).reshape((-1, 1), order="F"))
 
             if n_param:
                 sol_params = sol[2]
                 for p, s in enumerate(sol_params):
-                    self.vector = np.concatenate((self.vector, np.repeat(s.init, self.ns[p] + 1)[:, np.newaxis]))
+                    all_vectors.append(np.repeat(s.init, self.ns[p] + 1)[:, np.newaxis])
+            self.vector = np.concatenate(all_vectors)
 
             self._states, self._controls, self.parameters = self.ocp.v.to_dictionaries(self.vector)
             self._complete_control()
@@ -326,77 +402,23 @@ class Solution:
             self.ns = []
         else:
             raise ValueError("Solution called with unknown initializer")
+        self._freeze_data()
 
     @property
     def cost(self):
-        def get_objective_functions(ocp, sol):
-            """
-            Print the values of each objective function to the console
-            """
-
-            def __extract_objective(pen: dict):
-                """
-                Extract objective function from a penalty
-
-                Parameters
-                ----------
-                pen: dict
-                    The penalty to extract the value from
-
-                Returns
-                -------
-                The value extract
-                """
-
-                # TODO: This should be done in bounds and objective functions, so it is available for all the code
-                val_tp = Function("val_tp", [ocp.v.vector], [pen["val"]]).expand()(sol.vector)
-                if pen["target"] is not None:
-                    # TODO Target should be available to constraint?
-                    nan_idx = np.isnan(pen["target"])
-                    pen["target"][nan_idx] = 0
-                    val_tp -= pen["target"]
-                    if np.any(nan_idx):
-                        val_tp[np.where(nan_idx)] = 0
-
-                if pen["objective"].quadratic:
-                    val_tp *= val_tp
-
-                val = np.sum(val_tp)
-
-                dt = Function("dt", [ocp.v.vector], [pen["dt"]]).expand()(sol.vector)
-                val_weighted = pen["objective"].weight * val * dt
-                return val, val_weighted
-
-            running_total = 0
-            for J in ocp.J:
-                val = []
-                val_weighted = []
-                for j in J:
-                    out = __extract_objective(j)
-                    val.append(out[0])
-                    val_weighted.append(out[1])
-                sum_val_weighted = sum(val_weighted)
-                running_total += sum_val_weighted
-
-            for idx_phase, nlp in enumerate(ocp.nlp):
-                for J in nlp.J:
-                    val = []
-                    val_weighted = []
-                    for j in J:
-                        out = __extract_objective(j)
-                        val.append(out[0])
-                        val_weighted.append(out[1])
-                    sum_val_weighted = sum(val_weighted)
-                    running_total += sum_val_weighted
-            return running_total
-
         if self._cost is None:
-            self._cost = get_objective_functions(self.ocp, self)
+            penalties = self.ocp.penalties
+            values = penalties.evaluate(self.ocp.v.vector, self.vector, self.targets)
+            self._cost = 0
+            for phase, list_index in penalties.objective_groups():
+                self._cost += self.__objective_value(values, phase, list_index)[1]
         return self._cost
 
     def copy(self, skip_data: bool = False) -> Any:
         """
-        Create a deepcopy of the Solution
+        Create a copy of the Solution. The arrays are not copied: since they are read only, the copy shares them
+        with the original. Only the containers (the lists and dictionaries) are new, so replacing the data of one
+        Solution does not affect the other
 
         Parameters
         ----------
@@ -410,35 +432,53 @@ class Solution:
 
         new = Solution(self.ocp, None)
 
-        new.vector = deepcopy(self.vector)
-        new._cost = deepcopy(self._cost)
-        new.constraints = deepcopy(self.constraints)
-
-        new.lam_g = deepcopy(self.lam_g)
-        new.lam_p = deepcopy(self.lam_p)
-        new.lam_x = deepcopy(self.lam_x)
-        new.inf_pr = deepcopy(self.inf_pr)
-        new.inf_du = deepcopy(self.inf_du)
-        new.time_to_optimize = deepcopy(self.time_to_optimize)
-        new.real_time_to_optimize = deepcopy(self.real_time_to_optimize)
-        new.iterations = deepcopy(self.iterations)
-
-        new.is_interpolated = deepcopy(self.is_interpolated)
-        new.is_integrated = deepcopy(self.is_integrated)
-        new.is_merged = deepcopy(self.is_merged)
-
-        new.phase_time = deepcopy(self.phase_time)
-        new.ns = deepcopy(self.ns)
+        new.vector = self.vector
+        new._cost = self._cost
+        new.constraints = self.constraints
+
+        new.lam_g = self.lam_g
+        new.lam_p = self.lam_p
+        new.lam_x = self.lam_x
+        new.inf_pr = self.inf_pr
+        new.inf_du = self.inf_du
+        new.time_to_optimize = self.time_to_optimize
+        new.real_time_to_optimize = self.real_time_to_optimize
+        new.iterations = self.iterations
+        new.targets = self.targets
+        new.status = getattr(self, "status", None)
+        new.profile = self.profile
+        new.latency = self.latency
+
+        new.is_interpolated = self.is_interpolated
+        new.is_integrated = self.is_integrated
+        new.is_merged = self.is_merged
+
+        new.phase_time = list(self.phase_time)
+        new.ns = list(self.ns)
 
         if skip_data:
             new._states, new._controls, new.parameters = [], [], {}
         else:
-            new._states = deepcopy(self._states)
-            new._controls = deepcopy(self._controls)
-            new.parameters = deepcopy(self.parameters)
+            new._states = [SolutionData(data) for data in self._states]
+            new._controls = [SolutionData(data) for data in self._controls]
+            new.parameters = SolutionData(self.parameters)
 
         return new
 
+    def save_profile(self, file_path: str):
+        """
+        Export the profile of the optimization to a JSON file
+
+        Parameters
+        ----------
+        file_path: str
+            The path of the JSON file
+        """
+
+        if self.profile is None:
+            raise RuntimeError("There is no profile in the solution, the ocp must be declared with profile=True")
+        Profiler.to_json(self.profile, file_path)
+
     @property
     def states(self) -> Union[list, dict]:
         """
@@ -551,40 +591,54 @@ class Solution:
                             f"when integrating with Shooting.SINGLE_CONTINUOUS. If it is not possible, "
                             f"please integrate with Shooting.SINGLE"
                         )
-                    x0 += np.array(val)[:, 0]
+                    x0 = x0 + np.array(val)[:, 0]
             else:
                 x0 = self._states[p]["all"][:, 0]
-            for n in range(self.ns[p]):
-                if self.ocp.nlp[p].control_type == ControlType.CONSTANT:
-                    u = self._controls[p]["all"][:, n]
-                elif self.ocp.nlp[p].control_type == ControlType.LINEAR_CONTINUOUS:
-                    u = self._controls[p]["all"][:, n : n + 2]
-                else:
-                    raise NotImplementedError(
-                        f"ControlType {self.ocp.nlp[p].control_type} " f"not yet implemented in integrating"
-                    )
 
-                if keepdims:
-                    integrated = np.concatenate(
-                        (x0[:, np.newaxis], ocp.nlp[p].dynamics[n](x0=x0, p=u, params=params / param_scaling)["xf"]),
-                        axis=1,
+            nlp = ocp.nlp[p]
+            if nlp.control_type == ControlType.CONSTANT:
+                u = self._controls[p]["all"][:, : self.ns[p]]
+            elif nlp.control_type == ControlType.LINEAR_CONTINUOUS:
+                # Each interval receives the pair of controls at its boundaries, side by side
+                u = self._controls[p]["all"][:, np.repeat(range(self.ns[p] + 1), 2)[1:-1]]
+            else:
+                raise NotImplementedError(f"ControlType {nlp.control_type} " f"not yet implemented in integrating")
+            scaled_params = params / param_scaling
+            x_start = x0
+
+            # All the intervals are integrated at once, either independently or by chaining them
+            if shooting_type == Shooting.MULTIPLE and nlp.par_dynamics is not None:
+                integrated = nlp.par_dynamics(x0=self._states[p]["all"][:, :-1], p=u, params=scaled_params)
+            elif shooting_type != Shooting.MULTIPLE and nlp.accum_dynamics is not None:
+                integrated = nlp.accum_dynamics(x0=x0, p=u, params=np.repeat(scaled_params, self.ns[p], axis=1))
+            else:
+                integrated = {"xf": [], "xall": []}
+                n_cols_u = u.shape[1] // self.ns[p]
+                for n in range(self.ns[p]):
+                    out_node = nlp.dynamics[n](x0=x0, p=u[:, n * n_cols_u : (n + 1) * n_cols_u], params=scaled_params)
+                    integrated["xf"].append(out_node["xf"])
+                    integrated["xall"].append(out_node["xall"])
+                    x0 = (
+                        np.array(self._states[p]["all"][:, n + 1])
+                        if shooting_type == Shooting.MULTIPLE
+                        else np.array(out_node["xf"])[:, 0]
                     )
-                    cols = [n, n + 1]
-                else:
-                    integrated = np.array(ocp.nlp[p].dynamics[n](x0=x0, p=u, params=params / param_scaling)["xall"])
-                    cols = [n * n_steps, (n + 1) * n_steps]
-                cols[1] = cols[1] + 1 if continuous else cols[1]
-                cols = range(cols[0], cols[1])
-
-                out._states[p]["all"][:, cols] = integrated
-                x0 = (
-                    np.array(self._states[p]["all"][:, n + 1])
-                    if shooting_type == Shooting.MULTIPLE
-                    else integrated[:, -1]
-                )
+                integrated = {key: horzcat(*integrated[key]) for key in integrated}
 
-            if not continuous:
-                out._states[p]["all"][:, -1] = self._states[p]["all"][:, -1]
+            if keepdims:
+                out._states[p]["all"][:, 0] = x_start
+                out._states[p]["all"][:, 1:] = np.array(integrated["xf"])
+            else:
+                x_all = np.array(integrated["xall"])
+                if continuous:
+                    # The arrival of each interval is replaced by the beginning of the next one
+                    x_all = x_all.reshape((shape[0], self.ns[p], n_steps + 1))[:, :, :n_steps]
+                    out._states[p]["all"][:, :-1] = x_all.reshape((shape[0], self.ns[p] * n_steps))
+                    out._states[p]["all"][:, -1] = np.array(integrated["xall"])[:, -1]
+                else:
+                    out._states[p]["all"][:, :-1] = x_all
+                    out._states[p]["all"][:, -1] = self._states[p]["all"][:, -1]
+            x0 = np.array(integrated["xf"])[:, -1]
 
             # Dispatch the integrated values to all the keys
             off = 0
@@ -600,6 +654,7 @@ class Solution:
                 out.is_merged = True
 
         out.is_integrated = True
+        out._freeze_data()
         return out
 
     def interpolate(self, n_frames: Union[int, list, tuple]) -> Any:
@@ -661,6 +716,7 @@ class Solution:
                 offset += n_elements
 
         out.is_interpolated = True
+        out._freeze_data()
         return out
 
     def merge_phases(self) -> Any:
@@ -673,9 +729,10 @@ class Solution:
         """
 
         new = self.copy(skip_data=True)
-        new.parameters = deepcopy(self.parameters)
+        new.parameters = dict(self.parameters)
         new._states, new._controls, new.phase_time, new.ns = self._merge_phases()
         new.is_merged = True
+        new._freeze_data()
         return new
 
     def _merge_phases(self, skip_states: bool = False, skip_controls: bool = False) -> tuple:
@@ -696,7 +753,12 @@ class Solution:
         """
 
         if self.is_merged:
-            return deepcopy(self._states), deepcopy(self._controls), deepcopy(self.phase_time), deepcopy(self.ns)
+            return (
+                [dict(data) for data in self._states],
+                [dict(data) for data in self._controls],
+                list(self.phase_time),
+                list(self.ns),
+            )
 
         def _merge(data: list) -> Union[list, dict]:
             """
@@ -722,26 +784,27 @@ class Solution:
                 if d.keys() != keys or [d[key].shape[0] for key in d] != sizes:
                     raise RuntimeError("Program dimension must be coherent across phases to merge_phases them")
 
-            data_out = [{}]
-            for i, key in enumerate(keys):
-                data_out[0][key] = np.ndarray((sizes[i], 0))
-
-            for p in range(len(data)):
-                d = data[p]
-                for key in d:
-                    data_out[0][key] = np.concatenate((data_out[0][key], d[key][:, : self.ns[p]]), axis=1)
-            for key in data[-1]:
-                data_out[0][key] = np.concatenate((data_out[0][key], data[-1][key][:, -1][:, np.newaxis]), axis=1)
+            # Only "all" is concatenated (once), the other keys are views on it
+            merged = np.concatenate(
+                [d["all"][:, : self.ns[p]] for p, d in enumerate(data)] + [data[-1]["all"][:, -1:]], axis=1
+            )
+            data_out = [{"all": merged}]
+            offset = 0
+            for key in keys:
+                if key == "all":
+                    continue
+                data_out[0][key] = merged[offset : offset + data[0][key].shape[0], :]
+                offset += data[0][key].shape[0]
 
             return data_out
 
         if len(self._states) == 1:
-            out_states = deepcopy(self._states)
+            out_states = [dict(self._states[0])]
         else:
             out_states = _merge(self.states) if not skip_states and self._states else None
 
         if len(self._controls) == 1:
-            out_controls = deepcopy(self._controls)
+            out_controls = [dict(self._controls[0])]
         else:
             out_controls = _merge(self.controls) if not skip_controls and self._controls else None
         phase_time = [0] + [sum([self.phase_time[i + 1] for i in range(len(self.phase_time) - 1)])]
@@ -756,15 +819,35 @@ class Solution:
 
         for p, nlp in enumerate(self.ocp.nlp):
             if nlp.control_type == ControlType.CONSTANT:
+                # Only "all" is extended, the other keys are views on it so the controls are not stored twice
+                controls = self._controls[p]["all"]
+                self._controls[p]["all"] = np.concatenate((controls, controls[:, -1:]), axis=1)
+                offset = 0
                 for key in self._controls[p]:
-                    self._controls[p][key] = np.concatenate(
-                        (self._controls[p][key], self._controls[p][key][:, -1][:, np.newaxis]), axis=1
-                    )
+                    if key == "all":
+                        continue
+                    n_elements = self._controls[p][key].shape[0]
+                    self._controls[p][key] = self._controls[p]["all"][offset : offset + n_elements, :]
+                    offset += n_elements
             elif nlp.control_type == ControlType.LINEAR_CONTINUOUS:
                 pass
             else:
                 raise NotImplementedError(f"ControlType {nlp.control_type} is not implemented  in _complete_control")
 
+    def _freeze_data(self):
+        """
+        Set the arrays of the states, controls and parameters to read only so they can be shared between Solutions.
+        Modifying them in place raises an error, new arrays must be assigned instead (see SolutionData)
+        """
+
+        self._states = [SolutionData(data) for data in self._states]
+        self._controls = [SolutionData(data) for data in self._controls]
+        self.parameters = SolutionData(self.parameters)
+        for data in self._states + self._controls + [self.parameters]:
+            for key in data:
+                if isinstance(data[key], np.ndarray):
+                    data[key].flags.writeable = False
+
     def graphs(
         self,
         automatically_organize: bool = True,
@@ -793,7 +876,7 @@ class Solution:
         plot_ocp = self.ocp.prepare_plots(automatically_organize, adapt_graph_size_to_bounds, shooting_type)
         plot_ocp.update_data(self.vector)
         if show_now:
-            plt.show()
+            plot_ocp.show()
 
     def animate(
         self, n_frames: int = 0, shooting_type: Shooting = None, show_now: bool = True, **kwargs: Any
@@ -874,73 +957,24 @@ class Solution:
             Print the values of each objective function to the console
             """
 
-            def __extract_objective(pen: dict):
-                """
-                Extract objective function from a penalty
-
-                Parameters
-                ----------
-                pen: dict
-                    The penalty to extract the value from
-
-                Returns
-                -------
-                The value extract
-                """
-
-                # TODO: This should be done in bounds and objective functions, so it is available for all the code
-                val_tp = Function("val_tp", [ocp.v.vector], [pen["val"]]).expand()(sol.vector)
-                if pen["target"] is not None:
-                    # TODO Target should be available to constraint?
-                    nan_idx = np.isnan(pen["target"])
-                    pen["target"][nan_idx] = 0
-                    val_tp -= pen["target"]
-                    if np.any(nan_idx):
-                        val_tp[np.where(nan_idx)] = 0
-
-                if pen["objective"].quadratic:
-                    val_tp *= val_tp
-
-                val = np.sum(val_tp)
-
-                dt = Function("dt", [ocp.v.vector], [pen["dt"]]).expand()(sol.vector)
-                val_weighted = pen["objective"].weight * val * dt
-                return val, val_weighted
-
             print(f"\n---- COST FUNCTION VALUES ----")
-            has_global = False
+            penalties = ocp.penalties
+            values = penalties.evaluate(ocp.v.vector, sol.vector, sol.targets)
             running_total = 0
-            for J in ocp.J:
-                if not J:
-                    continue
-                has_global = True
-                val = []
-                val_weighted = []
-                for j in J:
-                    out = __extract_objective(j)
-                    val.append(out[0])
-                    val_weighted.append(out[1])
-                sum_val_weighted = sum(val_weighted)
-                print(f"{J[0]['objective'].name}: {sum(val)} (weighted {sum_val_weighted})")
-                running_total += sum_val_weighted
-            if has_global:
-                print("")
-
-            for idx_phase, nlp in enumerate(ocp.nlp):
-                print(f"PHASE {idx_phase}")
-                for J in nlp.J:
-                    if not J:
+            has_global = False
+            for phase in range(-1, len(ocp.nlp)):
+                if phase >= 0:
+                    print(f"PHASE {phase}")
+                for list_index in range(len(ocp.J if phase < 0 else ocp.nlp[phase].J)):
+                    idx = penalties.objective_indices(phase, list_index)
+                    if not idx.shape[0]:
                         continue
-                    val = []
-                    val_weighted = []
-                    for j in J:
-                        out = __extract_objective(j)
-                        val.append(out[0])
-                        val_weighted.append(out[1])
-                    sum_val_weighted = sum(val_weighted)
-                    print(f"{J[0]['objective'].name}: {sum(val)} (weighted {sum_val_weighted})")
-                    running_total += sum_val_weighted
-                print("")
+                    has_global = has_global or phase < 0
+                    val, val_weighted = sol.__objective_value(values, phase, list_index)
+                    print(f"{penalties.objectives[idx[0]]['objective'].name}: {val} (weighted {val_weighted})")
+                    running_total += val_weighted
+                if phase >= 0 or has_global:
+                    print("")
 
             print(f"Sum cost functions: {running_total}")
             print(f"------------------------------")
@@ -955,29 +989,17 @@ class Solution:
 
             # Todo, min/mean/max
             print(f"\n--------- CONSTRAINTS ---------")
-            idx = 0
-            has_global = False
-            for G in ocp.g:
-                has_global = True
-                g, next_idx = None, None
-                for g in G:
-                    next_idx = idx + g["val"].shape[0]
-                if g:
-                    print(f"{g['constraint'].name}: {np.sum(sol.constraints[idx:next_idx])}")
-                idx = next_idx
-            if has_global:
-                print("")
-
-            for idx_phase, nlp in enumerate(ocp.nlp):
-                print(f"PHASE {idx_phase}")
-                for G in nlp.g:
-                    g, next_idx = None, idx
-                    for g in G:
-                        next_idx += g["val"].shape[0]
-                    if g:
-                        print(f"{g['constraint'].name}: {np.sum(sol.constraints[idx:next_idx])}")
-                    idx = next_idx
-                print("")
+            penalties = ocp.penalties
+            for phase in range(-1, len(ocp.nlp)):
+                if phase >= 0:
+                    print(f"PHASE {phase}")
+                for list_index in range(len(ocp.g if phase < 0 else ocp.nlp[phase].g)):
+                    idx = penalties.constraint_indices(phase, list_index)
+                    if idx.shape[0]:
+                        name = penalties.constraints[idx[0]]["constraint"].name
+                        print(f"{name}: {np.sum(sol.constraints[penalties.constraint_slice(phase, list_index)])}")
+                if phase >= 0 or ocp.g:
+                    print("")
             print(f"------------------------------")
 
         if cost_type == CostType.OBJECTIVES:
@@ -990,3 +1012,26 @@ class Solution:
             self.print(CostType.CONSTRAINTS)
         else:
             raise ValueError("print can only be called with CostType.OBJECTIVES or CostType.CONSTRAINTS")
+
+    def __objective_value(self, values: dict, phase: int, list_index: int) -> tuple:
+        """
+        Gather the value of an objective function from the values of all the penalties
+
+        Parameters
+        ----------
+        values: dict
+            The values of all the penalties at the solution (see PenaltyRegistry.evaluate)
+        phase: int
+            The phase of the objective (-1 for the objectives that are not phase dependent)
+        list_index: int
+            The index of the objective in J
+
+        Returns
+        -------
+        The value of the objective and its weighted value
+        """
+
+        idx = self.ocp.penalties.objective_indices(phase, list_index).tolist()
+        val = np.sum(np.array(values["objectives"])[idx])
+        val_weighted = sum1(values["weighted"][idx])
+        return val, val_weighted
@@ -0,0 +1,378 @@
+from typing import Union, Any
+import json
+import os
+import pickle
+import struct
+import zipfile
+
+import numpy as np
+from casadi import DM
+
+from .solution import Solution
+
+
+class SolutionFile:
+    """
+    A solution saved in the compact format (*.npz). The file is a standard uncompressed numpy archive: the states and
+    the controls of each phase, the parameters, the optimization vector, the Lagrange multipliers and the constraints
+    are stored as separate arrays, next to a JSON header (format version, versions of the libraries, layout of the
+    variables and statistics of the solver) and to the pickled arguments of the ocp. Since the arrays are not
+    compressed, they are memory mapped directly from the archive, so reading a single variable of a single phase
+    neither loads the rest of the file nor rebuilds the ocp. The ocp (and the full Solution) are only rebuilt when they
+    are accessed
+
+    Attributes
+    ----------
+    FORMAT_VERSION: int
+        The version of the format written by save
+    file_path: str
+        The path to the file
+    header: dict
+        The description of the content of the file
+    __members: dict
+        The position in the file, the shape, the order and the type of each array
+    __ocp: OptimalControlProgram
+        The ocp, once rebuilt
+    __solution: Solution
+        The solution, once rebuilt
+
+    Methods
+    -------
+    save(file_path: str, sol: Solution, ocp_initializer: dict, versions: dict)
+        Write a solution to the compact format
+    array(self, name: str) -> np.ndarray
+        Get a stored array (memory mapped)
+    states(self, phase: int = 0, key: str = "all") -> np.ndarray
+        Get the states of a phase
+    controls(self, phase: int = 0, key: str = "all") -> np.ndarray
+        Get the controls of a phase
+    parameters(self, key: str = "all") -> np.ndarray
+        Get the parameters
+    @property
+    n_phases(self) -> int
+        The number of phases
+    @property
+    stats(self) -> dict
+        The statistics of the solver
+    @property
+    ocp(self) -> OptimalControlProgram
+        The ocp, rebuilt at the first access
+    @property
+    solution(self) -> Solution
+        The Solution, rebuilt (with the ocp) at the first access
+    __index(self)
+        Find the position of all the arrays in the file
+    __variable(self, kind: str, phase: int, key: str) -> np.ndarray
+        Get a state or a control of a phase
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, file_path: str):
+        """
+        Parameters
+        ----------
+        file_path: str
+            The path to the file
+        """
+
+        self.file_path = file_path
+        self.__members = {}
+        self.__ocp = None
+        self.__solution = None
+        self.__index()
+
+        self.header = json.loads(bytes(self.array("header")).decode())
+        if self.header.get("format") != "bioptim_solution":
+            raise RuntimeError(f"{file_path} is not a bioptim solution file")
+        if self.header["format_version"] > SolutionFile.FORMAT_VERSION:
+            raise RuntimeError(
+                f"{file_path} was written with a newer version of the format ({self.header['format_version']}), "
+                f"please update bioptim"
+            )
+
+    @staticmethod
+    def save(file_path: str, sol: Solution, ocp_initializer: Union[dict, None], versions: dict):
+        """
+        Write a solution to the compact format
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the file (*.npz)
+        sol: Solution
+            The solution to save
+        ocp_initializer: Union[dict, None]
+            The arguments to rebuild the ocp (its original_values). The ocp cannot be rebuilt from the file if None
+        versions: dict
+            The versions of casadi, biorbd and bioptim
+        """
+
+        all_states = sol.states if isinstance(sol.states, (list, tuple)) else [sol.states]
+        try:
+            all_controls = sol.controls if isinstance(sol.controls, (list, tuple)) else [sol.controls]
+        except RuntimeError:
+            # There is no controls in integrated or interpolated solutions
+            all_controls = []
+
+        arrays = {}
+        layout = {"states": [], "controls": []}
+        for kind, all_phases in (("states", all_states), ("controls", all_controls)):
+            for phase, data in enumerate(all_phases):
+                arrays[f"phase{phase}/{kind}"] = np.asarray(data["all"], dtype=float)
+                keys = {}
+                offset = 0
+                for key in data:
+                    if key == "all":
+                        continue
+                    keys[key] = [offset, offset + data[key].shape[0]]
+                    offset += data[key].shape[0]
+                layout[kind].append(keys)
+        for key in sol.parameters:
+            arrays[f"parameters/{key}"] = np.asarray(sol.parameters[key], dtype=float)
+
+        for key, value in (
+            ("vector", sol.vector if not (sol.is_integrated or sol.is_interpolated or sol.is_merged) else None),
+            ("constraints", sol.constraints),
+            ("lam_g", sol.lam_g),
+            ("lam_x", sol.lam_x),
+            ("lam_p", sol.lam_p),
+        ):
+            if value is not None:
+                arrays[key] = np.array(value, dtype=float).reshape((-1, 1))
+
+        cost = sol._cost if sol._cost is not None or arrays.get("vector") is None else sol.cost
+        header = {
+            "format": "bioptim_solution",
+            "format_version": SolutionFile.FORMAT_VERSION,
+            "versions": versions,
+            "layout": layout,
+            "stats": {
+                "cost": None if cost is None else float(np.array(cost).reshape(-1)[0]),
+                "iterations": None if sol.iterations is None else int(sol.iterations),
+                "status": getattr(sol, "status", None),
+                "time_to_optimize": None if sol.time_to_optimize is None else float(sol.time_to_optimize),
+                "real_time_to_optimize": (
+                    None if sol.real_time_to_optimize is None else float(sol.real_time_to_optimize)
+                ),
+                "inf_pr": None if sol.inf_pr is None else np.array(sol.inf_pr, dtype=float).reshape(-1).tolist(),
+                "inf_du": None if sol.inf_du is None else np.array(sol.inf_du, dtype=float).reshape(-1).tolist(),
+            },
+            "phase_time": np.array(sol.phase_time, dtype=float).reshape(-1).tolist(),
+            "ns": [int(n) for n in sol.ns],
+            "is_integrated": sol.is_integrated,
+            "is_interpolated": sol.is_interpolated,
+            "is_merged": sol.is_merged,
+        }
+        arrays["header"] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+        if ocp_initializer is not None:
+            arrays["ocp_initializer"] = np.frombuffer(pickle.dumps(ocp_initializer), dtype=np.uint8)
+
+        # Create folder if necessary
+        directory, _ = os.path.split(file_path)
+        if directory != "" and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # np.savez does not compress, which is what allows the arrays to be memory mapped when they are read
+        with open(file_path, "wb") as file:
+            np.savez(file, **arrays)
+
+    def __index(self):
+        """
+        Find the position of all the arrays in the file, by reading the local header of each member of the archive
+        and the header of the .npy inside it
+        """
+
+        header_readers = {(1, 0): np.lib.format.read_array_header_1_0, (2, 0): np.lib.format.read_array_header_2_0}
+        with zipfile.ZipFile(self.file_path) as archive, open(self.file_path, "rb") as file:
+            for info in archive.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise RuntimeError(f"{self.file_path} is compressed and cannot be memory mapped")
+                file.seek(info.header_offset)
+                local_header = file.read(30)
+                name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+                file.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(file)
+                if version not in header_readers:
+                    raise RuntimeError(f"Unsupported .npy version {version} in {self.file_path}")
+                shape, fortran_order, dtype = header_readers[version](file)
+                name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+                self.__members[name] = (file.tell(), shape, fortran_order, dtype)
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Get a stored array. It is memory mapped, so only the parts that are actually used are read
+
+        Parameters
+        ----------
+        name: str
+            The name of the array (e.g. 'phase0/states', 'parameters/time', 'vector' or 'lam_g')
+
+        Returns
+        -------
+        The read only array
+        """
+
+        if name not in self.__members:
+            raise ValueError(f"{name} is not in {self.file_path}, the available arrays are {list(self.__members)}")
+        offset, shape, fortran_order, dtype = self.__members[name]
+        if int(np.prod(shape)) == 0:
+            return np.ndarray(shape, dtype=dtype)
+        return np.memmap(
+            self.file_path, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran_order else "C"
+        )
+
+    def states(self, phase: int = 0, key: str = "all") -> np.ndarray:
+        """
+        Get the states of a phase
+
+        Parameters
+        ----------
+        phase: int
+            The phase
+        key: str
+            The name of the state ('all' for all of them)
+
+        Returns
+        -------
+        The read only states, one column per node
+        """
+
+        return self.__variable("states", phase, key)
+
+    def controls(self, phase: int = 0, key: str = "all") -> np.ndarray:
+        """
+        Get the controls of a phase
+
+        Parameters
+        ----------
+        phase: int
+            The phase
+        key: str
+            The name of the control ('all' for all of them)
+
+        Returns
+        -------
+        The read only controls, one column per node
+        """
+
+        return self.__variable("controls", phase, key)
+
+    def parameters(self, key: str = "all") -> np.ndarray:
+        """
+        Get the parameters
+
+        Parameters
+        ----------
+        key: str
+            The name of the parameter ('all' for all of them)
+
+        Returns
+        -------
+        The read only parameters
+        """
+
+        return self.array(f"parameters/{key}")
+
+    def __variable(self, kind: str, phase: int, key: str) -> np.ndarray:
+        """
+        Get a state or a control of a phase
+
+        Parameters
+        ----------
+        kind: str
+            'states' or 'controls'
+        phase: int
+            The phase
+        key: str
+            The name of the variable ('all' for all of them)
+
+        Returns
+        -------
+        The rows of the variable (a view on the memory mapped array of the phase)
+        """
+
+        if phase < 0 or phase >= len(self.header["layout"][kind]):
+            raise ValueError(f"There is no {kind} for phase {phase} in {self.file_path}")
+        data = self.array(f"phase{phase}/{kind}")
+        if key == "all":
+            return data
+        keys = self.header["layout"][kind][phase]
+        if key not in keys:
+            raise ValueError(f"{key} is not in the {kind} of phase {phase}, the available keys are {list(keys)}")
+        return data[keys[key][0] : keys[key][1], :]
+
+    @property
+    def n_phases(self) -> int:
+        """
+        The number of phases
+        """
+
+        return len(self.header["layout"]["states"])
+
+    @property
+    def stats(self) -> dict:
+        """
+        The statistics of the solver (cost, iterations, status, time_to_optimize, real_time_to_optimize, inf_pr and
+        inf_du)
+        """
+
+        return self.header["stats"]
+
+    @property
+    def ocp(self) -> Any:
+        """
+        The ocp, rebuilt from the stored arguments at the first access. It requires the same versions of the libraries
+
+        Returns
+        -------
+        The OptimalControlProgram
+        """
+
+        if self.__ocp is None:
+            from .optimal_control_program import OptimalControlProgram
+
+            if "ocp_initializer" not in self.__members:
+                raise RuntimeError(f"The ocp was not saved in {self.file_path} (it was saved with stand_alone=True)")
+            ocp = OptimalControlProgram(**pickle.loads(bytes(self.array("ocp_initializer"))))
+            for key in self.header["versions"].keys():
+                if self.header["versions"][key] != ocp.version[key]:
+                    raise RuntimeError(
+                        f"Version of {key} from file ({self.header['versions'][key]}) is not the same as the "
+                        f"installed version ({ocp.version[key]})"
+                    )
+            self.__ocp = ocp
+        return self.__ocp
+
+    @property
+    def solution(self) -> Solution:
+        """
+        The Solution, rebuilt (with the ocp) at the first access
+
+        Returns
+        -------
+        The Solution
+        """
+
+        if self.__solution is None:
+            if "vector" not in self.__members:
+                raise RuntimeError(
+                    "The Solution cannot be rebuilt from an integrated, interpolated or merged solution, "
+                    "please use states, controls and parameters instead"
+                )
+            sol = {"x": np.array(self.array("vector"))}
+            for key, value in (("g", "constraints"), ("lam_g", "lam_g"), ("lam_x", "lam_x"), ("lam_p", "lam_p")):
+                if value in self.__members:
+                    sol[key] = np.array(self.array(value))
+            stats = self.stats
+            if stats["cost"] is not None:
+                sol["f"] = DM(stats["cost"])
+            for key, stat in (("iter", "iterations"), ("status", "status"), ("time_tot", "time_to_optimize")):
+                if stats[stat] is not None:
+                    sol[key] = stats[stat]
+            for key in ("inf_pr", "inf_du"):
+                if stats[key] is not None:
+                    sol[key] = stats[key]
+
+            self.__solution = Solution(self.ocp, sol)
+            self.__solution.real_time_to_optimize = stats["real_time_to_optimize"]
+        return self.__solution
@@ -36,6 +36,14 @@ class OptimizationVariable:
         The number of controls of all the phases
     n_phase_u: list
         The number of controls per phases
+    _vector: Union[MX, SX]
+        The cached value of vector, None if it must be rebuilt
+    _bounds: Bounds
+        The cached value of bounds, None if it must be rebuilt
+    _init: InitialGuess
+        The cached value of init, None if it must be rebuilt
+    _parameters: Parameter
+        The cached value of parameters, None if it must be rebuilt
 
     Methods
     -------
@@ -51,6 +59,14 @@ class OptimizationVariable:
     @property
     parameters(self)
         Get the parameters in one single Parameter class
+    invalidate_bounds(self)
+        Discard the cached bounds so they are rebuilt at the next access
+    invalidate_init(self)
+        Discard the cached initial guesses so they are rebuilt at the next access
+    invalidate_parameters(self)
+        Discard the cached parameters, and the bounds and initial guesses that include them
+    __stack(all_values: list) -> np.ndarray
+        Stack column vectors into one preallocated contiguous column vector
     extract_phase_time(self, data: Union[np.array, DM]) -> list
         Get the phase time. If time is optimized, the MX/SX values are replaced by their actual optimized time
     to_dictionaries(self, data: Union[np.array, DM]) -> tuple
@@ -61,6 +77,12 @@ class OptimizationVariable:
         Declare and parse the bounds for all the variables (v vector)
     define_ocp_initial_guess(self)
         Declare and parse the initial guesses for all the variables (v vector)
+    update_phase_initial_guess(self, phase: int, x: np.ndarray, u: np.ndarray = None)
+        Write the initial guess of all the nodes of a phase in place, without rebuilding the vectors
+    update_initial_state_bounds(self, phase: int, min_bound: np.ndarray, max_bound: np.ndarray)
+        Write the bounds of the first node of a phase in place, without rebuilding the vectors
+    __write_nodes(column: np.ndarray, offset: int, values: np.ndarray)
+        Write the values of consecutive nodes in a column vector, where the nodes are stacked one after the other
     add_parameter(self, param: Parameter)
         Add a parameter to the parameters pool
     """
@@ -100,80 +122,143 @@ class OptimizationVariable:
             self.u_init.append(InitialGuess(interpolation=InterpolationType.CONSTANT))
             self.n_phase_u.append(0)
 
+        self._vector = None
+        self._bounds = None
+        self._init = None
+        self._parameters = None
+
     @property
     def vector(self):
         """
-        Format the x, u and p so they are in one nice (and useful) vector
+        Format the x, u and p so they are in one nice (and useful) vector. It is cached until the shooting points are
+        redefined or a parameter is added
 
         Returns
         -------
         The vector of all variables
         """
 
-        return vertcat(*self.x, *self.u, self.parameters.cx)
+        if self._vector is None:
+            self._vector = vertcat(*self.x, *self.u, self.parameters.cx)
+        return self._vector
 
     @property
     def bounds(self):
         """
-        Format the x, u and p bounds so they are in one nice (and useful) vector
+        Format the x, u and p bounds so they are in one nice (and useful) vector. It is cached until the bounds or
+        the parameters are updated, so it must not be modified in place
 
         Returns
         -------
         The vector of all bounds
         """
 
-        v_bounds = Bounds(interpolation=InterpolationType.CONSTANT)
-        for x_bound in self.x_bounds:
-            v_bounds.concatenate(x_bound)
-        for u_bound in self.u_bounds:
-            v_bounds.concatenate(u_bound)
-        v_bounds.concatenate(self.parameters.bounds)
-        return v_bounds
+        if self._bounds is None:
+            all_bounds = self.x_bounds + self.u_bounds + [self.parameters.bounds]
+            self._bounds = Bounds(
+                self.__stack([bound.min for bound in all_bounds]),
+                self.__stack([bound.max for bound in all_bounds]),
+                interpolation=InterpolationType.CONSTANT,
+            )
+        return self._bounds
 
     @property
     def init(self):
         """
-        Format the x, u and p init so they are in one nice (and useful) vector
+        Format the x, u and p init so they are in one nice (and useful) vector. It is cached until the initial guesses
+        or the parameters are updated, so it must not be modified in place
 
         Returns
         -------
         The vector of all init
         """
 
-        v_init = InitialGuess(interpolation=InterpolationType.CONSTANT)
-        for x_init in self.x_init:
-            v_init.concatenate(x_init)
-        for u_init in self.u_init:
-            v_init.concatenate(u_init)
-        v_init.concatenate(self.parameters.initial_guess)
-        return v_init
+        if self._init is None:
+            all_init = self.x_init + self.u_init + [self.parameters.initial_guess]
+            self._init = InitialGuess(
+                self.__stack([init.init for init in all_init]), interpolation=InterpolationType.CONSTANT
+            )
+        return self._init
 
     @property
     def parameters(self):
         """
-        Get the parameters in one single Parameter class
+        Get the parameters in one single Parameter class. It is cached until a parameter is added or modified
 
         Returns
         -------
         The parameters in one single Parameter class
         """
 
-        param = Parameter(
-            cx=self.ocp.cx(),
-            bounds=Bounds(interpolation=InterpolationType.CONSTANT),
-            initial_guess=InitialGuess(),
-            size=0,
-        )
-        for p in self.parameters_in_list:
-            param.cx = vertcat(param.cx, p.cx)
-            param.size += p.size if p else 0
+        if self._parameters is None:
+            param = Parameter(
+                cx=self.ocp.cx(),
+                bounds=Bounds(interpolation=InterpolationType.CONSTANT),
+                initial_guess=InitialGuess(),
+                size=0,
+            )
+            param.cx = vertcat(param.cx, *[p.cx for p in self.parameters_in_list])
+            param.size = sum([p.size if p else 0 for p in self.parameters_in_list])
 
-            param.bounds.concatenate(p.bounds)
+            param.bounds = Bounds(
+                self.__stack([p.bounds.min for p in self.parameters_in_list]),
+                self.__stack([p.bounds.max for p in self.parameters_in_list]),
+                interpolation=InterpolationType.CONSTANT,
+            )
             param.bounds.check_and_adjust_dimensions(param.size, 1)
 
-            param.initial_guess.concatenate(p.initial_guess)
+            param.initial_guess = InitialGuess(
+                self.__stack([p.initial_guess.init for p in self.parameters_in_list]),
+                interpolation=InterpolationType.CONSTANT,
+            )
             param.initial_guess.check_and_adjust_dimensions(param.size, 1)
-        return param
+            self._parameters = param
+        return self._parameters
+
+    def invalidate_bounds(self):
+        """
+        Discard the cached bounds so they are rebuilt at the next access
+        """
+
+        self._bounds = None
+
+    def invalidate_init(self):
+        """
+        Discard the cached initial guesses so they are rebuilt at the next access
+        """
+
+        self._init = None
+
+    def invalidate_parameters(self):
+        """
+        Discard the cached parameters, and the bounds and initial guesses that include them
+        """
+
+        self._parameters = None
+        self._bounds = None
+        self._init = None
+
+    @staticmethod
+    def __stack(all_values: list) -> np.ndarray:
+        """
+        Stack column vectors into one preallocated contiguous column vector
+
+        Parameters
+        ----------
+        all_values: list[np.ndarray]
+            The column vectors to stack
+
+        Returns
+        -------
+        The stacked column vector
+        """
+
+        stacked = np.empty((sum([values.shape[0] for values in all_values]), 1))
+        offset = 0
+        for values in all_values:
+            stacked[offset : offset + values.shape[0], 0] = np.asarray(values)[:, 0]
+            offset += values.shape[0]
+        return stacked
 
     def extract_phase_time(self, data: Union[np.array, DM]) -> list:
         """
@@ -301,6 +386,7 @@ class OptimizationVariable:
 
         self.n_all_x = sum(self.n_phase_x)
         self.n_all_u = sum(self.n_phase_u)
+        self._vector = None
 
     def define_ocp_bounds(self):
         """
@@ -321,12 +407,12 @@ class OptimizationVariable:
 
         # Declare phases dimensions
         for i_phase, nlp in enumerate(ocp.nlp):
-            # For states
-            nx = nlp.nx * (nlp.ns + 1)
-            x_bounds = Bounds([0] * nx, [0] * nx, interpolation=InterpolationType.CONSTANT)
-            for k in range(nlp.ns + 1):
-                x_bounds.min[k * nlp.nx : (k + 1) * nlp.nx, 0] = nlp.x_bounds.min.evaluate_at(shooting_point=k)
-                x_bounds.max[k * nlp.nx : (k + 1) * nlp.nx, 0] = nlp.x_bounds.max.evaluate_at(shooting_point=k)
+            # For states (the nodes are stacked one after the other, hence the column-major flattening)
+            x_bounds = Bounds(
+                nlp.x_bounds.min.evaluate_all(nlp.ns).reshape(-1, order="F"),
+                nlp.x_bounds.max.evaluate_all(nlp.ns).reshape(-1, order="F"),
+                interpolation=InterpolationType.CONSTANT,
+            )
 
             # For controls
             if nlp.control_type == ControlType.CONSTANT:
@@ -335,14 +421,15 @@ class OptimizationVariable:
                 ns = nlp.ns + 1
             else:
                 raise NotImplementedError(f"Multiple shooting problem not implemented yet for {nlp.control_type}")
-            nu = nlp.nu * ns
-            u_bounds = Bounds([0] * nu, [0] * nu, interpolation=InterpolationType.CONSTANT)
-            for k in range(ns):
-                u_bounds.min[k * nlp.nu : (k + 1) * nlp.nu, 0] = nlp.u_bounds.min.evaluate_at(shooting_point=k)
-                u_bounds.max[k * nlp.nu : (k + 1) * nlp.nu, 0] = nlp.u_bounds.max.evaluate_at(shooting_point=k)
+            u_bounds = Bounds(
+                nlp.u_bounds.min.evaluate_all(ns - 1).reshape(-1, order="F"),
+                nlp.u_bounds.max.evaluate_all(ns - 1).reshape(-1, order="F"),
+                interpolation=InterpolationType.CONSTANT,
+            )
 
             self.x_bounds[i_phase] = x_bounds
             self.u_bounds[i_phase] = u_bounds
+        self.invalidate_bounds()
 
     def define_ocp_initial_guess(self):
         """
@@ -363,11 +450,10 @@ class OptimizationVariable:
 
         # Declare phases dimensions
         for i_phase, nlp in enumerate(ocp.nlp):
-            # For states
-            nx = nlp.nx * (nlp.ns + 1)
-            x_init = InitialGuess([0] * nx, interpolation=InterpolationType.CONSTANT)
-            for k in range(nlp.ns + 1):
-                x_init.init[k * nlp.nx : (k + 1) * nlp.nx, 0] = nlp.x_init.init.evaluate_at(shooting_point=k)
+            # For states (the nodes are stacked one after the other, hence the column-major flattening)
+            x_init = InitialGuess(
+                nlp.x_init.init.evaluate_all(nlp.ns).reshape(-1, order="F"), interpolation=InterpolationType.CONSTANT
+            )
 
             # For controls
             if nlp.control_type == ControlType.CONSTANT:
@@ -376,13 +462,80 @@ class OptimizationVariable:
                 ns = nlp.ns + 1
             else:
                 raise NotImplementedError(f"Multiple shooting problem not implemented yet for {nlp.control_type}")
-            nu = nlp.nu * ns
-            u_init = InitialGuess([0] * nu, interpolation=InterpolationType.CONSTANT)
-            for k in range(ns):
-                u_init.init[k * nlp.nu : (k + 1) * nlp.nu, 0] = nlp.u_init.init.evaluate_at(shooting_point=k)
+            u_init = InitialGuess(
+                nlp.u_init.init.evaluate_all(ns - 1).reshape(-1, order="F"), interpolation=InterpolationType.CONSTANT
+            )
 
             self.x_init[i_phase] = x_init
             self.u_init[i_phase] = u_init
+        self.invalidate_init()
+
+    def update_phase_initial_guess(self, phase: int, x: np.ndarray, u: np.ndarray = None):
+        """
+        Write the initial guess of all the nodes of a phase in place, without rebuilding the vectors. The initial guess
+        must have been declared by define_ocp_initial_guess
+
+        Parameters
+        ----------
+        phase: int
+            The phase to update
+        x: np.ndarray
+            The states at each node of the phase
+        u: np.ndarray
+            The controls at each node of the phase. None keeps the current ones
+        """
+
+        x_offset = sum(self.n_phase_x[:phase])
+        u_offset = self.n_all_x + sum(self.n_phase_u[:phase])
+        self.__write_nodes(self.x_init[phase].init, 0, x)
+        if self._init is not None:
+            self.__write_nodes(self._init.init, x_offset, x)
+        if u is not None:
+            self.__write_nodes(self.u_init[phase].init, 0, u)
+            if self._init is not None:
+                self.__write_nodes(self._init.init, u_offset, u)
+
+    def update_initial_state_bounds(self, phase: int, min_bound: np.ndarray, max_bound: np.ndarray):
+        """
+        Write the bounds of the first node of a phase in place, without rebuilding the vectors. The bounds must have
+        been declared by define_ocp_bounds
+
+        Parameters
+        ----------
+        phase: int
+            The phase to update
+        min_bound: np.ndarray
+            The min bounds of the states at the first node
+        max_bound: np.ndarray
+            The max bounds of the states at the first node
+        """
+
+        x_offset = sum(self.n_phase_x[:phase])
+        nx = self.ocp.nlp[phase].nx
+        self.x_bounds[phase].min[:nx, 0] = min_bound
+        self.x_bounds[phase].max[:nx, 0] = max_bound
+        if self._bounds is not None:
+            self._bounds.min[x_offset : x_offset + nx, 0] = min_bound
+            self._bounds.max[x_offset : x_offset + nx, 0] = max_bound
+
+    @staticmethod
+    def __write_nodes(column: np.ndarray, offset: int, values: np.ndarray):
+        """
+        Write the values of consecutive nodes in a column vector, where the nodes are stacked one after the other
+
+        Parameters
+        ----------
+        column: np.ndarray
+            The column vector to write in
+        offset: int
+            The first row of the column to write
+        values: np.ndarray
+            The values to write (n_elements x n_nodes)
+        """
+
+        n_elements, n_nodes = values.shape
+        # The transposed view of the rows is the column-major layout of the nodes, so nothing is allocated
+        column[offset : offset + values.size, 0].reshape((n_nodes, n_elements)).T[:, :] = values
 
     def add_parameter(self, param: Parameter):
         """
@@ -412,3 +565,5 @@ class OptimizationVariable:
             self.parameters_in_list[i].initial_guess.concatenate(param.initial_guess)
         else:
             self.parameters_in_list.add(param)
+        self.invalidate_parameters()
+        self._vector = None
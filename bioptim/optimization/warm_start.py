@@ -0,0 +1,154 @@
+import numpy as np
+
+from ..misc.enums import ControlType
+
+
+class WarmStartBase:
+    """
+    The base class of the strategies that prepare the initial guess of the next window of a receding horizon
+    optimization from the solution of the current one. The window moves by n_frames: the first n_frames frames are
+    dropped and the others are moved to the beginning of the window. The strategies differ by how the last n_frames
+    frames are filled
+
+    Attributes
+    ----------
+    n_frames: int
+        The number of frames the window moves at each solve
+    shift_controls: bool
+        If the initial guess of the controls is shifted too (otherwise it is left untouched)
+
+    Methods
+    -------
+    shift(self, ocp: OptimalControlProgram, sol: Solution, states_out: np.ndarray = None,
+            controls_out: np.ndarray = None) -> tuple
+        Compute the initial guess of the next window
+    _fill_tail(self, ocp: OptimalControlProgram, sol: Solution, states_out: np.ndarray, controls_out: np.ndarray)
+        Fill the last n_frames frames of the initial guess of the next window
+    """
+
+    def __init__(self, n_frames: int = 1, shift_controls: bool = True):
+        """
+        Parameters
+        ----------
+        n_frames: int
+            The number of frames the window moves at each solve
+        shift_controls: bool
+            If the initial guess of the controls is shifted too
+        """
+
+        if n_frames < 1:
+            raise ValueError("n_frames must be a positive integer")
+        self.n_frames = n_frames
+        self.shift_controls = shift_controls
+
+    def shift(self, ocp, sol, states_out: np.ndarray = None, controls_out: np.ndarray = None) -> tuple:
+        """
+        Compute the initial guess of the next window. If the output arrays are given, they are filled in place, so
+        no array is allocated
+
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            A reference to the receding horizon optimization
+        sol: Solution
+            The solution of the current window
+        states_out: np.ndarray
+            The array to write the states in (n_states x n_shooting + 1)
+        controls_out: np.ndarray
+            The array to write the controls in (n_controls x the number of control nodes)
+
+        Returns
+        -------
+        The initial guess of the states and the controls (None if shift_controls is False) of the next window
+        """
+
+        x = sol.states["all"]
+        if self.n_frames >= x.shape[1] - 1:
+            raise ValueError(
+                f"The window cannot move by {self.n_frames} frames, it only has {x.shape[1] - 1} intervals"
+            )
+
+        if states_out is None:
+            states_out = np.ndarray(x.shape)
+        states_out[:, : -self.n_frames] = x[:, self.n_frames :]
+
+        if self.shift_controls:
+            n_controls = ocp.nlp[0].ns + (1 if ocp.nlp[0].control_type == ControlType.LINEAR_CONTINUOUS else 0)
+            u = sol.controls["all"][:, :n_controls]
+            if controls_out is None:
+                controls_out = np.ndarray(u.shape)
+            controls_out[:, : -self.n_frames] = u[:, self.n_frames :]
+        else:
+            controls_out = None
+
+        self._fill_tail(ocp, sol, states_out, controls_out)
+        return states_out, controls_out
+
+    def _fill_tail(self, ocp, sol, states_out: np.ndarray, controls_out: np.ndarray):
+        """
+        Fill the last n_frames frames of the initial guess of the next window
+
+        Parameters
+        ----------
+        ocp: OptimalControlProgram
+            A reference to the receding horizon optimization
+        sol: Solution
+            The solution of the current window
+        states_out: np.ndarray
+            The states of the next window, where the first frames are already shifted
+        controls_out: np.ndarray
+            The controls of the next window, where the first frames are already shifted (None if they are not shifted)
+        """
+
+        raise RuntimeError("WarmStartBase is abstract, please select a valid WarmStart")
+
+
+class WarmStart:
+    """
+    The public interface to the different warm start strategies of the receding horizon optimizations
+    """
+
+    class Shift(WarmStartBase):
+        """
+        The last frame of the window is duplicated to fill the end of the next window
+        """
+
+        def _fill_tail(self, ocp, sol, states_out: np.ndarray, controls_out: np.ndarray):
+            states_out[:, -self.n_frames :] = sol.states["all"][:, -1:]
+            if controls_out is not None:
+                controls_out[:, -self.n_frames :] = controls_out[:, -self.n_frames - 1 : -self.n_frames]
+
+    class Cycle(WarmStartBase):
+        """
+        The frames that are dropped at the beginning of the window are appended at its end, which is the
+        continuation of a cyclic movement (the last frame of the window being the same as the first one)
+        """
+
+        def _fill_tail(self, ocp, sol, states_out: np.ndarray, controls_out: np.ndarray):
+            states_out[:, -self.n_frames :] = sol.states["all"][:, 1 : self.n_frames + 1]
+            if controls_out is not None:
+                controls_out[:, -self.n_frames :] = sol.controls["all"][:, : self.n_frames]
+
+    class ShiftAndSimulate(WarmStartBase):
+        """
+        The end of the next window is filled by integrating the dynamics from the last frame of the window, keeping the
+        last control constant
+        """
+
+        def _fill_tail(self, ocp, sol, states_out: np.ndarray, controls_out: np.ndarray):
+            nlp = ocp.nlp[0]
+            ns = states_out.shape[1] - 1
+            n_controls = nlp.ns + (1 if nlp.control_type == ControlType.LINEAR_CONTINUOUS else 0)
+            u_last = sol.controls["all"][:, n_controls - 1 : n_controls]
+            if nlp.control_type == ControlType.CONSTANT:
+                p = u_last
+            elif nlp.control_type == ControlType.LINEAR_CONTINUOUS:
+                p = np.repeat(u_last, 2, axis=1)
+            else:
+                raise NotImplementedError(f"ControlType {nlp.control_type} is not implemented in ShiftAndSimulate")
+            params = sol.parameters["all"] / nlp.p_scaling
+
+            for i in range(ns - self.n_frames, ns):
+                states_out[:, i + 1] = np.array(nlp.dynamics[-1](x0=states_out[:, i], p=p, params=params)["xf"])[:, 0]
+            if controls_out is not None:
+                controls_out[:, -self.n_frames :] = u_last
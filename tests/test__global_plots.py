@@ -4,6 +4,8 @@ Test for file IO
 import io
 import sys
 import os
+import pickle
+from time import sleep
 import pytest
 
 import matplotlib
@@ -12,6 +14,8 @@ matplotlib.use("Agg")
 import numpy as np
 import biorbd
 from bioptim import OptimalControlProgram
+from bioptim.gui.iterate_buffer import IterateBuffer
+from bioptim.gui.plot import PlotOcp, OnlineCallback
 
 from .utils import TestUtils
 
@@ -30,6 +34,71 @@ def test_plot_graphs_one_phase():
     sol.graphs(automatically_organize=False)
 
 
+def test_plot_update_rate():
+    bioptim_folder = TestUtils.bioptim_folder()
+    graph = TestUtils.load_module(bioptim_folder + "/examples/torque_driven_ocp/track_markers_with_torque_actuators.py")
+
+    ocp = graph.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/torque_driven_ocp/cube.bioMod",
+        n_shooting=30,
+        final_time=2,
+    )
+    sol = ocp.solve()
+
+    plot = PlotOcp(ocp, automatically_organize=False, update_every=2)
+    assert plot.update_data(sol.vector, iteration=1)
+    assert not plot.update_data(sol.vector, iteration=2)
+    assert plot.update_data(sol.vector, iteration=3)
+    assert plot.update_data(sol.vector, iteration=4, force=True)
+    plot.draw()
+    plot.draw()
+
+    # The unchanged phases are served from the cache
+    ydata = plot.ydata
+    assert plot.update_data(sol.vector, force=True)
+    for y, y_cached in zip(plot.ydata, ydata):
+        assert y is y_cached
+
+    plot = PlotOcp(ocp, automatically_organize=False, max_update_frequency=1e-3)
+    assert plot.update_data(sol.vector)
+    assert not plot.update_data(sol.vector)
+
+    with pytest.raises(ValueError, match="update_every must be at least 1"):
+        PlotOcp(ocp, automatically_organize=False, update_every=0)
+
+
+def test_plot_online_last_iterate():
+    bioptim_folder = TestUtils.bioptim_folder()
+    graph = TestUtils.load_module(bioptim_folder + "/examples/torque_driven_ocp/track_markers_with_torque_actuators.py")
+
+    ocp = graph.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/torque_driven_ocp/cube.bioMod",
+        n_shooting=30,
+        final_time=2,
+    )
+    sol = ocp.solve()
+
+    buffer = IterateBuffer(sol.vector.shape[0])
+    plotter = OnlineCallback.ProcessPlotter(ocp, {"automatically_organize": False, "update_every": 3})
+    plotter.setup(buffer)
+
+    buffer.write(sol.vector)
+    plotter.callback()
+    assert plotter.last_read == 1
+
+    # Too early according to update_every
+    buffer.write(sol.vector)
+    plotter.callback()
+    assert plotter.last_read == 1
+
+    # No newer iterate arrives (the solver stopped), so the pending one is plotted anyway
+    sleep(3 * (plotter.pending_since - plotter.first_iterate[1]) + 0.1)
+    plotter.callback()
+    assert plotter.last_read == 2
+
+    buffer.close()
+
+
 def test_plot_merged_graphs():
     # Load graphs_one_phase
     bioptim_folder = TestUtils.bioptim_folder()
@@ -161,24 +230,51 @@ def test_console_objective_functions():
         "------------------------------\n"
         "\n"
         "--------- CONSTRAINTS ---------\n"
-        "CONTINUITY 0: 1.5\n"
-        "CONTINUITY 1: 5.1\n"
-        "CONTINUITY 2: 8.7\n"
-        "PHASE_TRANSITION 0->1: 12.3\n"
-        "PHASE_TRANSITION 1->2: 15.9\n"
+        "CONTINUITY 0: 714.0\n"
+        "CONTINUITY 1: 3771.0\n"
+        "CONTINUITY 2: 4314.0\n"
+        "PHASE_TRANSITION 0->1: 253.5\n"
+        "PHASE_TRANSITION 1->2: 257.1\n"
         "\n"
         "PHASE 0\n"
-        "SUPERIMPOSE_MARKERS: 9.3\n"
-        "SUPERIMPOSE_MARKERS: 10.2\n"
+        "SUPERIMPOSE_MARKERS: 129.9\n"
+        "SUPERIMPOSE_MARKERS: 130.8\n"
         "\n"
         "PHASE 1\n"
-        "SUPERIMPOSE_MARKERS: 11.100000000000001\n"
+        "SUPERIMPOSE_MARKERS: 131.7\n"
         "\n"
         "PHASE 2\n"
-        "SUPERIMPOSE_MARKERS: 12.0\n"
+        "SUPERIMPOSE_MARKERS: 132.60000000000002\n"
         "\n"
         "------------------------------\n"
     )
 
     sys.stdout = sys.__stdout__  # Reset redirect.
     assert captured_output.getvalue() == expected_output
+
+
+def test_iterate_buffer():
+    buffer = IterateBuffer(3, n_slots=2)
+    assert buffer.latest() == (0, None)
+
+    buffer.write(np.array([1.0, 2.0, 3.0]))
+    index, v = buffer.latest()
+    assert index == 1
+    np.testing.assert_almost_equal(v, [1, 2, 3])
+    assert buffer.latest(index) == (1, None)
+
+    # Another process attaches to the same memory, and only sees the newest iterate
+    reader = pickle.loads(pickle.dumps(buffer))
+    assert not reader.owner
+    buffer.write(np.array([[4.0], [5.0], [6.0]]))
+    buffer.write(np.array([7.0, 8.0, 9.0]))
+    index, v = reader.latest(1)
+    assert index == 3
+    np.testing.assert_almost_equal(v, [7, 8, 9])
+
+    # The slot of the first iterate was reused
+    assert not reader.is_valid(1)
+    assert reader.is_valid(3)
+
+    reader.close()
+    buffer.close()
@@ -16,6 +16,7 @@ from bioptim import (
     ObjectiveList,
     ObjectiveFcn,
     Bounds,
+    BoundsList,
     QAndQDotBounds,
     OdeSolver,
     ConstraintList,
@@ -24,8 +25,11 @@ from bioptim import (
     MovingHorizonEstimator,
     Dynamics,
     DynamicsFcn,
+    DynamicsList,
     InitialGuess,
+    InitialGuessList,
     InterpolationType,
+    OptimalControlProgram,
 )
 
 from .utils import TestUtils
@@ -46,8 +50,7 @@ def test_acados_no_obj(cost_type):
     sol = ocp.solve(solver=Solver.ACADOS, solver_options={"cost_type": cost_type})
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 @pytest.mark.parametrize("cost_type", ["LINEAR_LS", "NONLINEAR_LS"])
@@ -73,8 +76,7 @@ def test_acados_one_mayer(cost_type):
     np.testing.assert_almost_equal(q[0, -1], 1.0)
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 @pytest.mark.parametrize("cost_type", ["LINEAR_LS", "NONLINEAR_LS"])
@@ -103,8 +105,7 @@ def test_acados_several_mayer(cost_type):
     np.testing.assert_almost_equal(q[2, -1], 3.0)
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 @pytest.mark.parametrize("cost_type", ["LINEAR_LS", "NONLINEAR_LS"])
@@ -133,8 +134,7 @@ def test_acados_one_lagrange(cost_type):
     np.testing.assert_almost_equal(q[0, :], target[0, :].squeeze())
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 @pytest.mark.parametrize("cost_type", ["LINEAR_LS", "NONLINEAR_LS"])
@@ -164,8 +164,7 @@ def test_acados_one_lagrange_and_one_mayer(cost_type):
     np.testing.assert_almost_equal(q[0, :], target[0, :].squeeze())
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 @pytest.mark.parametrize("cost_type", ["LINEAR_LS", "NONLINEAR_LS"])
@@ -196,8 +195,7 @@ def test_acados_control_lagrange_and_state_mayer(cost_type):
     np.testing.assert_almost_equal(q[0, -1], target.squeeze())
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 @pytest.mark.parametrize("cost_type", ["LINEAR_LS", "NONLINEAR_LS"])
@@ -225,8 +223,7 @@ def test_acados_options(cost_type):
     np.testing.assert_array_less(iter[2], iter[1])
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 def test_acados_fail_external():
@@ -353,8 +350,7 @@ def test_acados_one_parameter():
     np.testing.assert_almost_equal(gravity[-1, :], np.array([-9.81]), decimal=6)
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 def test_acados_several_parameter():
@@ -415,8 +411,7 @@ def test_acados_several_parameter():
     np.testing.assert_almost_equal(mass, np.array([[20]]), decimal=6)
 
     # Clean test folder
-    os.remove(f"./acados_ocp.json")
-    shutil.rmtree(f"./c_generated_code/")
+    shutil.rmtree("./acados_generated_code/")
 
 
 def test_acados_one_end_constraints():
@@ -537,8 +532,8 @@ def test_acados_constraints_end_all():
     np.testing.assert_almost_equal(tau[:, -1], np.array((0, 9.81, -2.27903226, 0)), decimal=6)
 
 
-@pytest.mark.parametrize("failing", ["u_bounds", "x_bounds"])
-def test_acados_bounds_not_implemented(failing):
+@pytest.mark.parametrize("interpolation", ["u_bounds", "x_bounds"])
+def test_acados_bounds_interpolation(interpolation):
     if platform == "win32":
         print("Test for ACADOS on Windows is skipped")
         return
@@ -552,14 +547,14 @@ def test_acados_bounds_not_implemented(failing):
     window_duration = 0.2
     x_init = InitialGuess(np.zeros((nq * 2, 1)), interpolation=InterpolationType.CONSTANT)
     u_init = InitialGuess(np.zeros((ntau, 1)), interpolation=InterpolationType.CONSTANT)
-    if failing == "u_bounds":
+    if interpolation == "u_bounds":
         x_bounds = Bounds(np.zeros((nq * 2, 1)), np.zeros((nq * 2, 1)))
         u_bounds = Bounds(np.zeros((ntau, 1)), np.zeros((ntau, 1)), interpolation=InterpolationType.CONSTANT)
-    elif failing == "x_bounds":
+    elif interpolation == "x_bounds":
         x_bounds = Bounds(np.zeros((nq * 2, 1)), np.zeros((nq * 2, 1)), interpolation=InterpolationType.CONSTANT)
         u_bounds = Bounds(np.zeros((ntau, 1)), np.zeros((ntau, 1)))
     else:
-        raise ValueError("Wrong value for failing")
+        raise ValueError("Wrong value for interpolation")
 
     mhe = MovingHorizonEstimator(
         biorbd_model,
@@ -576,8 +571,135 @@ def test_acados_bounds_not_implemented(failing):
     def update_functions(mhe, t, _):
         return t < n_cycles
 
-    with pytest.raises(
-        NotImplementedError,
-        match=f"ACADOS must declare an InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT for the {failing}",
-    ):
-        mhe.solve(update_functions, Solver.ACADOS)
+    # The bounds are sent node by node, so any interpolation can be used
+    sol = mhe.solve(update_functions, Solver.ACADOS, solver_options={"print_level": 0})
+    np.testing.assert_almost_equal(sol.states["all"], np.zeros((nq * 2, n_cycles)))
+    np.testing.assert_almost_equal(sol.controls["all"][:, :n_cycles], np.zeros((ntau, n_cycles)))
+
+    shutil.rmtree("./acados_generated_code/")
+
+
+def test_acados_multiphase():
+    if platform == "win32":
+        print("Test for ACADOS on Windows is skipped")
+        return
+    bioptim_folder = TestUtils.bioptim_folder()
+    biorbd_model = (
+        biorbd.Model(bioptim_folder + "/examples/acados/cube.bioMod"),
+        biorbd.Model(bioptim_folder + "/examples/acados/cube.bioMod"),
+    )
+    n_shooting = (10, 15)
+    nq = biorbd_model[0].nbQ()
+    ntau = biorbd_model[0].nbGeneralizedTorque()
+
+    dynamics = DynamicsList()
+    dynamics.add(DynamicsFcn.TORQUE_DRIVEN)
+    dynamics.add(DynamicsFcn.TORQUE_DRIVEN)
+
+    objective_functions = ObjectiveList()
+    objective_functions.add(ObjectiveFcn.Lagrange.MINIMIZE_TORQUE, weight=100, phase=0)
+    objective_functions.add(ObjectiveFcn.Lagrange.MINIMIZE_TORQUE, weight=100, phase=1)
+
+    # The constraints are placed on any node, the last node of a phase being the first node of the next one
+    constraints = ConstraintList()
+    constraints.add(ConstraintFcn.SUPERIMPOSE_MARKERS, node=Node.START, first_marker="m0", second_marker="m1", phase=0)
+    constraints.add(ConstraintFcn.SUPERIMPOSE_MARKERS, node=Node.MID, first_marker="m0", second_marker="m2", phase=0)
+    constraints.add(ConstraintFcn.SUPERIMPOSE_MARKERS, node=Node.END, first_marker="m0", second_marker="m2", phase=0)
+    constraints.add(ConstraintFcn.SUPERIMPOSE_MARKERS, node=Node.END, first_marker="m0", second_marker="m1", phase=1)
+
+    x_bounds = BoundsList()
+    x_bounds.add(bounds=QAndQDotBounds(biorbd_model[0]))
+    x_bounds.add(bounds=QAndQDotBounds(biorbd_model[1]))
+    x_bounds[0][nq:, 0] = 0
+    x_bounds[1][nq:, -1] = 0
+
+    # The bounds of the controls differ from node to node
+    tau_max = np.repeat(np.array([[100.0]] * ntau), n_shooting[0], axis=1)
+    tau_max[:, 0] = 50
+    u_bounds = BoundsList()
+    u_bounds.add(-tau_max, tau_max, interpolation=InterpolationType.EACH_FRAME)
+    u_bounds.add([-20] * ntau, [20] * ntau)
+
+    x_init = InitialGuessList()
+    x_init.add([0] * (nq * 2))
+    x_init.add([0] * (nq * 2))
+    u_init = InitialGuessList()
+    u_init.add([0] * ntau)
+    u_init.add([0] * ntau)
+
+    ocp = OptimalControlProgram(
+        biorbd_model,
+        dynamics,
+        n_shooting,
+        (1, 1.5),
+        x_init,
+        u_init,
+        x_bounds,
+        u_bounds,
+        objective_functions,
+        constraints,
+        use_sx=True,
+    )
+    sol_ipopt = ocp.solve(Solver.IPOPT)
+    sol = ocp.solve(Solver.ACADOS, solver_options={"print_level": 0})
+
+    # The phases are solved at once, so the states are continuous between them
+    np.testing.assert_almost_equal(sol.states[0]["all"][:, -1], sol.states[1]["all"][:, 0])
+    for phase in range(2):
+        np.testing.assert_almost_equal(sol.states[phase]["all"], sol_ipopt.states[phase]["all"], decimal=4)
+        np.testing.assert_almost_equal(
+            sol.controls[phase]["all"][:, :-1], sol_ipopt.controls[phase]["all"][:, :-1], decimal=4
+        )
+    assert np.all(np.abs(sol.controls[0]["tau"][:, 0]) <= 50 + 1e-6)
+    assert np.all(np.abs(sol.controls[1]["tau"][:, :-1]) <= 20 + 1e-6)
+
+    shutil.rmtree("./acados_generated_code/")
+
+
+def test_acados_compiled_solver_reuse():
+    if platform == "win32":
+        return
+    bioptim_folder = TestUtils.bioptim_folder()
+    cube = TestUtils.load_module(bioptim_folder + "/examples/acados/cube.py")
+    compile_folder = "./acados_generated_code_test/"
+
+    def prepare_ocp(n_shooting: int, target: float):
+        ocp = cube.prepare_ocp(
+            biorbd_model_path=bioptim_folder + "/examples/acados/cube.bioMod",
+            n_shooting=n_shooting,
+            tf=2,
+        )
+        objective_functions = ObjectiveList()
+        objective_functions.add(ObjectiveFcn.Mayer.MINIMIZE_STATE, index=[0], target=np.array([[target]]).T)
+        ocp.update_objectives(objective_functions)
+        return ocp
+
+    solver_options = {"compile_folder": compile_folder}
+    ocp = prepare_ocp(n_shooting=10, target=1.0)
+    sol = ocp.solve(solver=Solver.ACADOS, solver_options=dict(solver_options))
+    np.testing.assert_almost_equal(sol.states["q"][0, -1], 1.0)
+    structure_hash = ocp.solver.structure_hash()
+    assert os.listdir(compile_folder) == [structure_hash]
+    assert ocp.solver.acados_model.name == f"model_{structure_hash[:16]}"
+
+    # Another target keeps the structure, so the compiled solver is loaded
+    ocp = prepare_ocp(n_shooting=10, target=2.0)
+    sol = ocp.solve(solver=Solver.ACADOS, solver_options=dict(solver_options))
+    np.testing.assert_almost_equal(sol.states["q"][0, -1], 2.0)
+    assert ocp.solver.structure_hash() == structure_hash
+    assert os.listdir(compile_folder) == [structure_hash]
+
+    # A new target on the same ocp only refreshes the values, the expressions of the solver are not rebuilt
+    cost_expr_e = ocp.solver.acados_ocp.model.cost_y_expr_e
+    ocp.update_objectives_target(target=np.array([[3.0]]), list_index=0)
+    sol = ocp.solve(solver=Solver.ACADOS, solver_options=dict(solver_options))
+    np.testing.assert_almost_equal(sol.states["q"][0, -1], 3.0)
+    assert ocp.solver.acados_ocp.model.cost_y_expr_e is cost_expr_e
+
+    # Another number of shooting nodes is another structure
+    ocp = prepare_ocp(n_shooting=12, target=1.0)
+    sol = ocp.solve(solver=Solver.ACADOS, solver_options=dict(solver_options))
+    np.testing.assert_almost_equal(sol.states["q"][0, -1], 1.0)
+    assert sorted(os.listdir(compile_folder)) == sorted([structure_hash, ocp.solver.structure_hash()])
+
+    shutil.rmtree(compile_folder)
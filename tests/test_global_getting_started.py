@@ -1,13 +1,16 @@
 """
 Test for file IO
 """
+import os
+import json
 import pickle
 from pickle import PicklingError
 import re
+import shutil
 
 import pytest
 import numpy as np
-from bioptim import InterpolationType, OdeSolver
+from bioptim import InterpolationType, OdeSolver, OptimalControlProgram, Solution, SolutionFile, IterationReader
 
 from .utils import TestUtils
 
@@ -56,6 +59,32 @@ def test_pendulum_save_and_load():
     TestUtils.simulate(sol)
 
 
+def test_pendulum_compiled_nlp():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+    compile_folder = "./ipopt_generated_code_test/"
+
+    def prepare_ocp():
+        return pendulum.prepare_ocp(
+            biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+            final_time=2,
+            n_shooting=10,
+        )
+
+    solver_options = {"compile_nlp": True, "compile_folder": compile_folder}
+    sol = prepare_ocp().solve(solver_options=solver_options)
+    np.testing.assert_almost_equal(np.array(sol.cost)[0, 0], 6657.974502951726)
+    assert len(os.listdir(compile_folder)) == 1
+
+    # The same structure loads the previously compiled library
+    ocp = prepare_ocp()
+    sol = ocp.solve(solver_options=solver_options)
+    np.testing.assert_almost_equal(np.array(sol.cost)[0, 0], 6657.974502951726)
+    assert os.listdir(compile_folder) == [ocp.solver.structure_hash()]
+
+    shutil.rmtree(compile_folder)
+
+
 @pytest.mark.parametrize("n_threads", [1, 2])
 @pytest.mark.parametrize("use_sx", [False, True])
 @pytest.mark.parametrize("ode_solver", [OdeSolver.RK4, OdeSolver.RK8, OdeSolver.IRK])
@@ -749,3 +778,194 @@ def test_contact_forces_inequality_LESSER_THAN_constraint(ode_solver):
 
     # simulate
     TestUtils.simulate(sol)
+
+
+def test_pendulum_profile():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    sol = ocp.solve()
+    assert sol.profile is None
+    with pytest.raises(RuntimeError, match="There is no profile in the solution"):
+        sol.save_profile("pendulum_profile.json")
+
+    ocp = OptimalControlProgram(**{**ocp.original_values, "profile": True})
+    sol = ocp.solve()
+
+    stages = [stage["name"] for stage in sol.profile["stages"]]
+    for stage in (
+        "Problem.initialize (phase 0)",
+        "prepare_dynamic_integrator (phase 0)",
+        "define_ocp_shooting_points",
+        "ContinuityFunctions.continuity",
+        "update_constraints",
+        "update_objectives",
+        "build nlpsol",
+        "Ipopt",
+    ):
+        assert stage in stages
+    for stage in sol.profile["stages"]:
+        assert stage["wall_time"] >= 0
+
+    graphs = sol.profile["graphs"]
+    assert graphs["n_variables"] == 64
+    assert graphs["n_constraints"] == 40
+    assert graphs["n_nodes"] > 0
+    assert graphs["nnz_jacobian_g"] > 0
+    assert graphs["nnz_hessian_lagrangian"] > 0
+
+    solver_stats = sol.profile["solver_stats"]
+    assert solver_stats["iter_count"] == sol.iterations
+    assert "t_wall_nlp_f" in solver_stats
+    assert "t_wall_nlp_hess_l" in solver_stats
+
+    sol.save_profile("pendulum_profile.json")
+    with open("pendulum_profile.json", "r") as file:
+        assert json.load(file) == sol.profile
+    os.remove("pendulum_profile.json")
+
+    # The next report only covers the next solve
+    n_stages = len(sol.profile["stages"])
+    sol = ocp.solve()
+    stages = [stage["name"] for stage in sol.profile["stages"]]
+    assert "Ipopt" in stages
+    assert "Problem.initialize (phase 0)" not in stages
+    assert len(stages) < n_stages
+    assert sol.profile["graphs"] == graphs
+
+
+def test_pendulum_function_cache():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    assert ocp.function_cache.folder is None
+
+    cache_folder = "pendulum_function_cache"
+    if os.path.exists(cache_folder):
+        shutil.rmtree(cache_folder)
+    ocp_first = OptimalControlProgram(**{**ocp.original_values, "function_cache_folder": cache_folder})
+    assert len(os.listdir(cache_folder)) == 1
+
+    # The second construction loads the expanded dynamics instead of generating them
+    ocp_second = OptimalControlProgram(**{**ocp.original_values, "function_cache_folder": cache_folder})
+    assert len(os.listdir(cache_folder)) == 1
+
+    x = np.array([0.1, -0.2, 0.3, 0.4])
+    u = np.array([1.0, 0.0])
+    expected = np.array(ocp.nlp[0].dynamics_func(x, u, []))
+    np.testing.assert_almost_equal(np.array(ocp_first.nlp[0].dynamics_func(x, u, [])), expected)
+    np.testing.assert_almost_equal(np.array(ocp_second.nlp[0].dynamics_func(x, u, [])), expected)
+    shutil.rmtree(cache_folder)
+
+
+def test_pendulum_penalty_values():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    sol = ocp.solve()
+
+    # The cost is recomputed from the penalties with a single compiled function
+    recomputed = Solution(ocp, sol.vector)
+    np.testing.assert_almost_equal(np.array(recomputed.cost)[0, 0], np.array(sol.cost)[0, 0])
+
+    values = ocp.penalties.evaluate(ocp.v.vector, sol.vector)
+    assert values["objectives"].shape[0] == len(ocp.penalties.objectives)
+    np.testing.assert_almost_equal(np.array(values["constraints"]), np.array(sol.constraints))
+
+
+def test_pendulum_record_iterations():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    folder = "pendulum_iterations"
+    sol = ocp.solve(solver_options={"record_iterations": folder, "record_chunk_size": 3})
+
+    reader = IterationReader(folder, ocp)
+    assert reader.header["finished"]
+    assert len(reader) >= sol.iterations
+    assert len(os.listdir(folder)) == 1 + int(np.ceil(len(reader) / 3))
+    assert len(reader.inf_pr) == len(reader.inf_du)
+
+    # The last iterate is the solution
+    np.testing.assert_almost_equal(reader.values("x", -1), np.array(sol.vector)[:, 0])
+    np.testing.assert_almost_equal(reader.series("f")[-1, 0], np.array(sol.cost)[0, 0])
+    last = reader.solution(-1)
+    np.testing.assert_almost_equal(last.states["q"], sol.states["q"])
+    assert sum(1 for _ in reader) == len(reader)
+
+    # A recording started on the solver survives a solve that does not give options, even with a built nlpsol
+    other_folder = "pendulum_iterations_other"
+    ocp.solver.start_get_iterations(other_folder, chunk_size=5)
+    sol = ocp.solve()
+    assert len(IterationReader(other_folder, ocp)) >= sol.iterations
+
+    # The stores are kept untouched when the recording stops
+    def chunks(path):
+        return {file: os.stat(f"{path}/{file}").st_mtime_ns for file in os.listdir(path)}
+
+    stored = chunks(folder), chunks(other_folder)
+    ocp.solve(solver_options={})
+    assert ocp.solver.iteration_recorder is None
+    assert (chunks(folder), chunks(other_folder)) == stored
+    assert len(IterationReader(folder)) == len(reader)
+    with pytest.raises(RuntimeError, match="The ocp that was recorded must be given"):
+        IterationReader(folder).solution(0)
+    shutil.rmtree(folder)
+    shutil.rmtree(other_folder)
+
+
+def test_pendulum_save_and_load_npz():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    sol = ocp.solve()
+    file_path = "pendulum.npz"
+    ocp.save(sol, file_path)
+
+    # The variables are read without rebuilding the ocp
+    file = SolutionFile(file_path)
+    assert file.n_phases == 1
+    assert isinstance(file.states(0, "q"), np.memmap)
+    np.testing.assert_almost_equal(file.states(0, "q"), sol.states["q"])
+    np.testing.assert_almost_equal(file.controls(0, "tau"), sol.controls["tau"])
+    np.testing.assert_almost_equal(file.array("lam_g"), np.array(sol.lam_g))
+    np.testing.assert_almost_equal(file.stats["cost"], np.array(sol.cost)[0, 0])
+    assert file.stats["iterations"] == sol.iterations
+    with pytest.raises(ValueError, match="qddot is not in the states of phase 0"):
+        file.states(0, "qddot")
+
+    ocp_load, sol_load = OptimalControlProgram.load(file_path)
+    np.testing.assert_almost_equal(sol_load.states["all"], sol.states["all"])
+    np.testing.assert_almost_equal(sol_load.controls["all"], sol.controls["all"])
+    np.testing.assert_almost_equal(np.array(sol_load.cost)[0, 0], np.array(sol.cost)[0, 0])
+    assert ocp_load.nlp[0].ns == ocp.nlp[0].ns
+
+    ocp.save(sol, file_path, stand_alone=True)
+    with pytest.raises(RuntimeError, match="The ocp was not saved"):
+        SolutionFile(file_path).ocp
+    os.remove(file_path)
@@ -28,6 +28,7 @@ def prepare_ocp(
     marker_in_first_coordinates_system: bool,
     control_type: ControlType,
     ode_solver: OdeSolver = OdeSolver.RK4(),
+    n_threads: int = 1,
 ) -> OptimalControlProgram:
     """
     Prepare an ocp that targets some marker velocities, either by finite differences or by jacobian
@@ -48,6 +49,8 @@ def prepare_ocp(
         The type of controls
     ode_solver: OdeSolver
         The ode solver to use
+    n_threads: int
+        The number of threads to use while solving
 
     Returns
     -------
@@ -120,6 +123,7 @@ def prepare_ocp(
         objective_functions,
         control_type=control_type,
         ode_solver=ode_solver,
+        n_threads=n_threads,
     )
 
 
@@ -315,3 +319,29 @@ def test_track_and_minimize_marker_velocity_linear_controls(ode_solver):
 
         # simulate
         TestUtils.simulate(sol)
+
+
+@pytest.mark.parametrize("ode_solver", [OdeSolver.RK4, OdeSolver.RK8])
+def test_track_and_minimize_marker_velocity_linear_controls_multithread(ode_solver):
+    def solve(n_threads):
+        ocp = prepare_ocp(
+            biorbd_model_path=TestUtils.bioptim_folder() + "/examples/track/cube_and_line.bioMod",
+            n_shooting=5,
+            final_time=1,
+            marker_velocity_or_displacement="velo",
+            marker_in_first_coordinates_system=True,
+            control_type=ControlType.LINEAR_CONTINUOUS,
+            ode_solver=ode_solver(),
+            n_threads=n_threads,
+        )
+        return ocp.solve()
+
+    sol = solve(1)
+    sol_threaded = solve(2)
+
+    # The continuity is declared all at once, whatever the number of threads
+    np.testing.assert_equal(len(sol.ocp.g[0]), 1)
+    np.testing.assert_almost_equal(np.array(sol_threaded.constraints), np.zeros((40, 1)))
+    np.testing.assert_almost_equal(sol_threaded.cost, sol.cost)
+    np.testing.assert_almost_equal(sol_threaded.states["all"], sol.states["all"])
+    np.testing.assert_almost_equal(sol_threaded.controls["all"], sol.controls["all"])
@@ -170,6 +170,49 @@ def test_initial_guess_custom():
         np.testing.assert_almost_equal(init.init.evaluate_at(i), expected_val)
 
 
+@pytest.mark.parametrize(
+    "interpolation",
+    [
+        InterpolationType.CONSTANT,
+        InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT,
+        InterpolationType.LINEAR,
+        InterpolationType.EACH_FRAME,
+        InterpolationType.SPLINE,
+        InterpolationType.CUSTOM,
+    ],
+)
+def test_initial_guess_evaluate_all(interpolation):
+    n_elements = 6
+    n_shoot = 10
+    np.random.seed(42)
+
+    extra_params = {}
+    if interpolation == InterpolationType.CONSTANT:
+        init_val = np.random.random((n_elements, 1))
+    elif interpolation == InterpolationType.CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT:
+        init_val = np.random.random((n_elements, 3))
+    elif interpolation == InterpolationType.LINEAR:
+        init_val = np.random.random((n_elements, 2))
+    elif interpolation == InterpolationType.EACH_FRAME:
+        init_val = np.random.random((n_elements, n_shoot + 1))
+    elif interpolation == InterpolationType.SPLINE:
+        init_val = np.random.random((n_elements, 4))
+        extra_params["t"] = np.hstack((0.0, 1.0, 2.2, 6.0))
+    else:
+
+        def init_val(current_shooting, val):
+            return val[:, 0] * current_shooting
+
+        extra_params["val"] = np.random.random((n_elements, 1))
+
+    init = InitialGuess(init_val, interpolation=interpolation, **extra_params)
+    init.check_and_adjust_dimensions(n_elements, n_shoot)
+    all_values = init.init.evaluate_all(n_shoot)
+    assert all_values.shape == (n_elements, n_shoot + 1)
+    for i in range(n_shoot + 1):
+        np.testing.assert_almost_equal(all_values[:, i], init.init.evaluate_at(i))
+
+
 def test_simulate_from_initial_multiple_shoot():
     bioptim_folder = TestUtils.bioptim_folder()
     pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/example_save_and_load.py")
@@ -1,5 +1,5 @@
 import pytest
-import os
+import asyncio
 import shutil
 from sys import platform
 
@@ -13,6 +13,7 @@ from bioptim import (
     InterpolationType,
     InitialGuess,
     Bounds,
+    WarmStart,
 )
 
 from .utils import TestUtils
@@ -66,8 +67,7 @@ def test_mhe(solver):
         np.testing.assert_almost_equal(
             sol.states["q"][:, : -2 * window_len], target_q[:nq, : -3 * window_len - 1], decimal=3
         )
-        os.remove(f"./acados_ocp.json")
-        shutil.rmtree(f"./c_generated_code/")
+        shutil.rmtree("./acados_generated_code/")
 
 
 def test_mhe_redim_xbounds_and_init():
@@ -141,3 +141,255 @@ def test_mhe_redim_xbounds_not_implemented():
         "CONSTANT or CONSTANT_WITH_FIRST_AND_LAST_DIFFERENT",
     ):
         mhe.solve(update_functions, Solver.IPOPT)
+
+
+def test_mhe_ipopt_warm_start():
+    root_folder = TestUtils.bioptim_folder() + "/examples/moving_horizon_estimation/"
+    pendulum = TestUtils.load_module(root_folder + "mhe.py")
+    biorbd_model = biorbd.Model(root_folder + "cart_pendulum.bioMod")
+    nq = biorbd_model.nbQ()
+    torque_max = 5
+
+    n_frames = 10
+    window_len = 5
+    window_duration = 0.2
+    final_time = window_duration / window_len * n_frames
+    target_q, _, _, _ = pendulum.generate_data(biorbd_model, final_time, [0, np.pi / 2, 0, 0], torque_max, n_frames, 0)
+    target = pendulum.states_to_markers(biorbd_model, target_q)
+
+    windows = []
+
+    def update_functions(mhe, t, sol):
+        if sol is not None:
+            windows.append(sol)
+        mhe.update_objectives_target(target=target[:, :, t : t + window_len + 1], list_index=0)
+        return t < n_frames - window_len - 1
+
+    mhe = pendulum.prepare_mhe(
+        biorbd_model=biorbd_model,
+        window_len=window_len,
+        window_duration=window_duration,
+        max_torque=torque_max,
+        x_init=np.zeros((nq * 2, window_len + 1)),
+        u_init=np.zeros((nq, window_len)),
+    )
+    sol = mhe.solve(update_functions, warm_start=True, **pendulum.get_solver_options(Solver.IPOPT))
+    np.testing.assert_equal(sol.states["q"].shape, (nq, n_frames - window_len - 1))
+
+    # The warm start drops the first frame and duplicates the last one
+    shifted = mhe._shift_solution(windows[-1])
+    np.testing.assert_almost_equal(shifted.states["all"][:, :-1], windows[-1].states["all"][:, 1:])
+    np.testing.assert_almost_equal(shifted.states["all"][:, -1], windows[-1].states["all"][:, -1])
+    np.testing.assert_almost_equal(shifted.controls["all"][:, :-2], windows[-1].controls["all"][:, 1:-1])
+    np.testing.assert_equal(np.array(shifted.lam_g).shape, np.array(windows[-1].lam_g).shape)
+
+    with pytest.raises(RuntimeError, match="warm_start is only available with Solver.IPOPT"):
+        mhe.solve(update_functions, Solver.ACADOS, warm_start=True)
+
+
+@pytest.mark.parametrize("solver", [Solver.ACADOS, Solver.IPOPT])
+def test_mhe_rti(solver):
+    if platform == "win32" and solver == Solver.ACADOS:
+        print("Test for ACADOS on Windows is skipped")
+        return
+    root_folder = TestUtils.bioptim_folder() + "/examples/moving_horizon_estimation/"
+    pendulum = TestUtils.load_module(root_folder + "mhe.py")
+    biorbd_model = biorbd.Model(root_folder + "cart_pendulum.bioMod")
+    nq = biorbd_model.nbQ()
+    torque_max = 5
+
+    n_frames = 10
+    window_len = 5
+    window_duration = 0.2
+    final_time = window_duration / window_len * n_frames
+    target_q, _, _, _ = pendulum.generate_data(biorbd_model, final_time, [0, np.pi / 2, 0, 0], torque_max, n_frames, 0)
+    target = pendulum.states_to_markers(biorbd_model, target_q)
+
+    windows = []
+
+    def update_functions(mhe, t, sol):
+        if sol is not None:
+            windows.append(sol)
+        mhe.update_objectives_target(target=target[:, :, t : t + window_len + 1], list_index=0)
+        return t < n_frames - window_len - 1
+
+    mhe = pendulum.prepare_mhe(
+        biorbd_model=biorbd_model,
+        window_len=window_len,
+        window_duration=window_duration,
+        max_torque=torque_max,
+        x_init=np.zeros((nq * 2, window_len + 1)),
+        u_init=np.zeros((nq, window_len)),
+    )
+    sol = mhe.solve(update_functions, rti=True, **pendulum.get_solver_options(solver))
+    n_windows = n_frames - window_len - 1
+    np.testing.assert_equal(sol.states["q"].shape, (nq, n_windows))
+
+    # The latency of each phase is reported for each window
+    np.testing.assert_equal(sol.latency["preparation"].shape, (n_windows,))
+    np.testing.assert_equal(sol.latency["feedback"].shape, (n_windows,))
+    assert np.all(sol.latency["feedback"] > 0)
+    for i, window in enumerate(windows):
+        assert window.latency["feedback"] == sol.latency["feedback"][i]
+    if solver == Solver.IPOPT:
+        # A single Newton step per window (the first one is fully solved)
+        assert all(window.iterations == 1 for window in windows[1:])
+    else:
+        shutil.rmtree("./acados_generated_code/")
+
+
+def test_mhe_warm_start_strategies():
+    root_folder = TestUtils.bioptim_folder() + "/examples/moving_horizon_estimation/"
+    pendulum = TestUtils.load_module(root_folder + "mhe.py")
+    biorbd_model = biorbd.Model(root_folder + "cart_pendulum.bioMod")
+    nq = biorbd_model.nbQ()
+    torque_max = 5
+
+    n_frames = 12
+    window_len = 5
+    window_duration = 0.2
+    final_time = window_duration / window_len * n_frames
+    target_q, _, _, _ = pendulum.generate_data(biorbd_model, final_time, [0, np.pi / 2, 0, 0], torque_max, n_frames, 0)
+    target = pendulum.states_to_markers(biorbd_model, target_q)
+
+    windows = []
+    buffers = []
+    vectors = []
+    x_inits = []
+    x0s = []
+
+    def update_functions(mhe, t, sol):
+        if sol is not None:
+            windows.append(sol)
+            buffers.append((mhe.nlp[0].x_init.init, mhe.nlp[0].u_init.init))
+            vectors.append((mhe.v.init, mhe.v.bounds))
+            x_inits.append(np.array(mhe.nlp[0].x_init.init).copy())
+            x0s.append(np.array(mhe.solver.get_limits()["x0"]).reshape(-1))
+        mhe.update_objectives_target(target=target[:, :, 2 * t : 2 * t + window_len + 1], list_index=0)
+        return t < 3
+
+    mhe = pendulum.prepare_mhe(
+        biorbd_model=biorbd_model,
+        window_len=window_len,
+        window_duration=window_duration,
+        max_torque=torque_max,
+        x_init=np.zeros((nq * 2, window_len + 1)),
+        u_init=np.zeros((nq, window_len)),
+    )
+    sol = mhe.solve(
+        update_functions, warm_start_strategy=WarmStart.Shift(n_frames=2), **pendulum.get_solver_options(Solver.IPOPT)
+    )
+
+    # The window moves by two frames, which are all kept
+    np.testing.assert_equal(sol.states["q"].shape, (nq, 3 * 2))
+    np.testing.assert_almost_equal(sol.states["all"][:, 2:4], windows[1].states["all"][:, :2])
+
+    # The initial guesses are updated in place
+    assert all(x_init is buffers[0][0] and u_init is buffers[0][1] for x_init, u_init in buffers)
+    assert all(init is vectors[0][0] and bounds is vectors[0][1] for init, bounds in vectors)
+    assert mhe.v.init is vectors[0][0] and mhe.v.bounds is vectors[0][1]
+    np.testing.assert_almost_equal(mhe.nlp[0].x_init.init[:, :-2], windows[-1].states["all"][:, 2:])
+    np.testing.assert_almost_equal(mhe.nlp[0].u_init.init[:, :-2], windows[-1].controls["all"][:, 2:-1])
+
+    # The shifted initial guess and first frame bounds are the ones sent to Ipopt
+    for x_init, x0 in zip(x_inits, x0s):
+        np.testing.assert_almost_equal(x0[: x_init.size], x_init.reshape(-1, order="F"))
+    assert not np.allclose(x0s[0], x0s[1])
+    nx = mhe.nlp[0].nx
+    np.testing.assert_almost_equal(mhe.v.bounds.min[:nx, 0], mhe.nlp[0].x_init.init[:, 0])
+    np.testing.assert_almost_equal(mhe.v.bounds.max[:nx, 0], mhe.nlp[0].x_init.init[:, 0])
+
+    window = windows[-1]
+    x, u = window.states["all"], window.controls["all"][:, :-1]
+    shifted_x, shifted_u = WarmStart.Shift(n_frames=2).shift(mhe, window)
+    np.testing.assert_almost_equal(shifted_x[:, -2:], np.repeat(x[:, -1:], 2, axis=1))
+    np.testing.assert_almost_equal(shifted_u[:, -2:], np.repeat(u[:, -1:], 2, axis=1))
+
+    shifted_x, shifted_u = WarmStart.Cycle(n_frames=2).shift(mhe, window)
+    np.testing.assert_almost_equal(shifted_x[:, -2:], x[:, 1:3])
+    np.testing.assert_almost_equal(shifted_u[:, -2:], u[:, :2])
+
+    shifted_x, shifted_u = WarmStart.ShiftAndSimulate(n_frames=1).shift(mhe, window)
+    np.testing.assert_almost_equal(shifted_x[:, :-1], x[:, 1:])
+    expected = mhe.nlp[0].dynamics[-1](x0=x[:, -1], p=u[:, -1], params=window.parameters["all"])["xf"]
+    np.testing.assert_almost_equal(shifted_x[:, -1], np.array(expected)[:, 0])
+
+    shifted_x, shifted_u = WarmStart.Shift(shift_controls=False).shift(mhe, window)
+    assert shifted_u is None
+    with pytest.raises(ValueError, match="The window cannot move by 5 frames, it only has 5 intervals"):
+        WarmStart.Shift(n_frames=5).shift(mhe, window)
+
+
+def test_mhe_stream():
+    root_folder = TestUtils.bioptim_folder() + "/examples/moving_horizon_estimation/"
+    pendulum = TestUtils.load_module(root_folder + "mhe.py")
+    biorbd_model = biorbd.Model(root_folder + "cart_pendulum.bioMod")
+    nq = biorbd_model.nbQ()
+    torque_max = 5
+
+    n_frames = 10
+    window_len = 5
+    window_duration = 0.2
+    n_windows = n_frames - window_len - 1
+    final_time = window_duration / window_len * n_frames
+    target_q, _, _, _ = pendulum.generate_data(biorbd_model, final_time, [0, np.pi / 2, 0, 0], torque_max, n_frames, 0)
+    target = pendulum.states_to_markers(biorbd_model, target_q)
+
+    def prepare_mhe():
+        return pendulum.prepare_mhe(
+            biorbd_model=biorbd_model,
+            window_len=window_len,
+            window_duration=window_duration,
+            max_torque=torque_max,
+            x_init=np.zeros((nq * 2, window_len + 1)),
+            u_init=np.zeros((nq, window_len)),
+        )
+
+    def update_functions(mhe, t, _):
+        mhe.update_objectives_target(target=target[:, :, t : t + window_len + 1], list_index=0)
+        return t < n_windows
+
+    sol = prepare_mhe().solve(update_functions, **pendulum.get_solver_options(Solver.IPOPT))
+
+    def send_measurement(mhe, t, measurement):
+        mhe.update_objectives_target(target=measurement, list_index=0)
+
+    measurements = (target[:, :, t : t + window_len + 1] for t in range(n_windows))
+    mhe = prepare_mhe()
+    estimates = list(
+        mhe.stream(measurements, send_measurement, history_len=3, **pendulum.get_solver_options(Solver.IPOPT))
+    )
+
+    # The stream gives the same estimates as solve, one window at a time
+    assert [estimate.index for estimate in estimates] == list(range(n_windows))
+    np.testing.assert_almost_equal(np.concatenate([e.states for e in estimates], axis=1), sol.states["all"])
+    controls = np.concatenate([e.controls for e in estimates], axis=1)
+    np.testing.assert_almost_equal(controls, sol.controls["all"][:, :n_windows])
+    for estimate in estimates:
+        np.testing.assert_almost_equal(estimate.time, estimate.index * window_duration / window_len)
+        assert 0 < estimate.latency["solve"] <= estimate.latency["total"]
+    assert all(first.timestamp <= second.timestamp for first, second in zip(estimates[:-1], estimates[1:]))
+
+    # Only the last frames are kept in the history
+    assert len(mhe.history) == 3
+    np.testing.assert_almost_equal(mhe.history.states, sol.states["all"][:, -3:])
+    np.testing.assert_almost_equal(mhe.history.time, np.arange(n_windows - 3, n_windows) * window_duration / window_len)
+
+    # The asyncio version reads the measurements from a queue
+    async def run():
+        measurements_queue = asyncio.Queue()
+        for t in range(n_windows):
+            measurements_queue.put_nowait(target[:, :, t : t + window_len + 1])
+        measurements_queue.put_nowait(None)
+        return [
+            estimate
+            async for estimate in prepare_mhe().stream_async(
+                measurements_queue, send_measurement, **pendulum.get_solver_options(Solver.IPOPT)
+            )
+        ]
+
+    estimates = asyncio.run(run())
+    np.testing.assert_almost_equal(np.concatenate([e.states for e in estimates], axis=1), sol.states["all"])
+
+    with pytest.raises(RuntimeError, match="warm_start is only available with Solver.IPOPT"):
+        next(mhe.stream([], send_measurement, Solver.ACADOS, warm_start=True))
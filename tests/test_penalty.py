@@ -1127,3 +1127,47 @@ def test_penalty_track_markers_with_nan(penalty_origin, value):
         np.array(res),
         expected,
     )
+
+
+def test_constraint_bounds_broadcast():
+    ocp = prepare_test_ocp()
+    u = [DM.ones((12, 1))]
+    penalty_type = ConstraintFcn.TRACK_TORQUE
+    penalty = Constraint(penalty_type, min_bound=-1, max_bound=np.array([1, 2, 3, 4]))
+    penalty_type.value[0](penalty, PenaltyNodes(ocp, ocp.nlp[0], [], [], u, []))
+
+    np.testing.assert_almost_equal(ocp.nlp[0].g[0][0]["bounds"].min, -np.ones((4, 1)))
+    np.testing.assert_almost_equal(ocp.nlp[0].g[0][0]["bounds"].max, np.array([[1, 2, 3, 4]]).T)
+
+
+def test_penalty_registry():
+    ocp = prepare_test_ocp()
+    nx = ocp.nlp[0].nx
+    ocp.update_constraints(Constraint(ConstraintFcn.TRACK_STATE, node=Node.ALL, min_bound=-1, max_bound=1))
+    penalties = ocp.penalties
+    assert ocp.penalties is penalties
+
+    list_index = [len(g) > 0 for g in ocp.nlp[0].g].index(True)
+    idx = penalties.constraint_indices(0, list_index)
+    assert len(idx) == len(ocp.nlp[0].g[list_index])
+    for i, g in zip(idx, ocp.nlp[0].g[list_index]):
+        assert penalties.constraints[i] is g
+    rows = penalties.constraint_slice(0, list_index)
+    assert rows.stop - rows.start == nx * len(idx)
+    assert penalties.n_g == penalties.constraint_rows[-1, 1]
+    np.testing.assert_almost_equal(penalties.g_min[rows], -1)
+    np.testing.assert_almost_equal(penalties.g_max[rows], 1)
+    assert penalties.n_target_rows == 0
+
+    # Modifying the penalties rebuilds the registry
+    target = np.ones((nx, 1))
+    target[0, 0] = np.nan
+    ocp.update_objectives(Objective(ObjectiveFcn.Mayer.MINIMIZE_STATE, node=Node.END, target=target))
+    assert ocp.penalties is not penalties
+    penalties = ocp.penalties
+    assert len(penalties.objectives) == 1
+    assert penalties.objective_phase[0] == 0
+    np.testing.assert_almost_equal(penalties.objective_target_rows[0], [0, 2 * nx])
+    targets = penalties.targets()
+    np.testing.assert_almost_equal(targets[:nx, 0], [0] + [1] * (nx - 1))
+    np.testing.assert_almost_equal(targets[nx:, 0], [0] + [1] * (nx - 1))
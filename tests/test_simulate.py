@@ -50,6 +50,53 @@ def test_merge_phases_multi_phase():
         np.testing.assert_almost_equal(sol_merged.controls[key], expected)
 
 
+def test_solution_copies_share_data():
+    # Load pendulum
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+
+    sol = ocp.solve()
+    sol_copy = sol.copy()
+    sol_merged = sol.merge_phases()
+    for key in sol.states:
+        assert np.shares_memory(sol_copy.states[key], sol.states[key])
+        assert np.shares_memory(sol_merged.states[key], sol.states[key])
+    for key in sol.controls:
+        # The keys are views on "all"
+        assert np.shares_memory(sol.controls[key], sol.controls["all"])
+        assert np.shares_memory(sol_copy.controls[key], sol.controls[key])
+
+    # The data is read only, but can be replaced without affecting the other solutions
+    with pytest.raises(ValueError, match="read-only"):
+        sol_copy.states["q"][0, 0] = 42
+    sol_copy.states["q"] = np.zeros(sol.states["q"].shape)
+    assert sol.states["q"][1, -1] != 0
+
+    # "all" and the other keys are kept consistent whichever is replaced
+    n_q = sol.states["q"].shape[0]
+    np.testing.assert_equal(sol_copy.states["all"][:n_q, :], 0)
+    np.testing.assert_equal(sol_copy.states["all"][n_q:, :], sol.states["qdot"])
+    assert not sol_copy.states["all"].flags.writeable
+    for key in sol_copy.states:
+        assert np.shares_memory(sol_copy.states[key], sol_copy.states["all"])
+    sol_copy.states["all"] = np.ones(sol.states["all"].shape)
+    np.testing.assert_equal(sol_copy.states["q"], 1)
+    np.testing.assert_equal(sol_copy.states["qdot"], 1)
+    with pytest.raises(ValueError, match="'all' must have 4 rows"):
+        sol_copy.states["all"] = np.ones((3, sol.states["all"].shape[1]))
+    np.testing.assert_almost_equal(sol.states["all"][:n_q, :], sol.states["q"])
+
+    sol_integrated = sol.integrate(shooting_type=Shooting.MULTIPLE, keepdims=False)
+    assert not sol_integrated.states["all"].flags.writeable
+    assert not np.shares_memory(sol_integrated.states["all"], sol.states["all"])
+
+
 def test_interpolate():
     # Load pendulum
     bioptim_folder = TestUtils.bioptim_folder()
@@ -452,3 +499,28 @@ def test_integrate_multiphase_merged_non_continuous(shooting):
         "integrated and interpolated structure",
     ):
         _ = sol_integrated.controls
+
+
+@pytest.mark.parametrize("shooting", [Shooting.SINGLE_CONTINUOUS, Shooting.MULTIPLE, Shooting.SINGLE])
+@pytest.mark.parametrize("continuous", [True, False])
+def test_integrate_batched_same_as_node_by_node(shooting, continuous):
+    # Load pendulum
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    sol = ocp.solve()
+
+    sol_batched = sol.integrate(shooting_type=shooting, continuous=continuous, keepdims=False)
+
+    # Without the mapped and chained integrators, the nodes are integrated one by one
+    sol.ocp.nlp[0].par_dynamics = None
+    sol.ocp.nlp[0].accum_dynamics = None
+    sol_node_by_node = sol.integrate(shooting_type=shooting, continuous=continuous, keepdims=False)
+
+    for key in sol.states:
+        np.testing.assert_almost_equal(sol_batched.states[key], sol_node_by_node.states[key])
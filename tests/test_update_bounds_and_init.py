@@ -1,3 +1,5 @@
+import re
+
 import pytest
 import numpy as np
 import biorbd
@@ -12,6 +14,7 @@ from bioptim import (
     InitialGuess,
     Objective,
     ObjectiveFcn,
+    CostType,
 )
 
 from .utils import TestUtils
@@ -115,6 +118,36 @@ def test_update_bounds_and_init_with_param():
     np.testing.assert_almost_equal(ocp.v.init.init, np.append(expected, [g_init])[:, np.newaxis])
 
 
+def test_bounds_and_init_are_cached():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/optimal_time_ocp/pendulum_min_time_Mayer.py")
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/optimal_time_ocp/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+
+    assert ocp.v.vector is ocp.v.vector
+    assert ocp.v.parameters is ocp.v.parameters
+    bounds = ocp.v.bounds
+    init = ocp.v.init
+    assert ocp.v.bounds is bounds
+    assert ocp.v.init is init
+
+    ocp.update_bounds(u_bounds=Bounds([-5] * 2, [5] * 2, interpolation=InterpolationType.CONSTANT))
+    assert ocp.v.bounds is not bounds
+    assert ocp.v.init is init
+    np.testing.assert_almost_equal(ocp.v.bounds.min[4 * 11 : 4 * 11 + 2 * 10], -5 * np.ones((2 * 10, 1)))
+    np.testing.assert_almost_equal(ocp.v.bounds.max[4 * 11 : 4 * 11 + 2 * 10], 5 * np.ones((2 * 10, 1)))
+
+    new_time_init = InitialGuess([4])
+    new_time_init.name = "time"
+    ocp.update_initial_guess(param_init=new_time_init)
+    assert ocp.v.init is not init
+    np.testing.assert_almost_equal(ocp.v.init.init[-1, 0], 4)
+    np.testing.assert_almost_equal(ocp.v.parameters.initial_guess.init[0, 0], 4)
+
+
 def test_add_wrong_param():
     g_min, g_max, g_init = -10, -6, -8
 
@@ -181,3 +214,135 @@ def test_add_wrong_param():
             penalty_list=parameter_objective_functions,
             extra_value=1,
         )
+
+
+def test_ipopt_solver_is_reused_after_numerical_update():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    nq = ocp.nlp[0].model.nbQ()
+
+    sol = ocp.solve()
+    nlpsol = ocp.solver.ocp_solver
+    assert nlpsol is not None
+
+    # Numerical modifications keep the compiled solver
+    ocp.update_initial_guess(InitialGuess(sol.states["all"][:, :1]), InitialGuess(np.zeros((nq, 1))))
+    sol_warm = ocp.solve()
+    assert ocp.solver.ocp_solver is nlpsol
+    np.testing.assert_almost_equal(sol_warm.cost, sol.cost, decimal=5)
+
+    # Structural modifications rebuild it
+    ocp.update_objectives(Objective(ObjectiveFcn.Lagrange.MINIMIZE_TORQUE, weight=10, list_index=0))
+    assert ocp.solver.ocp_solver is None
+    sol_modified = ocp.solve()
+    assert ocp.solver.ocp_solver is not nlpsol
+    np.testing.assert_almost_equal(np.array(sol_modified.cost), np.array(sol.cost) * 10, decimal=3)
+
+
+def test_update_objectives_target_reuses_ipopt_solver():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    def prepare_ocp(target):
+        ocp = pendulum.prepare_ocp(
+            biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+            final_time=2,
+            n_shooting=10,
+        )
+        ocp.update_objectives(Objective(ObjectiveFcn.Lagrange.MINIMIZE_TORQUE, list_index=0, target=target))
+        return ocp
+
+    target = np.ones((2, 10))
+    target[1, :] = np.nan
+    ocp = prepare_ocp(np.ones((2, 10)) * 0.5)
+    ocp.solve()
+    nlpsol = ocp.solver.ocp_solver
+
+    ocp.update_objectives_target(target, list_index=0)
+    sol = ocp.solve()
+    assert ocp.solver.ocp_solver is nlpsol
+
+    sol_expected = prepare_ocp(target).solve()
+    np.testing.assert_almost_equal(np.array(sol.cost), np.array(sol_expected.cost), decimal=5)
+    np.testing.assert_almost_equal(sol.controls["tau"], sol_expected.controls["tau"], decimal=5)
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_solve_batch(n_workers, capsys):
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+
+    def prepare_ocp():
+        ocp = pendulum.prepare_ocp(
+            biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+            final_time=2,
+            n_shooting=10,
+        )
+        ocp.update_objectives(Objective(ObjectiveFcn.Lagrange.MINIMIZE_TORQUE, list_index=0, target=np.ones((2, 10))))
+        return ocp
+
+    targets = [np.ones((2, 10)) * i for i in (0.5, 1, 2)]
+    ocp = prepare_ocp()
+    sols = ocp.solve_batch(
+        [{"objectives_target": [{"target": target, "list_index": 0}]} for target in targets], n_workers=n_workers
+    )
+
+    assert len(sols) == len(targets)
+    for sol, target in zip(sols, targets):
+        assert sol.time_to_optimize > 0
+        ocp_expected = prepare_ocp()
+        ocp_expected.update_objectives_target(target, list_index=0)
+        sol_expected = ocp_expected.solve()
+        np.testing.assert_almost_equal(np.array(sol.cost), np.array(sol_expected.cost), decimal=5)
+        np.testing.assert_almost_equal(sol.controls["tau"], sol_expected.controls["tau"], decimal=5)
+
+        # The detailed values are computed with the targets of the variant, not with the ones of the last update
+        sol.print(CostType.OBJECTIVES)
+        printed = capsys.readouterr().out
+        sol_expected.print(CostType.OBJECTIVES)
+        printed_expected = capsys.readouterr().out
+        number = r"-?\d+\.\d+(?:e-?\d+)?"
+        np.testing.assert_almost_equal(
+            np.array(re.findall(number, printed), dtype=float),
+            np.array(re.findall(number, printed_expected), dtype=float),
+            decimal=4,
+        )
+
+
+def test_solve_batch_after_solve_with_new_target():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+    ocp.solve()
+
+    # The first update adds a target to an objective that had none, which rebuilds the solver once for all variants
+    targets = [np.ones((2, 10)) * i for i in (0.5, 1)]
+    sols = ocp.solve_batch([{"objectives_target": [{"target": target, "list_index": 0}]} for target in targets])
+    assert all(sol is not None for sol in sols)
+    assert np.array(sols[0].cost) != np.array(sols[1].cost)
+
+
+def test_solve_batch_stop_function():
+    bioptim_folder = TestUtils.bioptim_folder()
+    pendulum = TestUtils.load_module(bioptim_folder + "/examples/getting_started/pendulum.py")
+    ocp = pendulum.prepare_ocp(
+        biorbd_model_path=bioptim_folder + "/examples/getting_started/pendulum.bioMod",
+        final_time=2,
+        n_shooting=10,
+    )
+
+    sols = ocp.solve_batch([{}, {}, {}], stop_function=lambda index, sol: index == 0)
+    assert sols[0] is not None
+    assert sols[1] is None and sols[2] is None
+
+    with pytest.raises(ValueError, match="cannot be updated in solve_batch"):
+        ocp.solve_batch([{"x_bound": None}])